@@ -0,0 +1,107 @@
+import json
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+# --- Schema of the final answer ---
+class Recommendation(BaseModel):
+    # The model sometimes writes salaries as bare numbers
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    title: str
+    income: str
+    reasoning: str
+
+class RecommendationResult(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    recommendations: list[Recommendation]
+    summary: str
+
+def _first_json_object(text: str) -> Optional[dict]:
+    """The first JSON object in `text`; models sometimes wrap it in prose or a ``` fence."""
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
+def parse_result(content) -> RecommendationResult:
+    """Validates a final answer; raises ValueError with the reason if it does not match the schema."""
+    if not isinstance(content, str):
+        raise ValueError("The answer is not text.")
+    value = _first_json_object(content)
+    if value is None:
+        raise ValueError("The answer contains no complete JSON object.")
+    return RecommendationResult.model_validate(value)
+
+def result_or_none(content) -> Optional[RecommendationResult]:
+    try:
+        return parse_result(content)
+    except ValueError:
+        return None
+
+# --- Incremental parsing ---
+class RecommendationStream:
+    """
+    Reads an answer token by token and returns each entry of `recommendations`
+    as soon as its object is closed, while the rest is still being generated.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._text = ""
+        self._pos = 0
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> list[Recommendation]:
+        """Adds the next piece of the answer and returns the recommendations it completed."""
+        self._text += chunk
+        found = []
+        for i in range(self._pos, len(self._text)):
+            c = self._text[i]
+            if not self._stack:
+                # Text before the JSON object (prose, a ``` fence) is skipped
+                if c == "{":
+                    self._stack.append(c)
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = self._text[self._string_start + 1:i]
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and len(self._stack) == 1:
+                self._key = self._last_string
+            elif c in "{[":
+                if c == "{" and self._stack == ["{", "["] and self._key == "recommendations":
+                    self._item_start = i
+                self._stack.append(c)
+            elif c in "}]":
+                self._stack.pop()
+                if self._item_start is not None and self._stack == ["{", "["]:
+                    try:
+                        found.append(Recommendation.model_validate_json(self._text[self._item_start:i + 1]))
+                    except ValueError:
+                        pass  # Not a recommendation; the final validation reports it
+                    self._item_start = None
+        self._pos = len(self._text)
+        self.count += len(found)
+        return found
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from agent.config import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+from agent.metrics import CACHE_EVENTS
+from agent.storage import SqliteStore
+
+HUMAN_FEEDBACK_TOOL = "human_feedback_tool"
+# Grades, ages and salaries separate otherwise similar profiles, so numbers weigh more than words
+NUMBER_WEIGHT = 3.0
+# A negation turns the profile around ("mag keine Mathe"); it is folded into the word it negates
+# and weighs so much that a negated profile is never similar enough to the affirmative one
+NEGATIONS = re.compile(r"kein\w*|nicht|ohne|nie|niemals")
+NEGATION_WEIGHT = 4.0
+# Locality-sensitive hashing: a 64-bit SimHash in 8 bands of 8 bits. Profiles with a cosine
+# similarity of 0.9 share at least one band with a probability of about 93%.
+SIGNATURE_BITS = 64
+BAND_BITS = 8
+
+# --- Profile vectors ---
+def normalize_profile(text: str) -> str:
+    """Case, punctuation and whitespace are ignored; "1,8" and "1.8" are the same grade."""
+    text = re.sub(r"(\d),(\d)", r"\1.\2", text.casefold())
+    return " ".join(re.findall(r"\w+(?:\.\d+)?", text))
+
+def _feature(name: str) -> int:
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "big")
+
+def embed(text: str) -> dict[int, float]:
+    """
+    Sparse vector of hashed words and character trigrams of the normalized
+    text, unit length. Trigrams make inflections and typos count as close;
+    a negation becomes a feature of its own together with the next word.
+    """
+    counts: dict[int, float] = {}
+    words = normalize_profile(text).split()
+    for i, word in enumerate(words):
+        if NEGATIONS.fullmatch(word):
+            negated = words[i + 1] if i + 1 < len(words) else ""
+            features = [(f"w:{word}", NEGATION_WEIGHT), (f"neg:{negated}", NEGATION_WEIGHT)]
+        elif any(c.isdigit() for c in word):
+            features = [(f"n:{word}", NUMBER_WEIGHT)]
+        else:
+            padded = f" {word} "
+            features = [(f"w:{word}", 1.0)] + [(f"c:{padded[i:i + 3]}", 1.0) for i in range(len(padded) - 2)]
+        for name, weight in features:
+            feature = _feature(name)
+            counts[feature] = counts.get(feature, 0.0) + weight
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    return {feature: v / norm for feature, v in counts.items()} if norm else {}
+
+def cosine(a: dict[int, float], b: dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(feature, 0.0) for feature, weight in a.items())
+
+def simhash(vector: dict[int, float]) -> int:
+    """Sign of the vector's projection on 64 random hyperplanes, taken from the feature hashes."""
+    totals = [0.0] * SIGNATURE_BITS
+    for feature, weight in vector.items():
+        for bit in range(SIGNATURE_BITS):
+            totals[bit] += weight if feature >> bit & 1 else -weight
+    return sum(1 << bit for bit, total in enumerate(totals) if total > 0)
+
+def band_keys(signature: int) -> List[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [band << BAND_BITS | (signature >> (band * BAND_BITS) & mask) for band in range(SIGNATURE_BITS // BAND_BITS)]
+
+# --- Conversations ---
+def first_profile(messages: List[BaseMessage]) -> Optional[str]:
+    """
+    The user's profile if the conversation is in its first run (one user message,
+    no answer yet, no question to the user), so its answer depends on nothing but
+    the profile.
+    """
+    human = [m for m in messages if isinstance(m, HumanMessage)]
+    if len(human) != 1 or not isinstance(human[0].content, str):
+        return None
+    for message in messages:
+        if isinstance(message, AIMessage):
+            if not message.tool_calls or any(call["name"] == HUMAN_FEEDBACK_TOOL for call in message.tool_calls):
+                return None
+    return human[0].content
+
+class CachedAnswer(NamedTuple):
+    result: dict
+    similarity: float
+    stored_at: float
+
+# --- Cache ---
+class AnswerCache(SqliteStore):
+    """
+    Final recommendations of earlier conversations, found by the similarity of
+    their profiles. Candidates come from the LSH bands (an index lookup instead
+    of a scan), the best one above `threshold` by exact cosine similarity counts.
+    Shared by all worker processes; entries expire after `ttl_seconds`, and the
+    oldest beyond `max_entries` are dropped.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS answers (
+            id INTEGER PRIMARY KEY,
+            profile TEXT UNIQUE NOT NULL,
+            vector TEXT NOT NULL,
+            result TEXT NOT NULL,
+            stored_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS answers_stored_at ON answers (stored_at);
+        CREATE TABLE IF NOT EXISTS answer_bands (
+            key INTEGER NOT NULL,
+            answer_id INTEGER NOT NULL,
+            PRIMARY KEY (key, answer_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS answer_bands_answer ON answer_bands (answer_id);
+        CREATE TRIGGER IF NOT EXISTS answers_delete AFTER DELETE ON answers BEGIN
+            DELETE FROM answer_bands WHERE answer_id = old.id;
+        END;
+    """
+
+    def __init__(
+        self,
+        path: str = ANSWER_CACHE_PATH,
+        *,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+    ) -> None:
+        super().__init__(path)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+        CACHE_EVENTS.labels("answer", name).inc()
+
+    def lookup(self, profile: str) -> Optional[CachedAnswer]:
+        """The cached answer of the most similar fresh profile, if it is similar enough."""
+        vector = embed(profile)
+        best = None
+        if vector:
+            keys = band_keys(simhash(vector))
+            rows = self._conn().execute(
+                f"""
+                SELECT vector, result, stored_at FROM answers
+                WHERE stored_at >= ? AND id IN (
+                    SELECT answer_id FROM answer_bands WHERE key IN ({", ".join("?" * len(keys))})
+                )
+                """,
+                (time.time() - self.ttl_seconds, *keys),
+            ).fetchall()
+            for stored_vector, result, stored_at in rows:
+                similarity = cosine(vector, {int(f): w for f, w in json.loads(stored_vector)})
+                if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                    best = CachedAnswer(json.loads(result), similarity, stored_at)
+        self._count("hits" if best else "misses")
+        return best
+
+    def put(self, profile: str, result: dict) -> None:
+        """Stores (or refreshes) the answer to a profile and prunes expired and surplus entries."""
+        vector = embed(profile)
+        if not vector:
+            return
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM answers WHERE profile = ? OR stored_at < ?", (normalize_profile(profile), now - self.ttl_seconds))
+            answer_id = conn.execute(
+                "INSERT INTO answers (profile, vector, result, stored_at) VALUES (?, ?, ?, ?)",
+                (normalize_profile(profile), json.dumps(list(vector.items())), json.dumps(result, ensure_ascii=False), now),
+            ).lastrowid
+            conn.executemany(
+                "INSERT OR IGNORE INTO answer_bands VALUES (?, ?)",
+                [(key, answer_id) for key in band_keys(simhash(vector))],
+            )
+            conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> dict:
+        (entries,) = self._conn().execute("SELECT COUNT(*) FROM answers").fetchone()
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {**counters, "hit_rate": counters["hits"] / lookups if lookups else 0.0, "entries": entries}
+
+answer_cache = AnswerCache()
@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Iterable, List, NamedTuple, Optional
+
+from agent.config import (
+    CATALOG_CONCURRENCY,
+    CATALOG_MAX_DEPTH,
+    CATALOG_MAX_PAGES_PER_SITE,
+    CATALOG_PATH,
+)
+from agent.crawler import crawl, site_of
+from agent.extraction import Page, extract_page, header_charset
+from agent.http_client import HttpClient, http_client
+from agent.page_cache import normalize_url
+from agent.storage import SqliteStore
+
+# Links worth following from a university site towards programme pages
+PROGRAMME_LINK_PATTERN = re.compile(r"studi|bachelor|master|programm|program|course|degree|lehramt", re.IGNORECASE)
+DEGREE_PATTERNS = [
+    ("Bachelor", re.compile(r"\bBachelor\b|\bB\.\s?(?:Sc|A|Eng|Ed|Mus)\.?", re.IGNORECASE)),
+    ("Master", re.compile(r"\bMaster\b|\bM\.\s?(?:Sc|A|Eng|Ed|Mus)\.?", re.IGNORECASE)),
+    ("Staatsexamen", re.compile(r"Staatsexamen|Staatsprüfung", re.IGNORECASE)),
+    ("Diplom", re.compile(r"\bDiplom\b", re.IGNORECASE)),
+]
+# A programme page states at least two of these
+PROGRAMME_FACTS = re.compile(r"Regelstudienzeit|Studienbeginn|Studienform|Abschluss|Zulassung|Bewerbung|Unterrichtssprache|Lehrsprache", re.IGNORECASE)
+LANGUAGE_PATTERN = re.compile(
+    r"(?:Unterrichtssprache|Lehrsprache|Sprache|Language of instruction|Teaching language)\s*:?\s*((?:Deutsch|Englisch|German|English)(?:\s*(?:und|/|and|,)\s*(?:Deutsch|Englisch|German|English))?)",
+    re.IGNORECASE,
+)
+DURATION_PATTERN = re.compile(r"Regelstudienzeit\s*:?\s*(\d{1,2})\s*Semester", re.IGNORECASE)
+ADMISSION_PATTERN = re.compile(r"zulassungs(?:frei|beschränkt)|Numerus clausus|\bNC\b|Zulassungsvoraussetzung|Eignungs(?:feststellung|prüfung)|Aufnahmeprüfung", re.IGNORECASE)
+INCOME_PATTERN = re.compile(r"Gehalt|Einkommen|Verdienst|verdien", re.IGNORECASE)
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n")
+LANGUAGE_NAMES = {"deutsch": "Deutsch", "german": "Deutsch", "englisch": "Englisch", "english": "Englisch"}
+MAX_NOTE_CHARS = 300
+
+class Programme(NamedTuple):
+    url: str
+    title: str
+    university: str
+    degree: Optional[str]  # "Bachelor", "Master", "Staatsexamen" or "Diplom"
+    language: Optional[str]
+    duration_semesters: Optional[int]
+    admission: Optional[str]
+    income: Optional[str]
+
+def _sentences_matching(passages: List[str], pattern: re.Pattern) -> Optional[str]:
+    sentences = [s.strip() for p in passages for s in SENTENCE_PATTERN.split(p) if pattern.search(s)]
+    if not sentences:
+        return None
+    note = " ".join(dict.fromkeys(sentences))
+    return note if len(note) <= MAX_NOTE_CHARS else note[:MAX_NOTE_CHARS].rstrip() + "…"
+
+def _university(url: str, page: Page, title: str) -> str:
+    # "Informatik (B.Sc.) | TU München" -> "TU München"
+    for separator in (" | ", " – ", " - "):
+        parts = [part.strip() for part in page.title.split(separator) if part.strip()]
+        if len(parts) > 1 and parts[-1] != title:
+            return parts[-1]
+    return site_of(url)
+
+def extract_programme(url: str, page: Page) -> Optional[Programme]:
+    """Heuristic programme record of a page, or None if it is not a programme page."""
+    title = page.headings[0] if page.headings else page.title
+    if not title:
+        return None
+    text = "\n".join(page.passages)
+    degree = next((name for name, pattern in DEGREE_PATTERNS if pattern.search(title)), None)
+    if degree is None or len(set(m.lower() for m in PROGRAMME_FACTS.findall(text))) < 2:
+        return None
+
+    language = None
+    if match := LANGUAGE_PATTERN.search(text):
+        names = re.findall(r"deutsch|englisch|german|english", match.group(1), re.IGNORECASE)
+        language = " und ".join(dict.fromkeys(LANGUAGE_NAMES[name.lower()] for name in names))
+    duration = DURATION_PATTERN.search(text)
+    return Programme(
+        url=normalize_url(url),
+        title=title,
+        university=_university(url, page, title),
+        degree=degree,
+        language=language,
+        duration_semesters=int(duration.group(1)) if duration else None,
+        admission=_sentences_matching(page.passages, ADMISSION_PATTERN),
+        income=_sentences_matching(page.passages, INCOME_PATTERN),
+    )
+
+# --- Store ---
+class CatalogStore(SqliteStore):
+    """
+    Study programmes extracted from university sites, plus what is needed to
+    refresh them incrementally: validators, content hash and links of each
+    crawled page.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT NOT NULL,
+            links TEXT NOT NULL,
+            checked_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS programmes (
+            url TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            university TEXT NOT NULL,
+            degree TEXT,
+            language TEXT,
+            duration_semesters INTEGER,
+            admission TEXT,
+            income TEXT,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS programmes_degree ON programmes (degree);
+    """
+
+    def __init__(self, path: str = CATALOG_PATH) -> None:
+        super().__init__(path)
+
+    def page(self, url: str) -> Optional[tuple]:
+        """(etag, last_modified, content_hash, links) of a crawled page."""
+        row = self._conn().execute(
+            "SELECT etag, last_modified, content_hash, links FROM pages WHERE url = ?", (normalize_url(url),)
+        ).fetchone()
+        return None if row is None else (row[0], row[1], row[2], json.loads(row[3]))
+
+    def save_page(self, url: str, etag: Optional[str], last_modified: Optional[str], content_hash: str, links: List[str], programme: Optional[Programme]) -> None:
+        key = normalize_url(url)
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, content_hash, json.dumps(links), now),
+            )
+            if programme is None:
+                conn.execute("DELETE FROM programmes WHERE url = ?", (key,))
+            else:
+                conn.execute("INSERT OR REPLACE INTO programmes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (*programme, now))
+
+    def touch_page(self, url: str) -> None:
+        with self._conn() as conn:
+            conn.execute("UPDATE pages SET checked_at = ? WHERE url = ?", (time.time(), normalize_url(url)))
+
+    def remove_page(self, url: str) -> None:
+        key = normalize_url(url)
+        with self._conn() as conn:
+            conn.execute("DELETE FROM pages WHERE url = ?", (key,))
+            conn.execute("DELETE FROM programmes WHERE url = ?", (key,))
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        *,
+        university: Optional[str] = None,
+        degree: Optional[str] = None,
+        language: Optional[str] = None,
+        limit: int = 10,
+    ) -> List[Programme]:
+        """Programmes whose title contains every query word and that match all given filters."""
+        conditions, params = [], []
+        for word in re.findall(r"\w+", query or ""):
+            conditions.append("title LIKE ?")
+            params.append(f"%{word}%")
+        if university:
+            # Pages without a site name in their title are stored under the domain
+            conditions.append("(university LIKE ? OR url LIKE ?)")
+            params += [f"%{university}%", f"%{university}%"]
+        for column, value in (("degree", degree), ("language", language)):
+            if value:
+                conditions.append(f"{column} LIKE ?")
+                params.append(f"%{value}%")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._conn().execute(
+            f"SELECT url, title, university, degree, language, duration_semesters, admission, income "
+            f"FROM programmes {where} ORDER BY university, title LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [Programme(*row) for row in rows]
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        (pages,) = conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+        (programmes,) = conn.execute("SELECT COUNT(*) FROM programmes").fetchone()
+        return {"pages": pages, "programmes": programmes}
+
+# --- Builder ---
+async def build_catalog(
+    seeds: Iterable[str],
+    store: CatalogStore,
+    *,
+    max_pages_per_site: int = CATALOG_MAX_PAGES_PER_SITE,
+    max_depth: int = CATALOG_MAX_DEPTH,
+    concurrency: int = CATALOG_CONCURRENCY,
+    client: HttpClient = http_client,
+) -> dict:
+    """
+    Crawls the seed sites (all at once, `concurrency` pages per site) and
+    updates the catalog. Pages answering 304 or with an unchanged body are not
+    parsed again; their stored links keep the crawl going.
+    """
+    counts = {"fetched": 0, "not_modified": 0, "unchanged": 0, "processed": 0, "programmes": 0, "removed": 0, "failed": 0}
+
+    async def visit(url: str, depth: int) -> List[str]:
+        stored = await asyncio.to_thread(store.page, url)
+        headers = {}
+        if stored is not None:
+            if stored[0]:
+                headers["If-None-Match"] = stored[0]
+            if stored[1]:
+                headers["If-Modified-Since"] = stored[1]
+        try:
+            response = await client.aget(url, headers=headers)
+        except Exception:
+            counts["failed"] += 1
+            raise
+        counts["fetched"] += 1
+
+        if response.status_code in (404, 410):
+            await asyncio.to_thread(store.remove_page, url)
+            counts["removed"] += 1
+            return []
+        if response.status_code == 304 and stored is not None:
+            await asyncio.to_thread(store.touch_page, url)
+            counts["not_modified"] += 1
+            return stored[3]
+        response.raise_for_status()
+
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if stored is not None and stored[2] == content_hash:
+            await asyncio.to_thread(store.touch_page, url)
+            counts["unchanged"] += 1
+            return stored[3]
+
+        page = await asyncio.to_thread(extract_page, response.content, response.url, header_charset(response.headers.get("Content-Type")))
+        programme = extract_programme(url, page)
+        await asyncio.to_thread(
+            store.save_page, url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+            content_hash, page.links, programme,
+        )
+        counts["processed"] += 1
+        if programme is not None:
+            counts["programmes"] += 1
+        return page.links
+
+    def follow(url: str) -> bool:
+        return bool(PROGRAMME_LINK_PATTERN.search(url))
+
+    await asyncio.gather(*(
+        crawl([seed], visit, max_pages=max_pages_per_site, max_depth=max_depth, concurrency=concurrency, follow=follow, client=client)
+        for seed in seeds
+    ))
+    return counts
+
+catalog_store = CatalogStore()
@@ -0,0 +1,296 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+from agent.storage import SqliteStore
+
+from agent.config import (
+    CHECKPOINTER,
+    CHECKPOINT_DB_PATH,
+    CHECKPOINT_MAX_THREADS,
+    CHECKPOINT_TTL_SECONDS,
+)
+
+# --- In-memory store with LRU and TTL eviction ---
+class LRUMemorySaver(InMemorySaver):
+    """
+    An InMemorySaver that forgets whole threads once they are idle for `ttl_seconds`
+    or when more than `max_threads` threads are stored (least recently used first).
+    Only shared within one process.
+    """
+
+    def __init__(self, *, max_threads: int = CHECKPOINT_MAX_THREADS, ttl_seconds: float = CHECKPOINT_TTL_SECONDS, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self._last_used: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _touch(self, config: RunnableConfig) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        now = time.monotonic()
+        with self._lock:
+            self._last_used[thread_id] = now
+            self._last_used.move_to_end(thread_id)
+            # The oldest entries sit at the front, so stop at the first one we keep
+            while self._last_used:
+                oldest_id, last_used = next(iter(self._last_used.items()))
+                if len(self._last_used) <= self.max_threads and now - last_used <= self.ttl_seconds:
+                    break
+                self.delete_thread(oldest_id)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            if thread_id not in self._last_used:
+                return None
+            self._touch(config)
+            return super().get_tuple(config)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        with self._lock:
+            self._touch(config)
+            return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        with self._lock:
+            self._touch(config)
+            super().put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._last_used.pop(thread_id, None)
+            super().delete_thread(thread_id)
+
+# --- SQLite store shared by all worker processes ---
+class SqliteSaver(SqliteStore, BaseCheckpointSaver[int]):
+    """
+    Stores checkpoints in a SQLite database (WAL mode), so every gunicorn worker
+    can resume every thread. Threads idle for longer than `ttl_seconds` are pruned.
+    """
+
+    PRUNE_INTERVAL_SECONDS = 60
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            thread_id TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL DEFAULT '',
+            checkpoint_id TEXT NOT NULL,
+            parent_checkpoint_id TEXT,
+            type TEXT,
+            checkpoint BLOB,
+            metadata TEXT,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+        );
+        CREATE TABLE IF NOT EXISTS writes (
+            thread_id TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL DEFAULT '',
+            checkpoint_id TEXT NOT NULL,
+            task_id TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            channel TEXT NOT NULL,
+            type TEXT,
+            value BLOB,
+            task_path TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+        );
+        CREATE INDEX IF NOT EXISTS checkpoints_updated_at ON checkpoints (updated_at);
+    """
+
+    def __init__(self, path: str = CHECKPOINT_DB_PATH, *, ttl_seconds: float = CHECKPOINT_TTL_SECONDS, **kwargs: Any) -> None:
+        SqliteStore.__init__(self, path)
+        BaseCheckpointSaver.__init__(self, **kwargs)
+        self.ttl_seconds = ttl_seconds
+        self._last_prune = 0.0
+
+    def _row_to_tuple(self, row: tuple, conn: sqlite3.Connection) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata = row
+        writes = conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=json.loads(metadata),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata"
+        conn = self._conn()
+        if checkpoint_id := get_checkpoint_id(config):
+            row = conn.execute(
+                f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchone()
+        else:
+            row = conn.execute(
+                f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            ).fetchone()
+        if row is None or (self.ttl_seconds and self._is_expired(thread_id, conn)):
+            return None
+        return self._row_to_tuple(row, conn)
+
+    def _is_expired(self, thread_id: str, conn: sqlite3.Connection) -> bool:
+        (updated_at,) = conn.execute(
+            "SELECT MAX(updated_at) FROM checkpoints WHERE thread_id = ?", (thread_id,)
+        ).fetchone()
+        return updated_at is not None and time.time() - updated_at > self.ttl_seconds
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata FROM checkpoints"
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        conn = self._conn()
+        for row in conn.execute(query, params).fetchall():
+            if limit is not None and limit <= 0:
+                break
+            checkpoint_tuple = self._row_to_tuple(row, conn)
+            if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = json.dumps(get_checkpoint_metadata(config, metadata), default=str)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized,
+                    serialized_metadata,
+                    time.time(),
+                ),
+            )
+        self._maybe_prune()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special channels (errors, interrupts) keep their first write; regular ones are replaced
+        verb = "INSERT OR REPLACE" if all(c in WRITES_IDX_MAP for c, _ in writes) else "INSERT OR IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel, type_, serialized, task_path))
+        with self._conn() as conn:
+            conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    def _maybe_prune(self) -> None:
+        """Drops threads whose newest checkpoint is older than the TTL, at most once a minute."""
+        now = time.time()
+        if not self.ttl_seconds or now - self._last_prune < self.PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_prune = now
+        cutoff = now - self.ttl_seconds
+        with self._conn() as conn:
+            expired = [
+                thread_id
+                for (thread_id,) in conn.execute(
+                    "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(updated_at) < ?", (cutoff,)
+                )
+            ]
+            conn.executemany("DELETE FROM checkpoints WHERE thread_id = ?", [(t,) for t in expired])
+            conn.executemany("DELETE FROM writes WHERE thread_id = ?", [(t,) for t in expired])
+
+    # SQLite calls are quick but blocking, so the async API runs them in a worker thread
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+# --- Factory ---
+def create_checkpointer(kind: str = CHECKPOINTER) -> Optional[BaseCheckpointSaver]:
+    """Builds the checkpointer selected by the CHECKPOINTER setting."""
+    if kind == "memory":
+        return LRUMemorySaver()
+    if kind == "sqlite":
+        return SqliteSaver()
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown CHECKPOINTER '{kind}', expected 'memory', 'sqlite' or 'none'")
@@ -7,6 +7,126 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
+# Models: tool-selection steps run on RESEARCH_MODEL, the recommendations are written by FINAL_MODEL
+# (set both to the same model to turn the routing off)
+FINAL_MODEL = os.getenv("FINAL_MODEL", "gpt-4o")
+RESEARCH_MODEL = os.getenv("RESEARCH_MODEL", "gpt-4o-mini")
+MODEL_TEMPERATURE = float(os.getenv("MODEL_TEMPERATURE", "0.7"))
+# Escalation to FINAL_MODEL: for the rest of a conversation after this many model calls (0 = never),
+# and for answers of the research model that aren't valid JSON. ESCALATE_ON_ANSWER=true has every
+# answer of the research model rewritten, which about doubles the time and tokens of the last step.
+ESCALATE_AFTER_STEPS = int(os.getenv("ESCALATE_AFTER_STEPS", "8"))
+ESCALATE_ON_ANSWER = os.getenv("ESCALATE_ON_ANSWER", "false").lower() == "true"
+# Answers that don't match the recommendations schema are sent back to FINAL_MODEL this often
+ANSWER_REPAIR_ATTEMPTS = int(os.getenv("ANSWER_REPAIR_ATTEMPTS", "1"))
+
+# Directory for the agent's local state (checkpoints, caches, indexes)
+DATA_DIR = os.getenv("FUTEDU_DATA_DIR", ".futedu")
+
+# Tool execution: let the model batch independent tool calls and run them concurrently
+PARALLEL_TOOL_CALLS = os.getenv("PARALLEL_TOOL_CALLS", "false").lower() == "true"
+MAX_PARALLEL_TOOL_CALLS = int(os.getenv("MAX_PARALLEL_TOOL_CALLS", "4"))
+TOOL_CALL_TIMEOUT_SECONDS = float(os.getenv("TOOL_CALL_TIMEOUT_SECONDS", "60"))
+
+# Conversation checkpointing: "sqlite" (shared by all workers), "memory" (per process, only for a
+# single worker: a turn served by another worker would not see the earlier ones) or "none"
+CHECKPOINTER = os.getenv("CHECKPOINTER", "sqlite").lower()
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join(DATA_DIR, "checkpoints.sqlite"))
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_SECONDS", "86400"))
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "1000"))
+
+# Shared HTTP client used by the fetching tools
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_MAX_RESPONSE_BYTES = int(os.getenv("HTTP_MAX_RESPONSE_BYTES", str(2 * 1024 * 1024)))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "4"))
+HTTP_HOST_MIN_INTERVAL_SECONDS = float(os.getenv("HTTP_HOST_MIN_INTERVAL_SECONDS", "0.25"))
+
+# On-disk cache for pages fetched by scrape_website_tool and find_links_tool
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", os.path.join(DATA_DIR, "page_cache.sqlite"))
+PAGE_CACHE_TTL_SECONDS = int(os.getenv("PAGE_CACHE_TTL_SECONDS", "86400"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Cache for web_search results (in memory, optionally persisted to SQLite)
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(6 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+SEARCH_CACHE_PERSISTENT = os.getenv("SEARCH_CACHE_PERSISTENT", "false").lower() == "true"
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join(DATA_DIR, "search_cache.sqlite"))
+
+# Text extraction of scrape_website_tool
+EXTRACTION_MAX_BYTES = int(os.getenv("EXTRACTION_MAX_BYTES", str(1024 * 1024)))
+EXTRACTION_MAX_CHARS = int(os.getenv("EXTRACTION_MAX_CHARS", "5000"))
+EXTRACTION_CHUNK_CHARS = int(os.getenv("EXTRACTION_CHUNK_CHARS", "800"))
+
+# crawl_site_tool: budgets of one multi-page crawl
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "25"))
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "3"))
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+CRAWL_MAX_CHARS = int(os.getenv("CRAWL_MAX_CHARS", "6000"))
+CRAWL_TIMEOUT_SECONDS = int(os.getenv("CRAWL_TIMEOUT_SECONDS", "45"))
+
+# Local full-text index of everything the research tools fetched
+KNOWLEDGE_INDEX_ENABLED = os.getenv("KNOWLEDGE_INDEX_ENABLED", "true").lower() == "true"
+KNOWLEDGE_INDEX_PATH = os.getenv("KNOWLEDGE_INDEX_PATH", os.path.join(DATA_DIR, "knowledge.sqlite"))
+KNOWLEDGE_MAX_AGE_SECONDS = int(os.getenv("KNOWLEDGE_MAX_AGE_SECONDS", str(30 * 86400)))
+KNOWLEDGE_MAX_DOCUMENTS = int(os.getenv("KNOWLEDGE_MAX_DOCUMENTS", "50000"))
+
+# Semantic cache of final recommendations, keyed by the first profile of a conversation:
+# "off" (default), "answer" (near-identical profiles get the cached answer) or "seed" (the agent verifies it)
+ANSWER_CACHE_MODE = os.getenv("ANSWER_CACHE_MODE", "off").lower()
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join(DATA_DIR, "answer_cache.sqlite"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.9"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 86400)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+# Study-programme catalog built ahead of time by catalog.py
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "true").lower() == "true"
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(DATA_DIR, "catalog.sqlite"))
+CATALOG_SEEDS_FILE = os.getenv("CATALOG_SEEDS_FILE", "catalog_seeds.txt")
+CATALOG_MAX_PAGES_PER_SITE = int(os.getenv("CATALOG_MAX_PAGES_PER_SITE", "200"))
+CATALOG_MAX_DEPTH = int(os.getenv("CATALOG_MAX_DEPTH", "3"))
+CATALOG_CONCURRENCY = int(os.getenv("CATALOG_CONCURRENCY", "4"))
+
+# Scheduler for OpenAI and Tavily calls: limits shared by all worker processes (per minute, 0 = unlimited),
+# retries with jittered backoff on 429/5xx, and how long a call may wait for its turn
+OPENAI_REQUESTS_PER_MINUTE = float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "0"))
+OPENAI_TOKENS_PER_MINUTE = float(os.getenv("OPENAI_TOKENS_PER_MINUTE", "0"))
+TAVILY_REQUESTS_PER_MINUTE = float(os.getenv("TAVILY_REQUESTS_PER_MINUTE", "0"))
+SCHEDULER_DB_PATH = os.getenv("SCHEDULER_DB_PATH", os.path.join(DATA_DIR, "scheduler.sqlite"))
+SCHEDULER_MAX_RETRIES = int(os.getenv("SCHEDULER_MAX_RETRIES", "4"))
+SCHEDULER_BACKOFF_SECONDS = float(os.getenv("SCHEDULER_BACKOFF_SECONDS", "1"))
+SCHEDULER_MAX_WAIT_SECONDS = float(os.getenv("SCHEDULER_MAX_WAIT_SECONDS", "20"))
+SCHEDULER_BATCH_MAX_WAIT_SECONDS = float(os.getenv("SCHEDULER_BATCH_MAX_WAIT_SECONDS", "600"))
+# Share of each limit that batch work leaves to interactive /chat requests
+SCHEDULER_INTERACTIVE_RESERVE = float(os.getenv("SCHEDULER_INTERACTIVE_RESERVE", "0.2"))
+
+# Batch mode (batch.py): profiles processed at the same time and questions answered per profile
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "3"))
+
+# Budgets of one agent run (one /chat request): graph steps, wall time, and the time kept
+# for the final "answer with what you have" LLM call
+RUN_MAX_STEPS = int(os.getenv("RUN_MAX_STEPS", "25"))
+RUN_TIMEOUT_SECONDS = float(os.getenv("RUN_TIMEOUT_SECONDS", "120"))
+FINAL_ANSWER_RESERVE_SECONDS = float(os.getenv("FINAL_ANSWER_RESERVE_SECONDS", "20"))
+
+# Observability: log level of the API and per-request trace spans (logged as JSON by the "agent.trace" logger)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+TRACE_REQUESTS = os.getenv("TRACE_REQUESTS", "false").lower() == "true"
+
+# Startup: build the graph, model client and tools on the first request (fast worker boot)
+# or, with false, while each worker starts
+LAZY_INIT = os.getenv("LAZY_INIT", "true").lower() == "true"
+
+# Token budget for the messages sent to the LLM; older tool results are compacted beyond it
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "24000"))
+CONTEXT_KEEP_RECENT_TURNS = int(os.getenv("CONTEXT_KEEP_RECENT_TURNS", "2"))
+CONTEXT_TOOL_EXTRACT_CHARS = int(os.getenv("CONTEXT_TOOL_EXTRACT_CHARS", "600"))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "o200k_base")  # tiktoken encoding, or "chars" to estimate
+
 def validate_runtime_config() -> None:
     """Validate required environment variables at runtime (not import time)."""
     missing = []
@@ -0,0 +1,171 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from agent.config import (
+    CONTEXT_KEEP_RECENT_TURNS,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_TOKENIZER,
+    CONTEXT_TOOL_EXTRACT_CHARS,
+)
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators per chat message
+CACHE_SIZE = 10_000
+HUMAN_FEEDBACK_TOOL = "human_feedback_tool"
+
+# --- Token counting ---
+class TokenCounter:
+    """
+    Counts message tokens with tiktoken and remembers the count per message id,
+    so each step only tokenizes the messages added since the previous one.
+    Falls back to ~4 characters per token if the encoding is unavailable.
+    """
+
+    def __init__(self, encoding_name: Optional[str] = CONTEXT_TOKENIZER) -> None:
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._encoding_loaded = False
+        self._cache: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _encode_len(self, text: str) -> int:
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            if self.encoding_name and self.encoding_name != "chars":
+                try:
+                    import tiktoken
+                    self._encoding = tiktoken.get_encoding(self.encoding_name)
+                except Exception:
+                    self._encoding = None
+        if self._encoding is None:
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def count(self, message: BaseMessage) -> int:
+        key = f"{message.id}:{len(str(message.content))}" if message.id else None
+        if key is not None:
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return self._cache[key]
+
+        text = message.content if isinstance(message.content, str) else json.dumps(message.content, ensure_ascii=False)
+        tokens = self._encode_len(text) + MESSAGE_OVERHEAD_TOKENS
+        if isinstance(message, AIMessage) and message.tool_calls:
+            tokens += self._encode_len(json.dumps([call["args"] for call in message.tool_calls], ensure_ascii=False))
+
+        if key is not None:
+            with self._lock:
+                self._cache[key] = tokens
+                while len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return tokens
+
+    def total(self, messages: List[BaseMessage]) -> int:
+        return sum(self.count(m) for m in messages)
+
+# --- Tool result extracts ---
+_extract_cache: OrderedDict[str, str] = OrderedDict()
+_extract_lock = threading.Lock()
+
+def _extract(message: ToolMessage, max_chars: int) -> str:
+    """Short stand-in for an old tool result: search hits as title/URL lines, otherwise the beginning of the text."""
+    content = str(message.content)
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        data = None
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        lines = [f"- {r.get('title', '')}: {r.get('url', '')}" for r in data["results"] if isinstance(r, dict)]
+        text = f"Suchergebnisse für '{data.get('query', '')}':\n" + "\n".join(lines)
+    else:
+        text = content
+    if len(text) > max_chars:
+        text = text[:max_chars].rstrip() + f" […gekürzt, {len(content)} Zeichen insgesamt]"
+    return text
+
+def _compacted(message: ToolMessage, max_chars: int) -> ToolMessage:
+    key = f"{message.id}:{max_chars}" if message.id else None
+    with _extract_lock:
+        text = _extract_cache.get(key) if key else None
+    if text is None:
+        text = _extract(message, max_chars)
+        if key:
+            with _extract_lock:
+                _extract_cache[key] = text
+                while len(_extract_cache) > CACHE_SIZE:
+                    _extract_cache.popitem(last=False)
+    return message.model_copy(update={"content": text})
+
+# --- Compaction ---
+def _recent_start(messages: List[BaseMessage], keep_turns: int) -> int:
+    """Index where the last `keep_turns` AI turns begin, including the input that triggered them."""
+    ai_indices = [i for i, m in enumerate(messages) if isinstance(m, AIMessage)]
+    if keep_turns <= 0:
+        return len(messages)
+    if len(ai_indices) <= keep_turns:
+        return 0
+    start = ai_indices[-keep_turns]
+    while start > 0 and isinstance(messages[start - 1], HumanMessage):
+        start -= 1
+    return start
+
+def compact_messages(
+    messages: List[BaseMessage],
+    *,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    keep_turns: int = CONTEXT_KEEP_RECENT_TURNS,
+    extract_chars: int = CONTEXT_TOOL_EXTRACT_CHARS,
+    counter: Optional[TokenCounter] = None,
+) -> List[BaseMessage]:
+    """
+    Returns the messages to send to the LLM, within `budget` tokens where possible.
+    The system prompt, the student's messages and the latest `keep_turns` turns
+    stay verbatim. Older tool results are replaced by extracts first; if that is
+    not enough, the oldest AI turns are dropped together with their tool results,
+    except for the agent's questions to the student and their answers.
+    The graph state itself is never modified.
+    """
+    counter = counter or token_counter
+    total = counter.total(messages)
+    if total <= budget:
+        return messages
+
+    recent_start = _recent_start(messages, keep_turns)
+    compacted = list(messages)
+
+    # 1. Replace old tool results with extracts, oldest first. The user's answers stay; the API and
+    #    the CLI create them without a tool name, so they are recognized by the question's call id.
+    answer_ids = {
+        call["id"] for m in messages if isinstance(m, AIMessage) for call in m.tool_calls if call["name"] == HUMAN_FEEDBACK_TOOL
+    }
+    for i in range(recent_start):
+        if total <= budget:
+            return compacted
+        message = compacted[i]
+        if not isinstance(message, ToolMessage) or message.tool_call_id in answer_ids or message.status == "error":
+            continue
+        replacement = _compacted(message, extract_chars)
+        total += counter.count(replacement) - counter.count(message)
+        compacted[i] = replacement
+
+    # 2. Drop the oldest turns. Tool results directly follow their AI message, so both go together;
+    #    a question to the user stays with its answer.
+    dropped = set()
+    i = 0
+    while total > budget and i < recent_start:
+        message = compacted[i]
+        if isinstance(message, AIMessage) and not any(call["id"] in answer_ids for call in message.tool_calls):
+            dropped.add(i)
+            total -= counter.count(compacted[i])
+            while i + 1 < recent_start and isinstance(compacted[i + 1], ToolMessage):
+                i += 1
+                dropped.add(i)
+                total -= counter.count(compacted[i])
+        i += 1
+    return [m for i, m in enumerate(compacted) if i not in dropped]
+
+token_counter = TokenCounter()
@@ -0,0 +1,104 @@
+import asyncio
+from typing import Awaitable, Callable, Iterable, List, Optional
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from agent.http_client import REQUEST_HEADERS, HttpClient, http_client
+from agent.page_cache import normalize_url
+
+NON_HTML_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".zip", ".docx", ".doc",
+    ".xlsx", ".pptx", ".mp3", ".mp4", ".ics", ".css", ".js", ".xml",
+)
+
+def site_of(url: str) -> str:
+    """Host without a leading "www.", so www.uni.de and uni.de count as one site."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def is_html_link(url: str) -> bool:
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and not parts.path.lower().endswith(NON_HTML_EXTENSIONS)
+
+class RobotsRules:
+    """robots.txt rules per origin, fetched once per crawl. Unreachable files allow everything."""
+
+    def __init__(self, client: HttpClient, user_agent: str = REQUEST_HEADERS["User-Agent"]) -> None:
+        self.client = client
+        self.user_agent = user_agent
+        self._parsers: dict[str, asyncio.Task] = {}
+
+    async def _load(self, origin: str) -> Optional[RobotFileParser]:
+        try:
+            response = await self.client.aget(f"{origin}/robots.txt")
+        except Exception:
+            return None
+        if response.status_code >= 400:
+            return None
+        parser = RobotFileParser()
+        parser.parse(response.content.decode("utf-8", errors="replace").splitlines())
+        return parser
+
+    async def allowed(self, url: str) -> bool:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self._parsers:
+            self._parsers[origin] = asyncio.ensure_future(self._load(origin))
+        parser = await self._parsers[origin]
+        return parser is None or parser.can_fetch(self.user_agent, url)
+
+async def crawl(
+    start_urls: Iterable[str],
+    visit: Callable[[str, int], Awaitable[Optional[List[str]]]],
+    *,
+    max_pages: int,
+    max_depth: int,
+    concurrency: int,
+    follow: Optional[Callable[[str], bool]] = None,
+    client: HttpClient = http_client,
+    respect_robots: bool = True,
+) -> None:
+    """
+    Breadth-first crawl from `start_urls`, staying on their sites. `visit(url, depth)`
+    processes a page and returns the links found on it; at most `concurrency`
+    pages are visited at a time and at most `max_pages` in total. `follow`
+    restricts which links are queued. Per-host rate limits come from `client`.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    start_urls = list(start_urls)
+    sites = {site_of(url) for url in start_urls}
+    robots = RobotsRules(client)
+    seen: set[str] = set()
+
+    def schedule(url: str, depth: int) -> None:
+        key = normalize_url(url)
+        if key in seen or len(seen) >= max_pages or depth > max_depth:
+            return
+        if not is_html_link(url) or site_of(url) not in sites:
+            return
+        if depth > 0 and follow is not None and not follow(url):
+            return
+        seen.add(key)
+        queue.put_nowait((url, depth))
+
+    async def worker() -> None:
+        while True:
+            url, depth = await queue.get()
+            try:
+                if not respect_robots or await robots.allowed(url):
+                    for link in await visit(url, depth) or []:
+                        schedule(link, depth + 1)
+            except Exception:
+                pass  # A page that fails is skipped; the rest of the crawl continues
+            finally:
+                queue.task_done()
+
+    for url in start_urls:
+        schedule(url, 0)
+    workers = [asyncio.create_task(worker()) for _ in range(max(concurrency, 1))]
+    try:
+        await queue.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,287 @@
+import codecs
+import math
+import re
+from collections import Counter
+from html.parser import HTMLParser
+from typing import List, NamedTuple, Optional
+from urllib.parse import urldefrag, urljoin
+
+from agent.config import EXTRACTION_CHUNK_CHARS, EXTRACTION_MAX_BYTES, EXTRACTION_MAX_CHARS
+
+# Elements whose content is never page text
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "select", "button", "form"}
+# Page chrome: navigation, banners and side bars, by tag or by a whole word of the class/id
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside"}
+BOILERPLATE_WORDS = {
+    "cookie", "cookies", "consent", "banner", "breadcrumb", "breadcrumbs", "menu", "navbar", "navigation",
+    "sidebar", "footer", "skip", "social", "share", "newsletter", "popup", "modal",
+}
+MAIN_TAGS = {"main", "article"}
+BLOCK_TAGS = {
+    "p", "li", "dt", "dd", "td", "th", "tr", "div", "section", "blockquote", "pre",
+    "h1", "h2", "h3", "h4", "h5", "h6", "table", "ul", "ol", "dl", "br", "caption", "figcaption",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+FEED_SIZE = 64 * 1024
+CHARSET_PATTERN = re.compile(rb"""charset=["']?([\w-]+)""", re.IGNORECASE)
+
+class Block(NamedTuple):
+    text: str
+    heading: bool
+    in_main: bool
+    link_chars: int  # characters inside <a> tags
+    boilerplate: bool  # inside page chrome (and not in a <main> nested in it)
+
+class Page(NamedTuple):
+    title: str
+    headings: List[str]
+    passages: List[str]
+    links: List[str]  # absolute http(s) links in document order, menus included
+
+def _is_boilerplate(tag: str, attributes: dict) -> bool:
+    if tag in MAIN_TAGS or tag == "body":
+        return False
+    marker = f"{attributes.get('class') or ''} {attributes.get('id') or ''}".casefold()
+    return not BOILERPLATE_WORDS.isdisjoint(re.split(r"[\s_-]+", marker))
+
+class _BlockParser(HTMLParser):
+    """
+    Splits a page into text blocks while it is fed, dropping scripts and styles.
+    Blocks of boilerplate elements (by tag, or by a class/id like "cookie-banner"
+    or "menu") are only marked: a wrapper like "layout--with-sidebar" may hold
+    the page's <main>, whose blocks then still count as content.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[Block] = []
+        self.title = ""
+        self.hrefs: List[str] = []
+        self._in_title = False
+        self._stack: List[str] = []
+        self._skip_depth: Optional[int] = None  # stack depth of the element being skipped
+        self._boilerplate_depths: List[int] = []  # stack depths of the open boilerplate elements
+        self._main_depth: Optional[int] = None
+        self._link_depth = 0
+        self._heading_depth = 0
+        self._parts: List[str] = []
+        self._link_chars = 0
+        self._heading = False
+
+    def _flush(self) -> None:
+        text = " ".join(" ".join(self._parts).split())
+        if text:
+            boilerplate = any(depth > (self._main_depth or 0) for depth in self._boilerplate_depths)
+            self.blocks.append(Block(text, self._heading, self._main_depth is not None, min(self._link_chars, len(text)), boilerplate))
+        self._parts, self._link_chars, self._heading = [], 0, False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+            return
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.hrefs.append(href)
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in VOID_TAGS:
+            return
+        self._stack.append(tag)
+        if self._skip_depth is not None:
+            return
+        if tag in SKIP_TAGS:
+            self._skip_depth = len(self._stack)
+            return
+        attributes = dict(attrs)
+        if tag in BOILERPLATE_TAGS or _is_boilerplate(tag, attributes):
+            self._flush()
+            self._boilerplate_depths.append(len(self._stack))
+        if self._main_depth is None and (tag in MAIN_TAGS or attributes.get("role") == "main"):
+            self._flush()
+            self._main_depth = len(self._stack)
+        elif tag == "a":
+            self._link_depth += 1
+        elif tag in HEADING_TAGS:
+            self._heading_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+            return
+        if tag not in self._stack:
+            return  # Stray end tag
+        while self._stack:
+            open_tag = self._stack.pop()
+            depth = len(self._stack) + 1
+            if self._skip_depth is not None:
+                if depth == self._skip_depth:
+                    self._skip_depth = None
+            elif open_tag == "a":
+                self._link_depth = max(self._link_depth - 1, 0)
+            elif open_tag in HEADING_TAGS:
+                self._heading_depth = max(self._heading_depth - 1, 0)
+            if open_tag in BLOCK_TAGS:
+                self._flush()
+            if self._main_depth is not None and depth == self._main_depth:
+                self._flush()
+                self._main_depth = None
+            if self._boilerplate_depths and depth == self._boilerplate_depths[-1]:
+                self._flush()
+                self._boilerplate_depths.pop()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title = " ".join(f"{self.title} {data}".split())
+            return
+        if self._skip_depth is not None or not data.strip():
+            return
+        self._parts.append(data)
+        if self._link_depth:
+            self._link_chars += len(data.strip())
+        if self._heading_depth:
+            self._heading = True
+
+    def close(self):
+        super().close()
+        self._flush()
+
+def _known_charset(name: Optional[str]) -> Optional[str]:
+    try:
+        return codecs.lookup(name).name if name else None
+    except LookupError:
+        return None
+
+def header_charset(content_type: Optional[str]) -> Optional[str]:
+    """The charset of a Content-Type header value, e.g. "text/html; charset=ISO-8859-1"."""
+    match = CHARSET_PATTERN.search((content_type or "").encode("latin-1", "replace"))
+    return match.group(1).decode("ascii") if match else None
+
+def _sniff_charset(head: bytes) -> str:
+    match = CHARSET_PATTERN.search(head[:4096])
+    return _known_charset(match.group(1).decode("ascii") if match else None) or "utf-8"
+
+def _parse(html: bytes, max_bytes: int, charset: Optional[str] = None) -> _BlockParser:
+    # The charset of the HTTP header wins over a <meta> declaration in the page
+    decoder = codecs.getincrementaldecoder(_known_charset(charset) or _sniff_charset(html))(errors="replace")
+    parser = _BlockParser()
+    html = html[:max_bytes]
+    for start in range(0, len(html), FEED_SIZE):
+        parser.feed(decoder.decode(html[start:start + FEED_SIZE]))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser
+
+def parse_blocks(html: bytes, max_bytes: int = EXTRACTION_MAX_BYTES, charset: Optional[str] = None) -> List[Block]:
+    """Parses at most `max_bytes` of the page incrementally and returns its text blocks."""
+    return _parse(html, max_bytes, charset).blocks
+
+def main_content(blocks: List[Block]) -> List[Block]:
+    """
+    Keeps the blocks of <main>/<article> if the page has one, and drops page
+    chrome and link lists (blocks that are mostly link text, e.g. leftover
+    menus). If that leaves nothing, all blocks count.
+    """
+    if any(block.in_main for block in blocks):
+        blocks = [block for block in blocks if block.in_main]
+    content = [block for block in blocks if not block.boilerplate and (block.heading or block.link_chars < 0.6 * len(block.text))]
+    return content or blocks
+
+# --- Chunking and ranking ---
+def chunk_blocks(blocks: List[Block], chunk_chars: int = EXTRACTION_CHUNK_CHARS) -> List[str]:
+    """
+    Groups consecutive blocks into passages of about `chunk_chars` characters.
+    A heading starts a new passage so that it stays with the text below it.
+    """
+    passages, current, size = [], [], 0
+    for block in blocks:
+        if current and (size + len(block.text) > chunk_chars or block.heading):
+            passages.append("\n".join(current))
+            current, size = [], 0
+        current.append(block.text)
+        size += len(block.text)
+    if current:
+        passages.append("\n".join(current))
+    return passages
+
+def _terms(text: str) -> List[str]:
+    return re.findall(r"\w+", text.casefold())
+
+def rank_passages(passages: List[str], query: str, k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """
+    BM25 scores of the passages for the query. A query term also matches longer
+    words containing it, so "gebühren" finds "Studiengebühren".
+    """
+    query_terms = set(_terms(query))
+    documents = [Counter(_terms(passage)) for passage in passages]
+    if not query_terms or not documents:
+        return [0.0] * len(passages)
+
+    def frequency(term: str, words: Counter) -> int:
+        if len(term) < 4:
+            return words.get(term, 0)
+        return sum(count for word, count in words.items() if term in word)
+
+    frequencies = [{term: frequency(term, words) for term in query_terms} for words in documents]
+    lengths = [sum(words.values()) for words in documents]
+    average_length = sum(lengths) / len(lengths) or 1
+    idf = {}
+    for term in query_terms:
+        containing = sum(1 for f in frequencies if f[term])
+        idf[term] = math.log(1 + (len(passages) - containing + 0.5) / (containing + 0.5))
+    scores = []
+    for term_frequencies, length in zip(frequencies, lengths):
+        score = 0.0
+        for term, tf in term_frequencies.items():
+            if tf:
+                score += idf[term] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average_length))
+        scores.append(score)
+    return scores
+
+def select_passages(passages: List[str], query: Optional[str] = None, max_chars: int = EXTRACTION_MAX_CHARS) -> List[str]:
+    """
+    Picks passages within `max_chars`: the best matches for `query` if any
+    passage matches it, otherwise the beginning of the page. The selection is
+    returned in page order.
+    """
+    order = list(range(len(passages)))
+    if query:
+        scores = rank_passages(passages, query)
+        if any(scores):
+            order.sort(key=lambda i: scores[i], reverse=True)
+
+    selected, used = [], 0
+    for i in order:
+        if used + len(passages[i]) > max_chars:
+            if not selected:
+                selected.append(i)  # Always return something, even if cut
+            break
+        selected.append(i)
+        used += len(passages[i]) + 2
+    return [passages[i][:max_chars] for i in sorted(selected)]
+
+def resolve_links(base_url: str, hrefs: List[str]) -> List[str]:
+    """Unique absolute http(s) links without fragments, in document order."""
+    links = {}
+    for href in hrefs:
+        absolute_url = urldefrag(urljoin(base_url, href.strip())).url
+        if absolute_url.startswith(("http://", "https://")):
+            links.setdefault(absolute_url, None)
+    return list(links)
+
+def extract_page(html: bytes, url: str = "", charset: Optional[str] = None) -> Page:
+    """
+    Title, headings, main-content passages and links of a page. `charset` is
+    the one of the Content-Type header; without it the page's <meta> counts.
+    """
+    parser = _parse(html, EXTRACTION_MAX_BYTES, charset)
+    blocks = main_content(parser.blocks)
+    headings = [block.text for block in blocks if block.heading]
+    return Page(parser.title, headings, chunk_blocks(blocks), resolve_links(url, parser.hrefs))
+
+def extract_text(html: bytes, query: Optional[str] = None, max_chars: int = EXTRACTION_MAX_CHARS, charset: Optional[str] = None) -> str:
+    """Main text of a page, reduced to the passages most relevant to `query`."""
+    return "\n\n".join(select_passages(extract_page(html, charset=charset).passages, query, max_chars))
@@ -1,17 +1,48 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
 from langgraph.graph.message import add_messages
-from langchain_core.messages import BaseMessage, AIMessage
-from typing import TypedDict, Annotated, List
+from langgraph.managed import RemainingSteps
+from langchain_core.messages import BaseMessage, AIMessage, SystemMessage, ToolMessage, ToolCall
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from typing import TypedDict, Annotated, List, Optional
 from pydantic import SecretStr
 
 # --- Import project-specific components ---
-from agent.config import OPENAI_API_KEY
+from agent.answer import parse_result, result_or_none
+from agent.answer_cache import answer_cache, first_profile
+from agent.config import (
+    ANSWER_CACHE_MODE,
+    ANSWER_REPAIR_ATTEMPTS,
+    ESCALATE_AFTER_STEPS,
+    ESCALATE_ON_ANSWER,
+    FINAL_ANSWER_RESERVE_SECONDS,
+    FINAL_MODEL,
+    MAX_PARALLEL_TOOL_CALLS,
+    MODEL_TEMPERATURE,
+    OPENAI_API_KEY,
+    PARALLEL_TOOL_CALLS,
+    RESEARCH_MODEL,
+    TOOL_CALL_TIMEOUT_SECONDS,
+)
+from agent.context import compact_messages, token_counter
+from agent.metrics import ANSWER_REPAIRS, FINAL_ANSWERS, MODEL_ESCALATIONS
+from agent.scheduler import scheduler
+from agent.system_prompt import answer_repair_prompt, answer_seed_prompt, final_answer_prompt
+from agent.startup import once, timed
 # vvv FIX IS HERE vvv
-from agent.tools import tools, human_feedback_tool # Import the specific tool function
+from agent.tools import get_tools, human_feedback_tool # Import the specific tool function
+
+logger = logging.getLogger(__name__)
 
 # --- Helper function to create the LLM ---
-def _create_llm(tools_to_bind):
+def _create_llm(model_name, tools_to_bind):
     """Creates and configures the LLM, keeping setup logic within this module."""
     if not OPENAI_API_KEY:
         return None
@@ -22,53 +53,373 @@ def _create_llm(tools_to_bind):
 
     llm = ChatOpenAI(
         api_key=SecretStr(OPENAI_API_KEY),
-        model="gpt-4o",
-        temperature=0.7
+        model=model_name,
+        temperature=MODEL_TEMPERATURE,
+        max_retries=0,  # Retried by the scheduler, which knows about the other workers
     )
+    if PARALLEL_TOOL_CALLS:
+        return llm.bind_tools(tools_to_bind, parallel_tool_calls=True)
     return llm.bind_tools(tools_to_bind)
 
 # --- 1. Define the Agent State ---
 class AgentState(TypedDict):
     messages: Annotated[List[BaseMessage], add_messages]
+    remaining_steps: RemainingSteps  # Managed by LangGraph from the run's recursion_limit
 
 # --- 2. Define the Nodes ---
-llm = _create_llm(tools)
-tool_node = ToolNode(tools)
+# The model clients are built on first use; tests and the benchmarks assign their own model here
+# (`llm` for every step, `research_llm` to route the research steps to a second one)
+llm = None
+research_llm = None
+
+RESEARCH = "research"
+FINAL = "final"
+
+@once
+def _default_llm():
+    with timed("llm"):
+        return _create_llm(FINAL_MODEL, get_tools())
 
-def llm_node(state: AgentState):
-    """Invokes the LLM with the current state's messages."""
-    if llm is None:
+@once
+def _default_research_llm():
+    if RESEARCH_MODEL == FINAL_MODEL:
+        return _default_llm()
+    with timed("research llm"):
+        return _create_llm(RESEARCH_MODEL, get_tools())
+
+def get_llm(tier: str = FINAL):
+    """The chat model for `tier` ("research" or "final"), created once per process."""
+    if tier == RESEARCH and research_llm is not None:
+        model = research_llm
+    elif llm is not None:
+        model = llm
+    else:
+        model = _default_research_llm() if tier == RESEARCH else _default_llm()
+    if model is None:
         raise RuntimeError("LLM could not be created. Is OPENAI_API_KEY set?")
-    return {"messages": [llm.invoke(state["messages"])]}
+    return model
+
+@once
+def _tools_by_name() -> dict:
+    return {t.name: t for t in get_tools()}
+
+def bound_tool_names() -> List[str]:
+    """Names of the tools the agent can call, for the system prompt."""
+    return list(_tools_by_name())
+
+# Charged to the token limit before a call and corrected by the reported usage afterwards
+COMPLETION_TOKENS_ESTIMATE = 1000
+
+def _used_tokens(message: AIMessage) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    return usage["total_tokens"] if usage else None
+
+# --- Run budgets ---
+# A research round (llm -> tools -> llm) needs this many steps; with fewer left the llm must answer
+RESEARCH_ROUND_STEPS = 3
+
+def _time_left(config: Optional[RunnableConfig]) -> Optional[float]:
+    """Seconds until the run's deadline (`configurable.deadline`, epoch seconds), if it has one."""
+    deadline = ((config or {}).get("configurable") or {}).get("deadline")
+    return deadline - time.time() if deadline else None
+
+def _budget_exhausted(state: AgentState, config: Optional[RunnableConfig]) -> Optional[str]:
+    """"steps" or "deadline" if the run has no room for another research round."""
+    if state.get("remaining_steps", RESEARCH_ROUND_STEPS) < RESEARCH_ROUND_STEPS:
+        return "steps"
+    time_left = _time_left(config)
+    if time_left is not None and time_left < FINAL_ANSWER_RESERVE_SECONDS:
+        return "deadline"
+    return None
+
+# --- Model routing ---
+def _tier(state: AgentState, forced_final: Optional[str]) -> str:
+    """The final model writes forced answers and takes over conversations that need many steps."""
+    if forced_final or get_llm(RESEARCH) is get_llm(FINAL):
+        return FINAL
+    if ESCALATE_AFTER_STEPS and sum(isinstance(m, AIMessage) for m in state["messages"]) >= ESCALATE_AFTER_STEPS:
+        MODEL_ESCALATIONS.labels("steps").inc()
+        return FINAL
+    return RESEARCH
+
+def escalation(response: AIMessage) -> Optional[str]:
+    """Why an answer of the research model is handed to the final model, if it is."""
+    if response.tool_calls:
+        return None
+    if ESCALATE_ON_ANSWER:
+        return "answer"
+    return None if result_or_none(response.content) else "invalid_json"
+
+def _llm_request(state: AgentState, config: Optional[RunnableConfig]):
+    """The tier, messages and model for this step; without budget left, a final answer without tools is requested."""
+    messages = compact_messages(state["messages"])
+    reason = _budget_exhausted(state, config)
+    tier = _tier(state, reason)
+    model = get_llm(tier)
+    if reason:
+        FINAL_ANSWERS.labels(reason).inc()
+        messages = [*messages, SystemMessage(content=final_answer_prompt)]
+        model = model.bind(tool_choice="none")
+    elif tier == RESEARCH:
+        # Lets /chat/stream hold back tokens of research answers the final model may replace
+        model = model.with_config(tags=[RESEARCH])
+    return tier, messages, model, reason
+
+# --- Final answer validation ---
+def _answer_error(response: AIMessage, forced_final: Optional[str]) -> Optional[str]:
+    """Why an answer does not match the recommendations schema; None for valid answers, tool calls and plain text."""
+    if response.tool_calls:
+        return None
+    content = response.content if isinstance(response.content, str) else ""
+    # Plain text (no attempt at JSON) is passed on as it is, unless the run had to answer
+    if not forced_final and "{" not in content:
+        return None
+    try:
+        parse_result(content)
+    except ValueError as e:
+        return str(e)[:500]
+    return None
+
+def _repair_request(messages: List[BaseMessage], response: AIMessage, error: str):
+    """The final model is told what is wrong and asked to restate the answer without calling tools."""
+    # OpenAI's structured outputs (`response_format`) need strict schemas for all bound tools, which
+    # ours don't have; the schema is enforced by validating the answer instead.
+    messages = [*messages, response, SystemMessage(content=answer_repair_prompt.format(error=error))]
+    return get_llm(FINAL).bind(tool_choice="none"), messages
+
+def _llm_response(response: AIMessage, forced_final: Optional[str], repairs: int) -> dict:
+    if forced_final and response.tool_calls:
+        # The run must end here: drop tool calls a model made despite tool_choice="none"
+        response = AIMessage(content=response.content, id=response.id, response_metadata=response.response_metadata)
+    if not response.tool_calls and (result := result_or_none(response.content)):
+        # Clients get the validated JSON without the prose or fence the model may have added
+        response = response.model_copy(update={"content": json.dumps(result.model_dump(), ensure_ascii=False)})
+        if repairs:
+            ANSWER_REPAIRS.labels("repaired").inc()
+    elif repairs:
+        ANSWER_REPAIRS.labels("failed").inc()
+    return {"messages": [response]}
+
+def _call_llm(model, messages):
+    return scheduler.run(
+        "openai", lambda: model.invoke(messages),
+        tokens=token_counter.total(messages) + COMPLETION_TOKENS_ESTIMATE, used_tokens=_used_tokens,
+    )
+
+async def _acall_llm(model, messages):
+    return await scheduler.arun(
+        "openai", lambda: model.ainvoke(messages),
+        tokens=token_counter.total(messages) + COMPLETION_TOKENS_ESTIMATE, used_tokens=_used_tokens,
+    )
+
+# --- Answer cache ---
+def _answer_cache_enabled() -> bool:
+    return ANSWER_CACHE_MODE in ("answer", "seed")
+
+def _cache_lookup(state: AgentState) -> dict:
+    profile = first_profile(state["messages"])
+    hit = answer_cache.lookup(profile) if profile else None
+    if hit is None:
+        return {}
+    answer = json.dumps(hit.result, ensure_ascii=False)
+    if ANSWER_CACHE_MODE == "seed":
+        return {"messages": [SystemMessage(content=answer_seed_prompt.format(answer=answer, similarity=hit.similarity))]}
+    return {"messages": [AIMessage(content=answer, response_metadata={"answer_cache": {"similarity": round(hit.similarity, 3)}})]}
+
+def cache_node(state: AgentState):
+    """
+    Looks the first profile of a conversation up in the answer cache: a near-duplicate's
+    answer is returned as the final answer ("answer") or given to the llm to verify ("seed").
+    """
+    try:
+        return _cache_lookup(state)
+    except sqlite3.Error:
+        logger.exception("Answer cache lookup failed")
+        return {}
+
+async def acache_node(state: AgentState):
+    return await asyncio.to_thread(cache_node, state)
+
+def after_cache(state: AgentState) -> str:
+    return END if isinstance(state["messages"][-1], AIMessage) else "llm"
+
+def _cache_answer(state: AgentState, response: AIMessage, forced_final: Optional[str]) -> None:
+    """Stores the validated answer to a first profile; answers forced by a budget are not worth reusing."""
+    if not _answer_cache_enabled() or forced_final or response.tool_calls:
+        return
+    profile = first_profile(state["messages"])
+    result = result_or_none(response.content) if profile else None
+    if result is not None:
+        try:
+            answer_cache.put(profile, result.model_dump())
+        except sqlite3.Error:
+            logger.exception("Answer cache write failed")
+
+def llm_node(state: AgentState, config: RunnableConfig):
+    """
+    Invokes the LLM with the current state's messages, compacted to the context
+    budget: the research model picks tools, the final model writes the answer,
+    which is validated against the recommendations schema and repaired if needed.
+    """
+    tier, messages, model, forced_final = _llm_request(state, config)
+    response = _call_llm(model, messages)
+    if tier == RESEARCH and (reason := escalation(response)):
+        MODEL_ESCALATIONS.labels(reason).inc()
+        response = _call_llm(get_llm(FINAL), messages)
+    repairs = 0
+    while repairs < ANSWER_REPAIR_ATTEMPTS and (error := _answer_error(response, forced_final)):
+        repairs += 1
+        response = _call_llm(*_repair_request(messages, response, error))
+    update = _llm_response(response, forced_final, repairs)
+    _cache_answer(state, update["messages"][0], forced_final)
+    return update
+
+async def allm_node(state: AgentState, config: RunnableConfig):
+    """Async variant of `llm_node`, used when the graph runs via `ainvoke`/`astream`."""
+    tier, messages, model, forced_final = _llm_request(state, config)
+    response = await _acall_llm(model, messages)
+    if tier == RESEARCH and (reason := escalation(response)):
+        MODEL_ESCALATIONS.labels(reason).inc()
+        response = await _acall_llm(get_llm(FINAL), messages)
+    repairs = 0
+    while repairs < ANSWER_REPAIR_ATTEMPTS and (error := _answer_error(response, forced_final)):
+        repairs += 1
+        response = await _acall_llm(*_repair_request(messages, response, error))
+    update = _llm_response(response, forced_final, repairs)
+    if _answer_cache_enabled():
+        await asyncio.to_thread(_cache_answer, state, update["messages"][0], forced_final)
+    return update
+
+def _last_ai_message(messages: List[BaseMessage]) -> Optional[AIMessage]:
+    return next((m for m in reversed(messages) if isinstance(m, AIMessage)), None)
+
+def _open_tool_calls(messages: List[BaseMessage]) -> List[ToolCall]:
+    """Tool calls of the latest AI message that have no ToolMessage yet."""
+    last_ai_message = _last_ai_message(messages)
+    if last_ai_message is None:
+        return []
+    answered = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+    return [call for call in last_ai_message.tool_calls if call['id'] not in answered]
+
+def pending_human_call(messages: List[BaseMessage]) -> Optional[ToolCall]:
+    """Returns the unanswered human_feedback_tool call the conversation is waiting on, if any."""
+    for call in _open_tool_calls(messages):
+        if call['name'] == human_feedback_tool.name:
+            return call
+    return None
+
+def _tool_error(call: ToolCall, error: str) -> ToolMessage:
+    return ToolMessage(
+        content=f"Error: {error}\n Please fix your mistakes.",
+        name=call['name'],
+        tool_call_id=call['id'],
+        status="error",
+    )
+
+def _research_calls(state: AgentState) -> List[ToolCall]:
+    # human_feedback_tool is answered by the user, never executed
+    return [call for call in _open_tool_calls(state["messages"]) if call['name'] != human_feedback_tool.name]
+
+def _tool_timeout(config: RunnableConfig) -> float:
+    # Tools may not eat into the time kept for the final answer
+    time_left = _time_left(config)
+    if time_left is None:
+        return TOOL_CALL_TIMEOUT_SECONDS
+    return max(1.0, min(TOOL_CALL_TIMEOUT_SECONDS, time_left - FINAL_ANSWER_RESERVE_SECONDS))
+
+def tool_node(state: AgentState, config: RunnableConfig):
+    """
+    Executes all open tool calls of the last AI message, up to
+    MAX_PARALLEL_TOOL_CALLS at a time, each bounded by TOOL_CALL_TIMEOUT_SECONDS.
+    """
+    calls = _research_calls(state)
+    tools_by_name = _tools_by_name()
+    timeout = _tool_timeout(config)
+    executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_TOOL_CALLS)
+    futures = [
+        executor.submit(tools_by_name[call['name']].invoke, {**call, "type": "tool_call"}, config)
+        if call['name'] in tools_by_name else None
+        for call in calls
+    ]
+    messages = []
+    for call, future in zip(calls, futures):
+        if future is None:
+            messages.append(_tool_error(call, f"{call['name']} is not a valid tool."))
+            continue
+        try:
+            messages.append(future.result(timeout=timeout))
+        except FutureTimeoutError:
+            messages.append(_tool_error(call, f"{call['name']} timed out after {timeout:.0f}s."))
+        except Exception as e:
+            messages.append(_tool_error(call, repr(e)))
+    # Don't wait for calls that timed out; their results are discarded
+    executor.shutdown(wait=False, cancel_futures=True)
+    return {"messages": messages}
+
+async def atool_node(state: AgentState, config: RunnableConfig):
+    """Async variant of `tool_node`; the calls run concurrently on the event loop."""
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_TOOL_CALLS)
+    tools_by_name = _tools_by_name()
+    timeout = _tool_timeout(config)
+
+    async def run(call: ToolCall):
+        if call['name'] not in tools_by_name:
+            return _tool_error(call, f"{call['name']} is not a valid tool.")
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(
+                    tools_by_name[call['name']].ainvoke({**call, "type": "tool_call"}, config),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                return _tool_error(call, f"{call['name']} timed out after {timeout:.0f}s.")
+            except Exception as e:
+                return _tool_error(call, repr(e))
+
+    return {"messages": list(await asyncio.gather(*(run(call) for call in _research_calls(state))))}
 
 # --- 3. Define the Conditional Edge Logic ---
 def should_continue(state: AgentState) -> str:
     """
     Determines the next step for the agent.
     This is the router that decides between using tools, asking for human feedback, or finishing.
+    Research calls run first; a human_feedback_tool call in the same turn is asked afterwards.
     """
     last_message = state["messages"][-1]
     
     if tool_calls := getattr(last_message, "tool_calls", None):
-        # Now this check will work correctly because human_feedback_tool is defined
-        if tool_calls[0]['name'] == human_feedback_tool.name:
-            return "human"
-        else:
+        if any(call['name'] != human_feedback_tool.name for call in tool_calls):
             return "tools"
+        return "human"
         
     return END
 
+def after_tools(state: AgentState) -> str:
+    """Pauses for the user if the turn also asked a question, otherwise returns to the LLM."""
+    return "human" if pending_human_call(state["messages"]) else "llm"
+
 # --- 4. Assemble the Graph ---
-def create_agent_graph():
-    """Creates and compiles the LangGraph agent."""
+def create_agent_graph(checkpointer: Optional[BaseCheckpointSaver] = None):
+    """
+    Creates and compiles the LangGraph agent.
+    With a checkpointer, runs are resumable per `thread_id` (including the human pause).
+    With ANSWER_CACHE_MODE set, first profiles go through the answer cache before the llm.
+    """
     graph = StateGraph(AgentState)
-    graph.add_node("llm", llm_node)
-    graph.add_node("tools", tool_node)
+    # The node carries both implementations so the CLI can keep using `invoke`
+    # while the API awaits the graph without blocking its event loop.
+    graph.add_node("llm", RunnableLambda(llm_node, afunc=allm_node, name="llm"))
+    graph.add_node("tools", RunnableLambda(tool_node, afunc=atool_node, name="tools"))
     graph.add_node("human", lambda state: state)
-    graph.set_entry_point("llm")
+    if _answer_cache_enabled():
+        graph.add_node("cache", RunnableLambda(cache_node, afunc=acache_node, name="cache"))
+        graph.set_entry_point("cache")
+        graph.add_conditional_edges("cache", after_cache, {"llm": "llm", END: END})
+    else:
+        graph.set_entry_point("llm")
     graph.add_conditional_edges(
         "llm", should_continue, {"tools": "tools", "human": "human", END: END}
     )
-    graph.add_edge("tools", "llm")
+    graph.add_conditional_edges("tools", after_tools, {"human": "human", "llm": "llm"})
     graph.add_edge("human", "llm")
-    return graph.compile(interrupt_before=["human"])
\ No newline at end of file
+    return graph.compile(checkpointer=checkpointer, interrupt_before=["human"])
\ No newline at end of file
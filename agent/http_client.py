@@ -0,0 +1,162 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import NamedTuple, Optional
+
+import httpx
+
+from agent.config import (
+    HTTP_CONNECT_TIMEOUT_SECONDS,
+    HTTP_HOST_MIN_INTERVAL_SECONDS,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_PER_HOST,
+    HTTP_MAX_RESPONSE_BYTES,
+    HTTP_TIMEOUT_SECONDS,
+)
+
+REQUEST_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+class FetchResult(NamedTuple):
+    url: str
+    status_code: int
+    headers: httpx.Headers
+    content: bytes
+    truncated: bool  # True if the body was cut at `max_bytes`
+
+    def raise_for_status(self) -> None:
+        # 304 is an expected answer to the page cache's conditional requests
+        if self.status_code >= 400:
+            raise httpx.HTTPStatusError(
+                f"HTTP {self.status_code} for url '{self.url}'",
+                request=httpx.Request("GET", self.url),
+                response=httpx.Response(self.status_code),
+            )
+
+class HttpClient:
+    """
+    Process-wide HTTP layer for the fetching tools: keep-alive connection pools
+    (one sync, one per event loop), at most `max_per_host` concurrent requests
+    and at least `host_min_interval` seconds between request starts per host,
+    and bodies capped at `max_bytes`. `transport` / `async_transport` replace
+    the network, e.g. with `httpx.MockTransport` in tests.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float = HTTP_TIMEOUT_SECONDS,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT_SECONDS,
+        max_bytes: int = HTTP_MAX_RESPONSE_BYTES,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_per_host: int = HTTP_MAX_PER_HOST,
+        host_min_interval: float = HTTP_HOST_MIN_INTERVAL_SECONDS,
+        headers: Optional[dict] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_bytes = max_bytes
+        self.max_per_host = max_per_host
+        self.host_min_interval = host_min_interval
+        self.headers = headers or REQUEST_HEADERS
+        self.transport = transport
+        self.async_transport = async_transport
+
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        self._client_pid: Optional[int] = None
+        # An AsyncClient's connections belong to the loop that opened them
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._host_semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._async_host_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+        self._next_start: dict[str, float] = {}
+
+    # --- Clients ---
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            # Connections must not be shared with a forked worker
+            if self._client is None or self._client_pid != os.getpid():
+                self._client = httpx.Client(
+                    headers=self.headers, timeout=self.timeout, limits=self.limits,
+                    transport=self.transport, follow_redirects=True,
+                )
+                self._client_pid = os.getpid()
+            return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(
+                    headers=self.headers, timeout=self.timeout, limits=self.limits,
+                    transport=self.async_transport, follow_redirects=True,
+                )
+                self._async_clients[loop] = client
+            return client
+
+    async def aclose(self) -> None:
+        """Closes the connections of the running loop, for loops that end with the call (`asyncio.run`)."""
+        with self._lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def _host_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_semaphores[host]
+
+    def _async_host_semaphore(self, host: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._async_host_semaphores.setdefault(loop, {})
+            if host not in semaphores:
+                semaphores[host] = asyncio.Semaphore(self.max_per_host)
+            return semaphores[host]
+
+    # --- Per-host rate limit ---
+    def _reserve_start(self, host: str) -> float:
+        """Reserves the next start slot for `host` and returns how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.host_min_interval
+            return start - now
+
+    # --- Requests ---
+    def _read_capped(self, chunks) -> tuple[bytes, bool]:
+        body = bytearray()
+        for chunk in chunks:
+            body.extend(chunk)
+            if len(body) > self.max_bytes:
+                return bytes(body[:self.max_bytes]), True
+        return bytes(body), False
+
+    def get(self, url: str, headers: Optional[dict] = None) -> FetchResult:
+        host = httpx.URL(url).host
+        with self._host_semaphore(host):
+            time.sleep(self._reserve_start(host))
+            with self._sync_client().stream("GET", url, headers=headers) as response:
+                content, truncated = self._read_capped(response.iter_bytes())
+                return FetchResult(str(response.url), response.status_code, response.headers, content, truncated)
+
+    async def aget(self, url: str, headers: Optional[dict] = None) -> FetchResult:
+        host = httpx.URL(url).host
+        async with self._async_host_semaphore(host):
+            await asyncio.sleep(self._reserve_start(host))
+            async with self._async_client().stream("GET", url, headers=headers) as response:
+                body = bytearray()
+                truncated = False
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > self.max_bytes:
+                        body, truncated = body[:self.max_bytes], True
+                        break
+                return FetchResult(str(response.url), response.status_code, response.headers, bytes(body), truncated)
+
+http_client = HttpClient()
@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import re
+import sqlite3
+import time
+from typing import Any, List, NamedTuple
+
+from langchain_core.tools import BaseTool
+
+from agent.config import (
+    KNOWLEDGE_INDEX_PATH,
+    KNOWLEDGE_MAX_AGE_SECONDS,
+    KNOWLEDGE_MAX_DOCUMENTS,
+)
+from agent.page_cache import normalize_url
+from agent.storage import SqliteStore
+
+PRUNE_INTERVAL_SECONDS = 60
+
+class KnowledgeHit(NamedTuple):
+    url: str
+    title: str
+    snippet: str
+    source: str  # "scrape" (full page text) or "search" (search result summary)
+    fetched_at: float
+
+class KnowledgeIndex(SqliteStore):
+    """
+    Persistent full-text index (SQLite FTS5, BM25 ranking) of the pages and
+    search results the agent has fetched, shared by all worker processes.
+    Documents older than `max_age_seconds` are no longer returned and are
+    pruned, as are the oldest ones beyond `max_documents`.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY,
+            url TEXT UNIQUE NOT NULL,
+            title TEXT NOT NULL,
+            source TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS documents_fetched_at ON documents (fetched_at);
+        CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+            title, body, tokenize = 'unicode61 remove_diacritics 2'
+        );
+        CREATE TRIGGER IF NOT EXISTS documents_delete AFTER DELETE ON documents BEGIN
+            DELETE FROM documents_fts WHERE rowid = old.id;
+        END;
+    """
+
+    def __init__(
+        self,
+        path: str = KNOWLEDGE_INDEX_PATH,
+        *,
+        max_age_seconds: float = KNOWLEDGE_MAX_AGE_SECONDS,
+        max_documents: int = KNOWLEDGE_MAX_DOCUMENTS,
+    ) -> None:
+        super().__init__(path)
+        self.max_age_seconds = max_age_seconds
+        self.max_documents = max_documents
+        self._last_prune = 0.0
+
+    def add(self, url: str, text: str, *, title: str = "", source: str = "scrape") -> None:
+        """Indexes or refreshes a document. A search summary never replaces a fetched page."""
+        if not text.strip():
+            return
+        key = normalize_url(url)
+        content_hash = hashlib.sha256(f"{title}\n{text}".encode()).hexdigest()
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute("SELECT id, source, content_hash, fetched_at FROM documents WHERE url = ?", (key,)).fetchone()
+            if row is not None:
+                doc_id, stored_source, stored_hash, fetched_at = row
+                if source == "search" and stored_source == "scrape" and now - fetched_at < self.max_age_seconds:
+                    return
+                if stored_hash == content_hash:
+                    conn.execute("UPDATE documents SET fetched_at = ? WHERE id = ?", (now, doc_id))
+                    return
+                conn.execute(
+                    "UPDATE documents SET title = ?, source = ?, content_hash = ?, fetched_at = ? WHERE id = ?",
+                    (title, source, content_hash, now, doc_id),
+                )
+                conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+            else:
+                doc_id = conn.execute(
+                    "INSERT INTO documents (url, title, source, content_hash, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, title, source, content_hash, now),
+                ).lastrowid
+            conn.execute("INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)", (doc_id, title, text))
+        if now - self._last_prune > PRUNE_INTERVAL_SECONDS:
+            self._last_prune = now
+            self.prune()
+
+    def add_search_results(self, result: Any) -> None:
+        """Indexes the results of a web_search call (a Tavily response dict)."""
+        if not isinstance(result, dict):
+            return
+        for item in result.get("results") or []:
+            if isinstance(item, dict) and item.get("url"):
+                text = item.get("raw_content") or item.get("content") or ""
+                self.add(item["url"], text, title=item.get("title") or "", source="search")
+
+    def prune(self) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM documents WHERE fetched_at < ?", (time.time() - self.max_age_seconds,))
+            conn.execute(
+                "DELETE FROM documents WHERE id IN (SELECT id FROM documents ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_documents,),
+            )
+
+    def search(self, query: str, limit: int = 5) -> List[KnowledgeHit]:
+        """Best matching fresh documents, any query word may match (prefixes included)."""
+        terms = re.findall(r"\w+", query.casefold())
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"*' for term in terms)
+        rows = self._conn().execute(
+            """
+            SELECT d.url, d.title, snippet(documents_fts, 1, '', '', ' … ', 64), d.source, d.fetched_at
+            FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+            WHERE documents_fts MATCH ? AND d.fetched_at >= ?
+            ORDER BY bm25(documents_fts, 5.0, 1.0)
+            LIMIT ?
+            """,
+            (match, time.time() - self.max_age_seconds, limit),
+        ).fetchall()
+        return [KnowledgeHit(*row) for row in rows]
+
+    def stats(self) -> dict:
+        (documents,) = self._conn().execute("SELECT COUNT(*) FROM documents").fetchone()
+        return {"documents": documents}
+
+def index_safely(add, *args, **kwargs) -> None:
+    # The index only saves future requests; a failed write must not fail the tool call
+    try:
+        add(*args, **kwargs)
+    except sqlite3.Error:
+        pass
+
+class IndexedSearchTool(BaseTool):
+    """Wraps the web search tool and adds every result to the knowledge index; otherwise unchanged."""
+
+    inner: BaseTool
+    index: KnowledgeIndex
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, inner: BaseTool, index: KnowledgeIndex, **kwargs: Any) -> None:
+        super().__init__(
+            inner=inner,
+            index=index,
+            name=inner.name,
+            description=inner.description,
+            args_schema=inner.args_schema,
+            **kwargs,
+        )
+
+    def _run(self, **kwargs: Any) -> Any:
+        result = self.inner.invoke(kwargs)
+        index_safely(self.index.add_search_results, result)
+        return result
+
+    async def _arun(self, **kwargs: Any) -> Any:
+        result = await self.inner.ainvoke(kwargs)
+        await asyncio.to_thread(index_safely, self.index.add_search_results, result)
+        return result
+
+knowledge_index = KnowledgeIndex()
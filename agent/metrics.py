@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from agent.config import TRACE_REQUESTS
+
+trace_logger = logging.getLogger("agent.trace")
+
+GRAPH_NODES = ("cache", "llm", "tools", "human")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+SIZE_BUCKETS = (100, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000)
+
+# --- Metrics (aggregated across gunicorn workers when PROMETHEUS_MULTIPROC_DIR is set) ---
+NODE_SECONDS = Histogram("futedu_node_duration_seconds", "Wall time of a graph node run.", ["node"], buckets=LATENCY_BUCKETS)
+NODE_ERRORS = Counter("futedu_node_errors_total", "Graph node runs that raised.", ["node"])
+TOOL_SECONDS = Histogram("futedu_tool_duration_seconds", "Wall time of a tool call.", ["tool"], buckets=LATENCY_BUCKETS)
+TOOL_ERRORS = Counter("futedu_tool_errors_total", "Tool calls that raised or returned an error.", ["tool"])
+TOOL_OUTPUT_BYTES = Histogram("futedu_tool_output_bytes", "Size of a tool result sent back to the model.", ["tool"], buckets=SIZE_BUCKETS)
+LLM_TOKENS = Counter("futedu_llm_tokens_total", "Tokens reported by the model API.", ["model", "type"])
+LLM_SECONDS = Histogram("futedu_llm_duration_seconds", "Wall time of a model call.", ["model"], buckets=LATENCY_BUCKETS)
+ANSWER_REPAIRS = Counter("futedu_answer_repairs_total", "Final answers that failed schema validation, by outcome of the repair.", ["outcome"])
+MODEL_ESCALATIONS = Counter("futedu_model_escalations_total", "Steps handed from the research model to the final model.", ["reason"])
+FINAL_ANSWERS = Counter("futedu_forced_final_answers_total", "Runs that had to answer early because a budget was used up.", ["reason"])
+GRAPH_STEPS = Histogram("futedu_graph_steps", "Graph node runs per agent invocation.", buckets=(1, 2, 3, 5, 8, 13, 21, 34))
+HUMAN_WAIT_SECONDS = Histogram(
+    "futedu_human_wait_seconds", "Time between the agent's question and the user's answer.",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+CACHE_EVENTS = Counter("futedu_cache_events_total", "Cache lookups by outcome.", ["cache", "event"])
+SCHEDULER_WAITING = Gauge(
+    "futedu_scheduler_waiting", "API calls waiting for rate-limit budget.", ["api", "priority"], multiprocess_mode="livesum"
+)
+SCHEDULER_WAIT_SECONDS = Histogram("futedu_scheduler_wait_seconds", "Time an API call waited for its turn.", ["api", "priority"], buckets=LATENCY_BUCKETS)
+SCHEDULER_RETRIES = Counter("futedu_scheduler_retries_total", "API calls retried after a transient failure.", ["api", "reason"])
+SCHEDULER_REJECTED = Counter("futedu_scheduler_rejected_total", "API calls given up with RetryLater.", ["api", "priority"])
+REQUESTS = Counter("futedu_http_requests_total", "HTTP requests handled by the API.", ["endpoint", "status"])
+REQUEST_SECONDS = Histogram("futedu_http_request_duration_seconds", "API response time (until the first byte for streams).", ["endpoint"], buckets=LATENCY_BUCKETS)
+
+def render_metrics() -> tuple[bytes, str]:
+    """Prometheus text format; in multiprocess mode the values of all workers are merged."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+def _content_size(output: Any) -> int:
+    content = getattr(output, "content", output)
+    text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+    return len(text.encode())
+
+# Most tools catch their exceptions and answer with an error text (TavilySearch with {"error": ...})
+_ERROR_RESULT = re.compile(r'(An error occurred|Error: |\{"error")')
+
+def _is_error_result(output: Any) -> bool:
+    if getattr(output, "status", None) == "error":
+        return True
+    content = getattr(output, "content", output)
+    if isinstance(content, dict):
+        return "error" in content
+    return isinstance(content, str) and _ERROR_RESULT.match(content) is not None
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records node and tool timings, token usage and graph steps of one agent
+    invocation. Pass a new instance in the run config's callbacks per request.
+    With `trace=True` the spans of the invocation are logged as one JSON line.
+    """
+
+    run_inline = True  # Only bookkeeping; no need for a thread per callback
+
+    def __init__(self, trace: bool = TRACE_REQUESTS, trace_id: Optional[str] = None) -> None:
+        self.trace = trace
+        self.trace_id = trace_id
+        self._root: Optional[UUID] = None
+        self._root_start = 0.0
+        self._steps = 0
+        self._nodes: dict[UUID, tuple[str, float]] = {}
+        self._tools: dict[UUID, tuple[str, float]] = {}
+        self._llms: dict[UUID, tuple[Optional[str], float]] = {}
+        self._nested_tools: set[UUID] = set()
+        self._spans: list[dict] = []
+
+    def _span(self, kind: str, name: str, start: float, error: bool = False, **attributes: Any) -> None:
+        if self.trace:
+            end = time.perf_counter()
+            self._spans.append({
+                "kind": kind, "name": name, "start_ms": round((start - self._root_start) * 1000, 2),
+                "duration_ms": round((end - start) * 1000, 2), "error": error, **attributes,
+            })
+
+    # --- Graph and nodes ---
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        if parent_run_id is None:
+            self._root, self._root_start, self._steps, self._spans = run_id, time.perf_counter(), 0, []
+        # Node runs are the direct children of the graph run
+        elif parent_run_id == self._root and kwargs.get("name") in GRAPH_NODES:
+            self._nodes[run_id] = (kwargs["name"], time.perf_counter())
+            self._steps += 1
+
+    def _end_chain(self, run_id: UUID, error: bool) -> None:
+        if run_id in self._nodes:
+            node, start = self._nodes.pop(run_id)
+            NODE_SECONDS.labels(node).observe(time.perf_counter() - start)
+            if error:
+                NODE_ERRORS.labels(node).inc()
+            self._span("node", node, start, error)
+        elif run_id == self._root:
+            GRAPH_STEPS.observe(self._steps)
+            if self.trace:
+                trace_logger.info(json.dumps({
+                    "trace_id": self.trace_id, "duration_ms": round((time.perf_counter() - self._root_start) * 1000, 2),
+                    "steps": self._steps, "spans": self._spans,
+                }, ensure_ascii=False))
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_chain(run_id, error=False)
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_chain(run_id, error=True)
+
+    # --- Model ---
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        # The requested model ("gpt-4o-mini"), not the dated snapshot the API answers with
+        self._llms[run_id] = ((metadata or {}).get("ls_model_name"), time.perf_counter())
+
+    def _end_llm(self, run_id: UUID, error: bool) -> Optional[str]:
+        model, start = self._llms.pop(run_id, (None, None))
+        if start is not None:
+            LLM_SECONDS.labels(model or "unknown").observe(time.perf_counter() - start)
+            self._span("llm", model or "unknown", start, error)
+        return model
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        requested = self._end_llm(run_id, error=False)
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if not usage:
+                    continue
+                model = requested or (message.response_metadata or {}).get("model_name", "unknown")
+                LLM_TOKENS.labels(model, "prompt").inc(usage.get("input_tokens", 0))
+                LLM_TOKENS.labels(model, "completion").inc(usage.get("output_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_llm(run_id, error=True)
+
+    # --- Tools ---
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        # A wrapped tool (search cache, knowledge index) reports its inner call as a nested tool run
+        if parent_run_id in self._tools or parent_run_id in self._nested_tools:
+            self._nested_tools.add(run_id)
+            return
+        self._tools[run_id] = ((serialized or {}).get("name") or kwargs.get("name") or "unknown", time.perf_counter())
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id not in self._tools:
+            self._nested_tools.discard(run_id)
+            return
+        tool, start = self._tools.pop(run_id)
+        TOOL_SECONDS.labels(tool).observe(time.perf_counter() - start)
+        size = _content_size(output)
+        TOOL_OUTPUT_BYTES.labels(tool).observe(size)
+        error = _is_error_result(output)
+        if error:
+            TOOL_ERRORS.labels(tool).inc()
+        self._span("tool", tool, start, error, output_bytes=size)
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id not in self._tools:
+            self._nested_tools.discard(run_id)
+            return
+        tool, start = self._tools.pop(run_id)
+        TOOL_SECONDS.labels(tool).observe(time.perf_counter() - start)
+        TOOL_ERRORS.labels(tool).inc()
+        self._span("tool", tool, start, True)
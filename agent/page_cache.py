@@ -0,0 +1,165 @@
+import threading
+import time
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from agent.config import (
+    PAGE_CACHE_MAX_BYTES,
+    PAGE_CACHE_PATH,
+    PAGE_CACHE_TTL_SECONDS,
+)
+from agent.metrics import CACHE_EVENTS
+from agent.storage import SqliteStore
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical cache key for a URL: lower-case scheme and host, no default port,
+    no fragment, no tracking parameters and a sorted query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+class CachedPage(NamedTuple):
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_type: Optional[str]
+    fetched_at: float
+
+class PageCache(SqliteStore):
+    """
+    On-disk cache of fetched pages shared by all worker processes.
+    Entries younger than `ttl_seconds` are served directly; older ones are
+    revalidated with If-None-Match / If-Modified-Since. The least recently used
+    pages are evicted once the bodies exceed `max_bytes`.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            content_type TEXT,
+            size INTEGER NOT NULL,
+            fetched_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access);
+    """
+
+    def __init__(self, path: str = PAGE_CACHE_PATH, *, ttl_seconds: float = PAGE_CACHE_TTL_SECONDS, max_bytes: int = PAGE_CACHE_MAX_BYTES) -> None:
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._counter_lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._counter_lock:
+            self.counters[name] += amount
+        CACHE_EVENTS.labels("page", name).inc(amount)
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return time.time() - page.fetched_at < self.ttl_seconds
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Returns the stored page (fresh or stale) and marks it as recently used."""
+        key = normalize_url(url)
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT body, etag, last_modified, content_type, fetched_at FROM pages WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), key))
+        return CachedPage(*row)
+
+    def put(
+        self, url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None, content_type: Optional[str] = None
+    ) -> None:
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), body, etag, last_modified, content_type, len(body), now, now),
+            )
+        self._evict()
+
+    def mark_revalidated(self, url: str) -> None:
+        """Restarts the TTL of a page after the server answered 304 Not Modified."""
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("UPDATE pages SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, normalize_url(url)))
+        self._count("revalidated")
+
+    def _evict(self) -> None:
+        with self._conn() as conn:
+            (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()
+            if total <= self.max_bytes:
+                return
+            evicted = 0
+            for url, size in conn.execute("SELECT url, size FROM pages ORDER BY last_access").fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                total -= size
+                evicted += 1
+        self._count("evictions", evicted)
+
+    def stats(self) -> dict:
+        """Counters of this process plus the size of the shared store."""
+        with self._conn() as conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        with self._counter_lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {**counters, "hit_rate": counters["hits"] / lookups if lookups else 0.0, "entries": entries, "bytes": total}
+
+    # --- Fetch integration ---
+    def lookup(self, url: str) -> tuple[Optional[CachedPage], dict]:
+        """
+        Returns `(page, {})` for a fresh hit, or `(None, headers)` where the
+        headers make the request conditional if a stale copy exists.
+        """
+        page = self.get(url)
+        if page is not None and self.is_fresh(page):
+            self._count("hits")
+            return page, {}
+        self._count("misses")
+        headers = {}
+        if page is not None:
+            if page.etag:
+                headers["If-None-Match"] = page.etag
+            if page.last_modified:
+                headers["If-Modified-Since"] = page.last_modified
+        return None, headers
+
+    def store_response(self, url: str, status_code: int, body: bytes, headers, truncated: bool = False) -> tuple[bytes, Optional[str]]:
+        """
+        Records a network response and returns the page body to use with its
+        Content-Type. A body cut at the client's size cap is used but not stored.
+        """
+        if status_code == 304:
+            page = self.get(url)
+            if page is None:  # Evicted by another worker in the meantime
+                return body, headers.get("Content-Type")
+            self.mark_revalidated(url)
+            return page.body, page.content_type
+        if not truncated:
+            self.put(url, body, headers.get("ETag"), headers.get("Last-Modified"), headers.get("Content-Type"))
+        return body, headers.get("Content-Type")
+
+page_cache = PageCache()
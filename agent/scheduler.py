@@ -0,0 +1,345 @@
+"""
+Scheduling of the calls to paid APIs (OpenAI, Tavily).
+
+Every call first takes its request and token budget from token buckets that
+live in SQLite, so the limits hold across all worker processes. Batch work may
+not use the last `interactive_reserve` of a bucket, which keeps room for
+interactive /chat traffic. 429s, 5xx responses and connection errors are
+retried with jittered exponential backoff. A call that would wait longer than
+its priority allows raises `RetryLater`; the API answers it with 503 and a
+Retry-After header.
+"""
+import asyncio
+import itertools
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter as CallCounter
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from langchain_core.tools import BaseTool
+
+from agent.config import (
+    OPENAI_REQUESTS_PER_MINUTE,
+    OPENAI_TOKENS_PER_MINUTE,
+    SCHEDULER_BACKOFF_SECONDS,
+    SCHEDULER_BATCH_MAX_WAIT_SECONDS,
+    SCHEDULER_DB_PATH,
+    SCHEDULER_INTERACTIVE_RESERVE,
+    SCHEDULER_MAX_RETRIES,
+    SCHEDULER_MAX_WAIT_SECONDS,
+    TAVILY_REQUESTS_PER_MINUTE,
+)
+from agent.metrics import SCHEDULER_REJECTED, SCHEDULER_RETRIES, SCHEDULER_WAIT_SECONDS, SCHEDULER_WAITING
+from agent.storage import SqliteStore
+
+T = TypeVar("T")
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# Set to BATCH by batch.py; tasks started from there inherit it
+priority: ContextVar[str] = ContextVar("scheduler_priority", default=INTERACTIVE)
+
+class RetryLater(Exception):
+    """The API is saturated; the call was given up. `retry_after` is in seconds."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+# --- Cross-process token buckets ---
+class TokenBuckets(SqliteStore):
+    """
+    Token buckets shared by all processes using the same database. A bucket
+    holds up to one minute of its rate and starts full.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS buckets (
+            name TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = SCHEDULER_DB_PATH) -> None:
+        super().__init__(path)
+
+    @staticmethod
+    def _store(conn, name: str, tokens: float, now: float) -> None:
+        conn.execute(
+            "INSERT INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+            (name, tokens, now),
+        )
+
+    @staticmethod
+    def _refilled(row: Optional[tuple], per_minute: float, now: float) -> float:
+        if row is None:
+            return per_minute
+        tokens, updated_at = row
+        return min(per_minute, tokens + (now - updated_at) * per_minute / 60)
+
+    def take(self, amounts: dict[str, tuple[float, float]], reserve: float = 0.0) -> float:
+        """
+        Takes `amount` from each bucket in {name: (amount, per_minute)}, all or
+        nothing. A bucket must keep `reserve` (a fraction of its size) afterwards.
+        Returns 0 on success, otherwise the seconds until the call would fit.
+        """
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            levels = {}
+            wait = 0.0
+            for name, (amount, per_minute) in amounts.items():
+                row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (name,)).fetchone()
+                levels[name] = self._refilled(row, per_minute, now)
+                needed = min(amount + reserve * per_minute, per_minute)
+                if levels[name] < needed:
+                    wait = max(wait, (needed - levels[name]) * 60 / per_minute)
+            for name, (amount, per_minute) in amounts.items():
+                self._store(conn, name, levels[name] if wait else levels[name] - min(amount, per_minute), now)
+        return wait
+
+    def give_back(self, name: str, amount: float, per_minute: float) -> None:
+        """Corrects a bucket after the call, e.g. by the difference between estimated and used tokens."""
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (name,)).fetchone()
+            self._store(conn, name, min(per_minute, self._refilled(row, per_minute, now) + amount), now)
+
+    def levels(self) -> dict[str, float]:
+        with self._conn() as conn:
+            return {name: round(tokens, 1) for name, tokens in conn.execute("SELECT name, tokens FROM buckets")}
+
+# --- Retry classification ---
+_STATUS_IN_MESSAGE = re.compile(r"\bError (\d{3})\b")
+_TRANSIENT_ERRORS = ("APIConnectionError", "APITimeoutError", "ConnectError", "ConnectionError", "ReadTimeout", "TimeoutError", "ClientConnectorError")
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is None and (match := _STATUS_IN_MESSAGE.search(str(error))):
+        status = int(match.group(1))  # langchain_tavily reports HTTP errors as "Error 429: ..."
+    return status
+
+def _retry_after_header(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def retry_reason(error: BaseException) -> Optional[str]:
+    """"rate_limited", "server_error" or "connection" if the call may succeed when retried, else None."""
+    status = _status_code(error)
+    if status == 429:
+        return "rate_limited"
+    if status is not None and status >= 500:
+        return "server_error"
+    if status is None and any(type(e).__name__ in _TRANSIENT_ERRORS for e in (error, error.__cause__) if e):
+        return "connection"
+    return None
+
+# --- Scheduler ---
+class Scheduler:
+    """
+    Runs calls to the APIs in `limits` ({api: {bucket: per_minute}}; a bucket
+    named "<api>_tokens" is charged the call's token estimate, any other one
+    request). A limit of 0 means unlimited; retries apply in any case.
+    """
+
+    def __init__(
+        self,
+        buckets: TokenBuckets,
+        limits: dict[str, dict[str, float]],
+        *,
+        max_retries: int = SCHEDULER_MAX_RETRIES,
+        backoff_seconds: float = SCHEDULER_BACKOFF_SECONDS,
+        max_wait: Optional[dict[str, float]] = None,
+        interactive_reserve: float = SCHEDULER_INTERACTIVE_RESERVE,
+    ) -> None:
+        self.buckets = buckets
+        self.limits = {api: {name: rate for name, rate in rates.items() if rate > 0} for api, rates in limits.items()}
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_wait = max_wait or {INTERACTIVE: SCHEDULER_MAX_WAIT_SECONDS, BATCH: SCHEDULER_BATCH_MAX_WAIT_SECONDS}
+        self.interactive_reserve = interactive_reserve
+        self._waiting: CallCounter = CallCounter()
+        self._lock = threading.Lock()
+
+    def _amounts(self, api: str, tokens: float) -> dict[str, tuple[float, float]]:
+        return {
+            name: (tokens if name.endswith("_tokens") else 1, per_minute)
+            for name, per_minute in self.limits.get(api, {}).items()
+        }
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        # Full jitter spreads the retries of all workers instead of synchronizing them
+        delay = random.uniform(0, self.backoff_seconds * 2 ** attempt)
+        return max(delay, _retry_after_header(error) or 0)
+
+    def _waiting_for(self, api: str, level: str, delta: int) -> None:
+        with self._lock:
+            self._waiting[(api, level)] += delta
+        SCHEDULER_WAITING.labels(api, level).inc(delta)
+
+    def _give_up(self, api: str, level: str, retry_after: float, reason: str) -> RetryLater:
+        SCHEDULER_REJECTED.labels(api, level).inc()
+        return RetryLater(f"{api}: {reason}, try again in {math.ceil(retry_after)}s", retry_after)
+
+    # --- Waiting for a turn ---
+    def acquire(self, api: str, tokens: float = 0) -> None:
+        amounts = self._amounts(api, tokens)
+        if not amounts:
+            return
+        level = priority.get()
+        reserve = self.interactive_reserve if level == BATCH else 0.0
+        start = time.monotonic()
+        self._waiting_for(api, level, 1)
+        try:
+            while wait := self.buckets.take(amounts, reserve):
+                if time.monotonic() - start + wait > self.max_wait[level]:
+                    raise self._give_up(api, level, wait, "rate limit reached")
+                time.sleep(wait + random.uniform(0, 0.05))
+        finally:
+            self._waiting_for(api, level, -1)
+            SCHEDULER_WAIT_SECONDS.labels(api, level).observe(time.monotonic() - start)
+
+    async def aacquire(self, api: str, tokens: float = 0) -> None:
+        amounts = self._amounts(api, tokens)
+        if not amounts:
+            return
+        level = priority.get()
+        reserve = self.interactive_reserve if level == BATCH else 0.0
+        start = time.monotonic()
+        self._waiting_for(api, level, 1)
+        try:
+            while wait := await asyncio.to_thread(self.buckets.take, amounts, reserve):
+                if time.monotonic() - start + wait > self.max_wait[level]:
+                    raise self._give_up(api, level, wait, "rate limit reached")
+                await asyncio.sleep(wait + random.uniform(0, 0.05))
+        finally:
+            self._waiting_for(api, level, -1)
+            SCHEDULER_WAIT_SECONDS.labels(api, level).observe(time.monotonic() - start)
+
+    def _settle(self, api: str, estimated: float, used: Optional[float]) -> None:
+        """Books the tokens a call actually used instead of its estimate."""
+        for name, per_minute in self.limits.get(api, {}).items():
+            if name.endswith("_tokens") and used is not None and used != estimated:
+                self.buckets.give_back(name, estimated - used, per_minute)
+
+    # --- Running a call ---
+    def _check(self, api: str, attempt: int, error: BaseException) -> float:
+        """Seconds to wait before the next attempt, or raises if the call is given up."""
+        reason = retry_reason(error)
+        if reason is None:
+            raise error
+        delay = self._backoff(attempt, error)
+        if attempt >= self.max_retries or delay > self.max_wait[priority.get()]:
+            raise self._give_up(api, priority.get(), delay, reason.replace("_", " ")) from error
+        SCHEDULER_RETRIES.labels(api, reason).inc()
+        return delay
+
+    def run(
+        self,
+        api: str,
+        call: Callable[[], T],
+        *,
+        tokens: float = 0,
+        used_tokens: Optional[Callable[[T], Optional[float]]] = None,
+        result_error: Optional[Callable[[T], Optional[BaseException]]] = None,
+    ) -> T:
+        """
+        Calls `call` when `api` has budget, retrying transient failures.
+        `result_error` finds errors a call returns instead of raising.
+        """
+        for attempt in itertools.count():
+            self.acquire(api, tokens)
+            try:
+                result = call()
+            except Exception as e:
+                time.sleep(self._check(api, attempt, e))
+                continue
+            error = result_error(result) if result_error else None
+            if error is not None and retry_reason(error) and attempt < self.max_retries:
+                time.sleep(self._check(api, attempt, error))
+                continue
+            if used_tokens and self.limits.get(api):
+                self._settle(api, tokens, used_tokens(result))
+            return result
+
+    async def arun(
+        self,
+        api: str,
+        call: Callable[[], Awaitable[T]],
+        *,
+        tokens: float = 0,
+        used_tokens: Optional[Callable[[T], Optional[float]]] = None,
+        result_error: Optional[Callable[[T], Optional[BaseException]]] = None,
+    ) -> T:
+        """Async variant of `run`."""
+        for attempt in itertools.count():
+            await self.aacquire(api, tokens)
+            try:
+                result = await call()
+            except Exception as e:
+                await asyncio.sleep(self._check(api, attempt, e))
+                continue
+            error = result_error(result) if result_error else None
+            if error is not None and retry_reason(error) and attempt < self.max_retries:
+                await asyncio.sleep(self._check(api, attempt, error))
+                continue
+            if used_tokens and self.limits.get(api):
+                await asyncio.to_thread(self._settle, api, tokens, used_tokens(result))
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            waiting = {f"{api}/{level}": count for (api, level), count in self._waiting.items() if count}
+        return {"waiting": waiting, "buckets": self.buckets.levels() if any(self.limits.values()) else {}}
+
+# --- Search tool ---
+def _tool_error(result: Any) -> Optional[BaseException]:
+    # TavilySearch returns {"error": exception} instead of raising
+    if isinstance(result, dict) and isinstance(result.get("error"), BaseException):
+        return result["error"]
+    return None
+
+class ScheduledTool(BaseTool):
+    """Wraps a tool that calls a paid API so that its calls go through the scheduler."""
+
+    inner: BaseTool
+    api: str
+    scheduler: Scheduler
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, inner: BaseTool, api: str, scheduler: Scheduler, **kwargs: Any) -> None:
+        super().__init__(
+            inner=inner,
+            api=api,
+            scheduler=scheduler,
+            name=inner.name,
+            description=inner.description,
+            args_schema=inner.args_schema,
+            **kwargs,
+        )
+
+    def _run(self, **kwargs: Any) -> Any:
+        return self.scheduler.run(self.api, lambda: self.inner.invoke(kwargs), result_error=_tool_error)
+
+    async def _arun(self, **kwargs: Any) -> Any:
+        return await self.scheduler.arun(self.api, lambda: self.inner.ainvoke(kwargs), result_error=_tool_error)
+
+scheduler = Scheduler(
+    TokenBuckets(),
+    {
+        "openai": {"openai_requests": OPENAI_REQUESTS_PER_MINUTE, "openai_tokens": OPENAI_TOKENS_PER_MINUTE},
+        "tavily": {"tavily_requests": TAVILY_REQUESTS_PER_MINUTE},
+    },
+)
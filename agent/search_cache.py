@@ -0,0 +1,226 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain_core.tools import BaseTool
+
+from agent.config import (
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_PATH,
+    SEARCH_CACHE_PERSISTENT,
+    SEARCH_CACHE_TTL_SECONDS,
+)
+from agent.metrics import CACHE_EVENTS
+from agent.storage import SqliteStore
+
+def normalize_query(query: str) -> str:
+    """Case, punctuation, whitespace and word order do not change a search's cache key."""
+    words = re.findall(r"\w+", query.casefold())
+    return " ".join(sorted(words))
+
+def cache_key(tool_name: str, tool_args: dict) -> str:
+    args = {k: v for k, v in tool_args.items() if v not in (None, [], "")}
+    args["query"] = normalize_query(str(args.get("query", "")))
+    return f"{tool_name}:{json.dumps(args, sort_keys=True, ensure_ascii=False)}"
+
+# --- Persistent backend ---
+class SqliteSearchStore(SqliteStore):
+    """Optional second tier that keeps search results across restarts and workers."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS searches (
+            key TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            stored_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS searches_stored_at ON searches (stored_at);
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, *, ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS) -> None:
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute("SELECT result, stored_at FROM searches WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def put(self, key: str, result: Any) -> None:
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM searches WHERE stored_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?)",
+                (key, json.dumps(result, ensure_ascii=False, default=str), now),
+            )
+
+# --- Cache with single-flight ---
+class SearchCache:
+    """
+    Bounded in-memory LRU of search results with a TTL, optionally backed by
+    SQLite. Concurrent lookups of the same key share one upstream call.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS,
+        store: Optional[SqliteSearchStore] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.store = store
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+        self._async_in_flight: dict[tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    return result
+                del self._entries[key]
+        if self.store is not None:
+            result = self.store.get(key)
+            if result is not None:
+                self._remember(key, result)
+            return result
+        return None
+
+    def put(self, key: str, result: Any) -> None:
+        self._remember(key, result)
+        if self.store is not None:
+            self.store.put(key, result)
+
+    def _remember(self, key: str, result: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+        CACHE_EVENTS.labels("search", name).inc()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            entries = len(self._entries)
+        lookups = counters["hits"] + counters["misses"] + counters["coalesced"]
+        hit_rate = (counters["hits"] + counters["coalesced"]) / lookups if lookups else 0.0
+        return {**counters, "hit_rate": hit_rate, "entries": entries}
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], cacheable: Callable[[Any], bool]) -> Any:
+        result = self.get(key)
+        if result is not None:
+            self._count("hits")
+            return result
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+
+        self._count("misses")
+        try:
+            result = compute()
+            if cacheable(result):
+                self.put(key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]], cacheable: Callable[[Any], bool]) -> Any:
+        result = await asyncio.to_thread(self.get, key) if self.store is not None else self.get(key)
+        if result is not None:
+            self._count("hits")
+            return result
+
+        flight_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            future = self._async_in_flight.get(flight_key)
+            leader = future is None
+            if leader:
+                future = self._async_in_flight[flight_key] = asyncio.get_running_loop().create_future()
+        if not leader:
+            self._count("coalesced")
+            return await asyncio.shield(future)
+
+        self._count("misses")
+        try:
+            result = await compute()
+            if cacheable(result):
+                if self.store is not None:
+                    await asyncio.to_thread(self.put, key, result)
+                else:
+                    self.put(key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting for it
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                del self._async_in_flight[flight_key]
+
+def _is_cacheable(result: Any) -> bool:
+    # TavilySearch reports failures as {"error": ...} or as a ToolException message string
+    return isinstance(result, dict) and "error" not in result
+
+class CachedSearchTool(BaseTool):
+    """Wraps a search tool (TavilySearch) with a SearchCache; name, description and arguments are unchanged."""
+
+    inner: BaseTool
+    cache: SearchCache
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, inner: BaseTool, cache: SearchCache, **kwargs: Any) -> None:
+        super().__init__(
+            inner=inner,
+            cache=cache,
+            name=inner.name,
+            description=inner.description,
+            args_schema=inner.args_schema,
+            **kwargs,
+        )
+
+    def _run(self, **kwargs: Any) -> Any:
+        return self.cache.get_or_compute(
+            cache_key(self.name, kwargs), lambda: self.inner.invoke(kwargs), _is_cacheable
+        )
+
+    async def _arun(self, **kwargs: Any) -> Any:
+        return await self.cache.aget_or_compute(
+            cache_key(self.name, kwargs), lambda: self.inner.ainvoke(kwargs), _is_cacheable
+        )
+
+search_cache = SearchCache(store=SqliteSearchStore() if SEARCH_CACHE_PERSISTENT else None)
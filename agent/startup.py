@@ -0,0 +1,122 @@
+"""
+Lazy initialization and startup timing.
+
+The graph, the model client and the tools are built on first use by `once`
+factories, so importing the API or the CLI stays cheap. `preload()` imports
+the heavy libraries up front; gunicorn calls it in the master process so the
+forked workers share them. For a report of where the import time goes:
+
+    python -m agent.startup api main
+"""
+import argparse
+import functools
+import importlib
+import logging
+import re
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Libraries that are only needed once the agent runs, in import order
+HEAVY_MODULES = ("langgraph.graph", "langchain_openai", "langchain_tavily", "bs4")
+
+_timings: dict[str, float] = {}
+
+def once(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Calls `factory` on first use and returns the same object afterwards, also when
+    threads race for it. If the factory raises, the next call tries again.
+    """
+    lock = threading.Lock()
+    result: list = []
+
+    @functools.wraps(factory)
+    def get() -> T:
+        if not result:
+            with lock:
+                if not result:
+                    result.append(factory())
+        return result[0]
+
+    return get
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Records how long a startup phase of this process took."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timings[phase] = time.perf_counter() - start
+        logger.debug("%s ready in %.0f ms", phase, _timings[phase] * 1000)
+
+def startup_timings() -> dict[str, float]:
+    """Phases built so far in this process, in milliseconds."""
+    return {phase: round(seconds * 1000, 1) for phase, seconds in _timings.items()}
+
+def preload() -> None:
+    """Imports the heavy libraries now instead of during the first request."""
+    for module in HEAVY_MODULES:
+        with timed(f"import {module}"):
+            importlib.import_module(module)
+
+# --- Import-time report ---
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)")
+
+def import_report(modules: list[str]) -> tuple[float, list[tuple[str, float]]]:
+    """
+    Imports `modules` in a fresh interpreter with `-X importtime` and returns the
+    total import time and the time per top-level package, both in milliseconds.
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    packages: dict[str, float] = {}
+    total = 0.0
+    for line in completed.stderr.splitlines():
+        if match := _IMPORTTIME_LINE.match(line):
+            self_us, name = match.groups()
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+            total += int(self_us) / 1000
+    return total, sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Where the startup time of the agent goes")
+    parser.add_argument("modules", nargs="*", default=["api"], help="modules to import (default: api)")
+    parser.add_argument("--top", type=int, default=15, help="number of packages to list")
+    parser.add_argument("--build", action="store_true", help="also build the agent (graph, model client, tools)")
+    args = parser.parse_args()
+
+    total, packages = import_report(args.modules)
+    print(f"Importing {', '.join(args.modules)}: {total:.0f} ms")
+    for package, ms in packages[:args.top]:
+        print(f"  {package:<28} {ms:8.1f} ms  {ms / total:6.1%}")
+
+    if args.build:
+        # Run as a script, this file is `__main__`; the factories record into `agent.startup`
+        from agent import startup
+        from agent.graph import RESEARCH, create_agent_graph, get_llm
+        from agent.tools import get_tools
+
+        startup.preload()
+        get_tools()
+        get_llm()
+        get_llm(RESEARCH)
+        with startup.timed("graph"):
+            create_agent_graph()
+        print("Building the agent:")
+        for phase, ms in startup.startup_timings().items():
+            print(f"  {phase:<28} {ms:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
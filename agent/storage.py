@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import threading
+
+def connect(path: str) -> sqlite3.Connection:
+    """Opens a SQLite database that several worker processes can share (WAL, busy timeout)."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class SqliteStore:
+    """
+    Base class for the agent's SQLite-backed stores. Opens one connection per
+    thread on first use and creates `SCHEMA` once, so importing a module that
+    holds a store never touches the disk.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(self.SCHEMA)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
@@ -1,17 +1,22 @@
-german_system_prompt = """
+from typing import Collection, Optional
+
+from agent.config import PARALLEL_TOOL_CALLS
+
+_german_system_prompt = """
 Du bist 'Futedu', ein hochintelligenter deutscher Studienberater. Du arbeitest wie ein menschlicher Experte, indem du einen schrittweisen Denk- und Handlungsprozess anwendest, um die beste Empfehlung zu geben. Deine Aufgabe ist es, für das gegebene Nutzerprofil die 3 passendsten Studiengänge zu finden und zu begründen. Du sprichst mit Schülern, also verwende "du".
 
 Dein Arbeitsprozess folgt einem strikten Zyklus aus **Gedanke** und **Aktion**.
 
-1.  **Gedanke:** Hier analysierst du die Situation. Was weißt du bereits aus dem Profil und dem bisherigen Gesprächsverlauf? Was ist dein unmittelbares Ziel? Was ist der logischste nächste Schritt, um diesem Ziel näher zu kommen? Formuliere eine klare Hypothese und entscheide dich für EINE EINZIGE, sinnvolle Aktion.
-2.  **Aktion:** Führe die eine Aktion aus, für die du dich in deinem Gedanken entschieden hast. Dies ist entweder ein Werkzeugaufruf (`web_search_tool`, `scrape_website_tool`, `find_links_tool`, `human_feedback_tool`).
+1.  **Gedanke:** Hier analysierst du die Situation. Was weißt du bereits aus dem Profil und dem bisherigen Gesprächsverlauf? Was ist dein unmittelbares Ziel? Was ist der logischste nächste Schritt, um diesem Ziel näher zu kommen? Formuliere eine klare Hypothese und {decision}
+2.  **Aktion:** {action} ({tool_list}).
 
 ---
 **WICHTIGE REGELN:**
-* **Ein Schritt nach dem Anderen:** Mache immer nur EINEN Werkzeugaufruf pro Runde.
-* **Begründe deine Aktionen:** Dein Gedanke muss immer klar erklären, WARUM du die folgende Aktion für den besten nächsten Schritt hältst.
+{step_rules}* **Begründe deine Aktionen:** Dein Gedanke muss immer klar erklären, WARUM du die folgende Aktion für den besten nächsten Schritt hältst.
 * **Fragen stellen:** Wenn du einen unlösbaren Widerspruch im Profil findest oder mehr Informationen benötigst, stelle eine gezielte Frage an den Nutzer mit dem `human_feedback_tool`.
 * **Prüfen:** Hinterfrage kritisch, ob ein Studiengang wirklich zum Nutzerprofil passt.
+{local_search_rule}* **Websites erkunden:** Um eine Hochschul-Website zu durchsuchen, nutze `crawl_site_tool` mit Start-URL und Suchbegriffen statt vieler einzelner `find_links_tool`- und `scrape_website_tool`-Aufrufe.
+* **Gezielt lesen:** Gib beim `scrape_website_tool` im Feld `query` an, was du auf der Seite suchst (z. B. "Studiengebühren", "NC" oder "Einstiegsgehalt"). Du erhältst dann die passenden Abschnitte statt des Seitenanfangs.
 
 ---
 **FINALE ANTWORT:**
@@ -42,3 +47,92 @@ Das JSON-Objekt MUSS exakt diese Struktur haben:
 
 Gib KEINEN Text, KEINE "Gedanken", KEINE "Aktionen" und KEINE Marker wie `[TASK_COMPLETE]` außerhalb dieses JSON-Objekts aus.
 """
+
+# --- Tool-dependent parts: the prompt only names tools the agent has ---
+def _local_search_rule(tool_names: Collection[str]) -> str:
+    catalog = "catalog_search" in tool_names
+    knowledge = "local_knowledge_search" in tool_names
+    if catalog and knowledge:
+        steps = (
+            "Suche passende Studiengänge zuerst mit `catalog_search` (nach Fach, Hochschule, Abschluss und Sprache) "
+            "und prüfe mit `local_knowledge_search`, ob die Information schon aus früheren Recherchen vorliegt"
+        )
+    elif catalog:
+        steps = "Suche passende Studiengänge zuerst mit `catalog_search` (nach Fach, Hochschule, Abschluss und Sprache)"
+    elif knowledge:
+        steps = "Prüfe zuerst mit `local_knowledge_search`, ob die Information schon aus früheren Recherchen vorliegt"
+    else:
+        return ""
+    return f"* **Erst lokal suchen:** {steps}, bevor du im Web suchst. Nur wenn dort nichts Passendes oder Aktuelles steht, nutze `web_search`.\n"
+
+# --- Tool-call mode: one call per turn, or independent research batched into one turn ---
+def _sequential_parts() -> dict:
+    return {
+        "decision": "entscheide dich für EINE EINZIGE, sinnvolle Aktion.",
+        "action": "Führe die eine Aktion aus, für die du dich in deinem Gedanken entschieden hast. Dies ist entweder ein Werkzeugaufruf",
+        "step_rules": "* **Ein Schritt nach dem Anderen:** Mache immer nur EINEN Werkzeugaufruf pro Runde.\n",
+    }
+
+def _parallel_parts(tool_names: Collection[str]) -> dict:
+    research_tools = ", ".join(f"`{name}`" for name in tool_names if name != "human_feedback_tool")
+    return {
+        "decision": (
+            "entscheide dich für die sinnvollen nächsten Aktionen. Recherchen, die nicht voneinander abhängen "
+            "(z. B. je eine Suche pro Studiengang), planst du gemeinsam."
+        ),
+        "action": "Führe die Aktionen aus, für die du dich in deinem Gedanken entschieden hast. Das sind ein oder mehrere Werkzeugaufrufe",
+        "step_rules": (
+            f"* **Recherche bündeln:** Rufe unabhängige Recherche-Werkzeuge ({research_tools}) gleichzeitig in EINER Runde auf, "
+            "statt sie nacheinander abzuarbeiten. Warte nur dann auf ein Ergebnis, wenn der nächste Aufruf davon abhängt "
+            "(z. B. eine URL aus einer Suche).\n"
+            "* **Fragen:** Den `human_feedback_tool` rufst du höchstens einmal pro Runde auf.\n"
+        ),
+    }
+
+def _fill(template: str, parts: dict) -> str:
+    """Inserts each part at its {name} marker (str.format would trip over the braces of the JSON example)."""
+    for name, text in parts.items():
+        marker = "{" + name + "}"
+        if marker not in template:
+            raise ValueError(f"The system prompt has no {marker} marker")
+        template = template.replace(marker, text)
+    return template
+
+def german_system_prompt(tool_names: Collection[str], parallel: bool = False) -> str:
+    mode_parts = _parallel_parts(tool_names) if parallel else _sequential_parts()
+    return _fill(_german_system_prompt, {
+        **mode_parts,
+        "tool_list": ", ".join(f"`{name}`" for name in tool_names),
+        "local_search_rule": _local_search_rule(tool_names),
+    })
+
+# Appended to the last LLM call of a run whose step or time budget is used up
+final_answer_prompt = """
+Dein Budget für Recherche ist aufgebraucht. Rufe keine Werkzeuge mehr auf und stelle keine Fragen.
+Gib jetzt deine finale Antwort als das geforderte JSON-Objekt, gestützt auf die bisher gesammelten Informationen.
+Wo dir Angaben fehlen, schreibe das ehrlich in "reasoning" bzw. "income".
+"""
+
+# Sent with an answer that failed validation; {error} is the reason
+answer_repair_prompt = """
+Deine letzte Antwort entspricht nicht dem geforderten Format: {error}
+Gib dieselbe Empfehlung noch einmal, diesmal ausschließlich als das geforderte JSON-Objekt mit "recommendations" (je "title", "income", "reasoning") und "summary".
+"""
+
+# ANSWER_CACHE_MODE=seed: the answer to a very similar earlier profile, for the agent to verify
+answer_seed_prompt = """
+Für ein sehr ähnliches Profil (Ähnlichkeit {similarity:.0%}) wurde bereits diese Empfehlung erarbeitet:
+{answer}
+Prüfe, ob sie zu diesem Profil passt. Recherchiere nur, was sich unterscheidet oder veraltet sein könnte, passe die Empfehlung an und antworte im geforderten JSON-Format.
+"""
+
+def get_system_prompt(tool_names: Optional[Collection[str]] = None) -> str:
+    """
+    Returns the system prompt matching the configured tool-call mode, mentioning
+    only tools the agent has (by default the ones bound to its model).
+    """
+    if tool_names is None:
+        from agent.graph import bound_tool_names  # The graph imports this module
+
+        tool_names = bound_tool_names()
+    return german_system_prompt(tool_names, parallel=PARALLEL_TOOL_CALLS)
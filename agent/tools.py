@@ -1,80 +1,355 @@
+import asyncio
+import os
+import sqlite3
+import time
+from typing import Optional
+
 from pydantic import BaseModel, Field
-import requests
-from bs4 import BeautifulSoup, Tag
 from urllib.parse import urljoin, urlparse
 
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_core.tools import tool
-from langchain_tavily import TavilySearch
+from langchain_core.tools import BaseTool, StructuredTool, tool
+
+from agent.catalog import catalog_store
+from agent.config import (
+    CATALOG_ENABLED,
+    CRAWL_CONCURRENCY,
+    CRAWL_MAX_CHARS,
+    CRAWL_MAX_DEPTH,
+    CRAWL_MAX_PAGES,
+    CRAWL_TIMEOUT_SECONDS,
+    KNOWLEDGE_INDEX_ENABLED,
+    PAGE_CACHE_ENABLED,
+    SEARCH_CACHE_ENABLED,
+)
+from agent.crawler import crawl
+from agent.extraction import Page, extract_page, header_charset, rank_passages, select_passages
+from agent.http_client import http_client
+from agent.knowledge import IndexedSearchTool, index_safely, knowledge_index
+from agent.page_cache import page_cache
+from agent.scheduler import ScheduledTool, scheduler
+from agent.search_cache import CachedSearchTool, search_cache
+from agent.startup import once, timed
+
+# --- HTTP helpers (sync for the CLI, async for the API) ---
+# Both use the pooled, per-host limited client and go through the shared page
+# cache: fresh pages are served from disk, stale ones are revalidated with a
+# conditional request. They return the body and the charset of the
+# Content-Type header, which takes precedence over the page's <meta>.
+def _fetch(url: str) -> tuple[bytes, Optional[str]]:
+    if not PAGE_CACHE_ENABLED:
+        response = http_client.get(url)
+        response.raise_for_status()
+        return response.content, header_charset(response.headers.get("Content-Type"))
+
+    page, conditional_headers = page_cache.lookup(url)
+    if page is not None:
+        return page.body, header_charset(page.content_type)
+    response = http_client.get(url, headers=conditional_headers)
+    response.raise_for_status()
+    body, content_type = page_cache.store_response(url, response.status_code, response.content, response.headers, response.truncated)
+    return body, header_charset(content_type)
+
+async def _afetch(url: str) -> tuple[bytes, Optional[str]]:
+    if not PAGE_CACHE_ENABLED:
+        response = await http_client.aget(url)
+        response.raise_for_status()
+        return response.content, header_charset(response.headers.get("Content-Type"))
+
+    page, conditional_headers = await asyncio.to_thread(page_cache.lookup, url)
+    if page is not None:
+        return page.body, header_charset(page.content_type)
+    response = await http_client.aget(url, headers=conditional_headers)
+    response.raise_for_status()
+    body, content_type = await asyncio.to_thread(page_cache.store_response, url, response.status_code, response.content, response.headers, response.truncated)
+    return body, header_charset(content_type)
+
+# --- HTML parsing helpers (shared by the sync and async tool paths) ---
+def _page_links(url: str, html: bytes, charset: Optional[str] = None) -> list[str]:
+    """Returns the unique absolute http(s) links of a page in document order."""
+    from bs4 import BeautifulSoup, Tag
+
+    soup = BeautifulSoup(html, "html.parser", from_encoding=charset)
+
+    links = {}  # Insertion-ordered set
+    for a_tag in soup.find_all("a", href=True):
+        if not isinstance(a_tag, Tag):
+            continue
+        href = a_tag.get("href")
+        if not href:
+            continue
+
+        absolute_url = urljoin(url, str(href))
+        parsed_url = urlparse(absolute_url)
+        if parsed_url.scheme in ['http', 'https'] and '#' not in absolute_url:
+            links.setdefault(absolute_url, None)
+    return list(links)
 
 # --- Tool 1: Web Search ---
 def create_web_search_tool():
     """Create the web search tool after environment variables are loaded."""
+    from langchain_tavily import TavilySearch  # Pulls in aiohttp; only needed once the agent runs
+
     tool = TavilySearch(max_results=3)
     tool.name = "web_search" # Use a simple name for the agent
     tool.description = "A powerful search engine. Use this to find information on the internet. It returns a summarized answer and a list of sources."
+    tool = ScheduledTool(tool, "tavily", scheduler)  # Inside the cache: hits cost no request
+    if SEARCH_CACHE_ENABLED:
+        tool = CachedSearchTool(tool, search_cache)
+    if KNOWLEDGE_INDEX_ENABLED:
+        tool = IndexedSearchTool(tool, knowledge_index)
     return tool
 
 # --- Tool 2: Scrape Website ---
 class ScrapeWebsiteInput(BaseModel):
     url: str = Field(description="The URL of the webpage you want to scrape.")
+    query: Optional[str] = Field(
+        default=None,
+        description="Optional: what you are looking for on the page, e.g. 'Studiengebühren', 'NC' or 'Einstiegsgehalt'. The most relevant passages are returned.",
+    )
 
-@tool(args_schema=ScrapeWebsiteInput)
-def scrape_website_tool(url: str) -> str:
+def _page_text(url: str, html: bytes, charset: Optional[str], query: Optional[str]) -> str:
+    """Extracts the page, adds its full main text to the knowledge index and returns the selected passages."""
+    page = extract_page(html, charset=charset)
+    if KNOWLEDGE_INDEX_ENABLED:
+        index_safely(knowledge_index.add, url, "\n\n".join(page.passages), title=page.title)
+    return "\n\n".join(select_passages(page.passages, query))
+
+def _format_page_text(cleaned_content: str) -> str:
+    if not cleaned_content:
+        return "Could not find any text content on the page."
+    return cleaned_content
+
+def scrape_website(url: str, query: Optional[str] = None) -> str:
     """
-    Scrapes the text content of a single webpage.
+    Scrapes the main text content of a single webpage, without menus and banners.
     Use this when a user provides a specific URL and asks a question about its content.
+    Pass a `query` to get the passages about that topic instead of the beginning of the page.
     """
     try:
-        loader = WebBaseLoader(web_path=url)
-        docs = loader.load()
-        content = " ".join([doc.page_content for doc in docs])
-        cleaned_content = " ".join(content.split())
-
-        if not cleaned_content:
-            return "Could not find any text content on the page."
-        
-        # Return a preview if the content is too long
-        return cleaned_content[:5000]
-    
+        html, charset = _fetch(url)
+        return _format_page_text(_page_text(url, html, charset, query))
     except Exception as e:
         return f"An error occurred while trying to scrape the website: {e}"
 
+async def ascrape_website(url: str, query: Optional[str] = None) -> str:
+    """Async variant of `scrape_website`; parsing runs off the event loop."""
+    try:
+        html, charset = await _afetch(url)
+        return _format_page_text(await asyncio.to_thread(_page_text, url, html, charset, query))
+    except Exception as e:
+        return f"An error occurred while trying to scrape the website: {e}"
+
+scrape_website_tool = StructuredTool.from_function(
+    func=scrape_website,
+    coroutine=ascrape_website,
+    name="scrape_website_tool",
+    args_schema=ScrapeWebsiteInput,
+)
+
 # --- Tool 3: Find Links ---
 class FindLinksInput(BaseModel):
     url: str = Field(description="The URL of the webpage to find links on.")
 
-@tool(args_schema=FindLinksInput)
-def find_links_tool(url: str) -> str:
+def _format_links(links: list[str]) -> str:
+    if not links:
+        return "No links found on this page."
+
+    return "Found the following links:\n" + "\n".join(f"- {link}" for link in links[:30])
+
+def find_links(url: str) -> str:
     """
     Finds all the navigable links on a given webpage URL and returns them as a list.
     Use this to explore a website.
     """
     try:
-        response = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        links = []
-        for a_tag in soup.find_all("a", href=True):
-            href = a_tag.get("href")
-            if not href:
-                continue
-            
-            absolute_url = urljoin(url, href)
-            parsed_url = urlparse(absolute_url)
-            if parsed_url.scheme in ['http', 'https'] and '#' not in absolute_url:
-                if absolute_url not in links:
-                    links.append(absolute_url)
-
-        if not links:
-            return "No links found on this page."
-            
-        return "Found the following links:\n" + "\n".join(f"- {link}" for link in links[:30])
+        return _format_links(_page_links(url, *_fetch(url)))
+    except Exception as e:
+        return f"An error occurred while finding links: {e}"
 
+async def afind_links(url: str) -> str:
+    """Async variant of `find_links`; parsing runs off the event loop."""
+    try:
+        html, charset = await _afetch(url)
+        return _format_links(await asyncio.to_thread(_page_links, url, html, charset))
     except Exception as e:
         return f"An error occurred while finding links: {e}"
 
+find_links_tool = StructuredTool.from_function(
+    func=find_links,
+    coroutine=afind_links,
+    name="find_links_tool",
+    args_schema=FindLinksInput,
+)
+
+# --- Tool 4: Crawl Site ---
+class CrawlSiteInput(BaseModel):
+    url: str = Field(description="The page to start from, e.g. a faculty or study programme overview.")
+    query: str = Field(description="What you are looking for, e.g. 'Informatik Bachelor NC Bewerbungsfrist'.")
+    max_pages: int = Field(default=10, description=f"How many pages to read at most (up to {CRAWL_MAX_PAGES}).")
+    max_depth: int = Field(default=2, description=f"How many links away from the start page to go (up to {CRAWL_MAX_DEPTH}).")
+
+def _format_crawl(url: str, pages: dict[str, Page], query: str) -> str:
+    """Ranks the passages of all crawled pages together and lists the best ones per page."""
+    if not pages:
+        return f"Could not read any page starting from {url}."
+
+    candidates = [(page_url, passage) for page_url, page in pages.items() for passage in page.passages]
+    scores = rank_passages([passage for _, passage in candidates], query)
+    order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+
+    selected: dict[str, list[int]] = {}
+    used = 0
+    for i in order:
+        if scores[i] <= 0 or used + len(candidates[i][1]) > CRAWL_MAX_CHARS:
+            break
+        selected.setdefault(candidates[i][0], []).append(i)
+        used += len(candidates[i][1])
+    if not selected:
+        return f"Read {len(pages)} pages starting from {url}, but none of them mentions '{query}'."
+
+    sections = []
+    for page_url, indices in selected.items():  # Best page first
+        title = pages[page_url].title or page_url
+        passages = "\n\n".join(candidates[i][1] for i in sorted(indices))
+        sections.append(f"## {title}\nURL: {page_url}\n{passages}")
+    return f"Read {len(pages)} pages starting from {url}. Most relevant extracts:\n\n" + "\n\n".join(sections)
+
+async def acrawl_site(url: str, query: str, max_pages: int = 10, max_depth: int = 2) -> str:
+    """Async variant of `crawl_site`; pages are fetched concurrently on the event loop."""
+    pages: dict[str, Page] = {}
+
+    async def visit(page_url: str, depth: int) -> list[str]:
+        html, charset = await _afetch(page_url)
+        page = await asyncio.to_thread(extract_page, html, page_url, charset)
+        pages[page_url] = page
+        if KNOWLEDGE_INDEX_ENABLED:
+            await asyncio.to_thread(index_safely, knowledge_index.add, page_url, "\n\n".join(page.passages), title=page.title)
+        return page.links
+
+    try:
+        await asyncio.wait_for(
+            crawl(
+                [url], visit,
+                max_pages=max(1, min(max_pages, CRAWL_MAX_PAGES)),
+                max_depth=max(0, min(max_depth, CRAWL_MAX_DEPTH)),
+                concurrency=CRAWL_CONCURRENCY,
+                client=http_client,
+            ),
+            CRAWL_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        pass  # Answer with the pages read so far
+    except Exception as e:
+        return f"An error occurred while crawling the website: {e}"
+    return await asyncio.to_thread(_format_crawl, url, pages, query)
+
+def crawl_site(url: str, query: str, max_pages: int = 10, max_depth: int = 2) -> str:
+    """
+    Reads up to `max_pages` pages of a website breadth-first from `url` (same site only,
+    respecting robots.txt) and returns the passages most relevant to `query` in one result.
+    Use this instead of repeated find_links_tool / scrape_website_tool calls to explore a site.
+    """
+    async def run():
+        try:
+            return await acrawl_site(url, query, max_pages, max_depth)
+        finally:
+            await http_client.aclose()
+    return asyncio.run(run())
+
+crawl_site_tool = StructuredTool.from_function(
+    func=crawl_site,
+    coroutine=acrawl_site,
+    name="crawl_site_tool",
+    args_schema=CrawlSiteInput,
+)
+
+# --- Tool 5: Local Knowledge Search ---
+class LocalKnowledgeSearchInput(BaseModel):
+    query: str = Field(description="Keywords to look up, e.g. 'Maschinenbau Aachen NC'.")
+
+def _format_knowledge_hits(hits) -> str:
+    if not hits:
+        return "No matching documents in the local knowledge base. Use web_search instead."
+
+    results = []
+    for i, hit in enumerate(hits, start=1):
+        fetched = time.strftime("%Y-%m-%d", time.localtime(hit.fetched_at))
+        results.append(f"[{i}] {hit.title or hit.url}\nURL: {hit.url} (fetched {fetched})\n{hit.snippet}")
+    return "Found in the local knowledge base:\n\n" + "\n\n".join(results)
+
+def local_knowledge_search(query: str) -> str:
+    """
+    Searches the pages and search results fetched in earlier conversations.
+    Try this before web_search; it answers in milliseconds. Use scrape_website_tool
+    on a returned URL if you need more than the snippet.
+    """
+    try:
+        return _format_knowledge_hits(knowledge_index.search(query))
+    except Exception as e:
+        return f"An error occurred while searching the local knowledge base: {e}"
+
+async def alocal_knowledge_search(query: str) -> str:
+    """Async variant of `local_knowledge_search`; the SQLite query runs off the event loop."""
+    return await asyncio.to_thread(local_knowledge_search, query)
+
+local_knowledge_search_tool = StructuredTool.from_function(
+    func=local_knowledge_search,
+    coroutine=alocal_knowledge_search,
+    name="local_knowledge_search",
+    args_schema=LocalKnowledgeSearchInput,
+)
+
+# --- Tool 6: Programme Catalog ---
+class CatalogSearchInput(BaseModel):
+    query: Optional[str] = Field(default=None, description="Words in the programme title, e.g. 'Informatik' or 'Maschinenbau'.")
+    university: Optional[str] = Field(default=None, description="Part of the university name or domain, e.g. 'Aachen' or 'tum.de'.")
+    degree: Optional[str] = Field(default=None, description="'Bachelor', 'Master', 'Staatsexamen' or 'Diplom'.")
+    language: Optional[str] = Field(default=None, description="Language of instruction: 'Deutsch' or 'Englisch'.")
+    limit: int = Field(default=10, description="Maximum number of programmes to return.")
+
+def _format_programmes(programmes) -> str:
+    if not programmes:
+        return "No matching programmes in the catalog. Use web_search instead."
+
+    lines = []
+    for p in programmes:
+        facts = [p.degree, p.language, f"{p.duration_semesters} Semester" if p.duration_semesters else None]
+        entry = f"- {p.title} – {p.university} ({', '.join(f for f in facts if f)})\n  URL: {p.url}"
+        if p.admission:
+            entry += f"\n  Zulassung: {p.admission}"
+        if p.income:
+            entry += f"\n  Einkommen: {p.income}"
+        lines.append(entry)
+    return f"Found {len(programmes)} programmes in the catalog:\n" + "\n".join(lines)
+
+def catalog_search(
+    query: Optional[str] = None,
+    university: Optional[str] = None,
+    degree: Optional[str] = None,
+    language: Optional[str] = None,
+    limit: int = 10,
+) -> str:
+    """
+    Looks up study programmes in the pre-built catalog of university sites by title
+    words, university, degree and language. One call replaces browsing university
+    sites with find_links_tool and scrape_website_tool.
+    """
+    try:
+        return _format_programmes(catalog_store.search(query, university=university, degree=degree, language=language, limit=limit))
+    except Exception as e:
+        return f"An error occurred while searching the catalog: {e}"
+
+async def acatalog_search(**kwargs) -> str:
+    """Async variant of `catalog_search`; the SQLite query runs off the event loop."""
+    return await asyncio.to_thread(catalog_search, **kwargs)
+
+catalog_search_tool = StructuredTool.from_function(
+    func=catalog_search,
+    coroutine=acatalog_search,
+    name="catalog_search",
+    args_schema=CatalogSearchInput,
+)
+
 @tool
 def human_feedback_tool(question: str) -> str:
     """
@@ -86,11 +361,33 @@ def human_feedback_tool(question: str) -> str:
     # The graph will interrupt when this tool is called.
     return ""
 
+def _catalog_built() -> bool:
+    """catalog_search is only offered once `python catalog.py build` has stored programmes."""
+    if not CATALOG_ENABLED or not os.path.exists(catalog_store.path):
+        return False
+    try:
+        return catalog_store.stats()["programmes"] > 0
+    except sqlite3.Error:
+        return False
+
 # --- Assemble the Final Tools List ---
-# Add the new tool to your list of tools
-tools = [
-    create_web_search_tool(),
-    scrape_website_tool,
-    find_links_tool,
-    human_feedback_tool 
-]
+# Built once per process on first use (see agent.startup)
+@once
+def get_tools() -> list[BaseTool]:
+    with timed("tools"):
+        return [
+            *([catalog_search_tool] if _catalog_built() else []),
+            *([local_knowledge_search_tool] if KNOWLEDGE_INDEX_ENABLED else []),
+            create_web_search_tool(),
+            scrape_website_tool,
+            crawl_site_tool,
+            find_links_tool,
+            human_feedback_tool
+        ]
+
+def __getattr__(name: str):
+    # `from agent.tools import tools` keeps working and builds the list on demand
+    if name == "tools":
+        return get_tools()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
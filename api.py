@@ -1,22 +1,68 @@
+import asyncio
 import json
-import re
-from fastapi import FastAPI, HTTPException
+import logging
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from starlette.routing import Match
+from typing import AsyncIterator, Awaitable, List, Optional, TypeVar
 
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage, ToolMessage
-from agent.graph import create_agent_graph
-from agent.system_prompt import german_system_prompt
+from agent.answer import RecommendationStream, result_or_none
+from agent.answer_cache import answer_cache
+from agent.checkpoint import create_checkpointer
+from agent.config import ANSWER_CACHE_MODE, LAZY_INIT, LOG_LEVEL, RUN_MAX_STEPS, RUN_TIMEOUT_SECONDS
+from agent.graph import RESEARCH, create_agent_graph, escalation, get_llm, pending_human_call
+from agent.knowledge import knowledge_index
+from agent.metrics import HUMAN_WAIT_SECONDS, REQUEST_SECONDS, REQUESTS, MetricsCallbackHandler, render_metrics
+from agent.page_cache import page_cache
+from agent.scheduler import RetryLater, scheduler
+from agent.search_cache import search_cache
+from agent.startup import once, preload, startup_timings, timed
+from agent.system_prompt import get_system_prompt
 
-# Create the agent
-try:
-    agent = create_agent_graph()
-except Exception as e:
-    print(f"Error creating agent: {e}")
-    agent = None
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Futedu Agent API", version="1.0.0")
+T = TypeVar("T")
+
+# Create the agent once per worker process, on the first request (or at startup with LAZY_INIT=false)
+@once
+def get_agent():
+    with timed("agent"):
+        return create_agent_graph(checkpointer=create_checkpointer())
+
+def _agent_or_none():
+    try:
+        return get_agent()
+    except Exception:
+        logger.exception("Error creating agent")
+        return None
+
+def _warm_up() -> None:
+    """Builds the agent and the model client before the worker takes requests."""
+    preload()
+    if _agent_or_none() is not None:
+        try:
+            get_llm()
+            get_llm(RESEARCH)
+        except Exception:
+            logger.exception("Error creating the model client")
+    logger.info("Agent ready: %s", startup_timings())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not LAZY_INIT:
+        await asyncio.to_thread(_warm_up)
+    yield
+
+app = FastAPI(title="Futedu Agent API", version="1.0.0", lifespan=lifespan)
 
 # --- CORS Middleware ---
 app.add_middleware(
@@ -27,6 +73,42 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# --- Request metrics ---
+class RequestMetricsMiddleware:
+    """
+    Counts requests by route and status and times them until the response starts.
+    A plain ASGI middleware: `@app.middleware("http")` would consume the client's
+    disconnect message, and /chat could no longer notice it.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        # Label by route template, not raw path, to keep the label set bounded
+        endpoint = next((route.path for route in app.routes if route.matches(scope)[0] == Match.FULL), "other")
+        status = []
+
+        async def send_with_metrics(message) -> None:
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+                REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if not status:
+                # The app raised before responding; the server answers with a 500
+                REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+            REQUESTS.labels(endpoint, str(status[0] if status else 500)).inc()
+
+app.add_middleware(RequestMetricsMiddleware)
+
 # --- Define Models ---
 class ChatHistoryItem(BaseModel):
     type: str
@@ -36,39 +118,140 @@ class ChatRequest(BaseModel):
     user_input: str
     chat_history: List[ChatHistoryItem] = Field(default_factory=list)
     tool_call_id: Optional[str] = None
+    thread_id: Optional[str] = None
+
+# --- Conversation helpers ---
+def _run_config(thread_id: str) -> dict:
+    """
+    Graph config for one request: the callback records its node/tool metrics, and
+    the step limit and deadline make the agent answer before the run is cut off.
+    """
+    return {
+        "configurable": {"thread_id": thread_id, "deadline": time.time() + RUN_TIMEOUT_SECONDS},
+        "recursion_limit": RUN_MAX_STEPS,
+        "callbacks": [MetricsCallbackHandler(trace_id=thread_id)],
+    }
+
+# How often a waiting /chat request checks whether its client is still there
+DISCONNECT_POLL_SECONDS = 0.5
+
+async def _until_disconnected(http_request: Request, run: Awaitable[T]) -> Optional[T]:
+    """
+    Awaits `run`, cancelling it if the client goes away first (then returns None),
+    so abandoned requests stop spending model tokens and search credits.
+    """
+    task = asyncio.ensure_future(run)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return None
+    finally:
+        task.cancel()
+
+def _history_to_messages(request: ChatRequest) -> List[BaseMessage]:
+    """Rebuilds a conversation from the client-side history (used for new or expired threads)."""
+    messages: List[BaseMessage] = [SystemMessage(content=get_system_prompt())]
+
+    # Process chat history
+    for item in request.chat_history:
+        if item.type == "human":
+            messages.append(HumanMessage(content=item.content))
+        elif item.type == "ai":
+            messages.append(AIMessage(content=item.content))
+
+    # Add current user input
+    if request.tool_call_id:
+        messages.append(ToolMessage(content=request.user_input, tool_call_id=request.tool_call_id))
+    else:
+        messages.append(HumanMessage(content=request.user_input))
+    return messages
+
+def _last_user_input(messages: List[BaseMessage]) -> Optional[str]:
+    """Content of the user's latest message or answer (answers are ToolMessages without a tool name)."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage) or (isinstance(message, ToolMessage) and not message.name):
+            return message.content
+    return None
+
+def _retry_later(error: RetryLater, thread_id: str) -> HTTPException:
+    """503 for a saturated upstream API; retrying with the same input and thread_id continues the run."""
+    return HTTPException(
+        status_code=503,
+        detail={"message": str(error), "thread_id": thread_id},
+        headers={"Retry-After": str(math.ceil(error.retry_after))},
+    )
+
+async def _prepare_run(request: ChatRequest, config: dict) -> Optional[dict]:
+    """
+    Returns the graph input for this turn. A stored thread only receives the new
+    user input; an answer to a pending question resumes the interrupted run.
+    """
+    agent = get_agent()
+    snapshot = await agent.aget_state(config) if agent.checkpointer else None
+    if snapshot is None or not snapshot.values.get("messages"):
+        return {"messages": _history_to_messages(request)}
+
+    pending_call = pending_human_call(snapshot.values["messages"]) if "human" in snapshot.next else None
+    if request.tool_call_id or pending_call:
+        tool_call_id = request.tool_call_id or pending_call['id']
+        if pending_call and snapshot.created_at:
+            asked_at = datetime.fromisoformat(snapshot.created_at)
+            HUMAN_WAIT_SECONDS.observe(max((datetime.now(timezone.utc) - asked_at).total_seconds(), 0))
+        await agent.aupdate_state(
+            config,
+            {"messages": [ToolMessage(content=request.user_input, tool_call_id=tool_call_id)]},
+            as_node="human",
+        )
+        return None  # Resume from the stored state
+    if set(snapshot.next) - {"human"} and _last_user_input(snapshot.values["messages"]) == request.user_input:
+        return None  # The previous run stopped midway (e.g. 503) and the client retries it: continue it
+    return {"messages": [HumanMessage(content=request.user_input)]}
+
+def _format_response(last_message: BaseMessage) -> dict:
+    """Turns the last AI message into the /chat response payload."""
+    final_response_str = getattr(last_message, 'content', '')
+
+    # Handle tool calls (a question may come with research calls in parallel mode)
+    if tool_call := pending_human_call([last_message]):
+        question = tool_call['args'].get('question', 'I have a question.')
+        return {"response": question, "tool_call_id": tool_call['id']}
+
+    # Recommendations were validated against the schema in the llm node
+    if result := result_or_none(final_response_str):
+        return {"response": result.model_dump()}
+    if final_response_str:
+        return {"response": final_response_str}
+
+    # Fallback response
+    return {"response": "I'm processing your request. Please wait a moment."}
 
 # --- Chat Endpoint ---
 @app.post("/chat")
-async def chat_with_agent(request: ChatRequest):
+async def chat_with_agent(request: ChatRequest, http_request: Request):
     try:
+        agent = _agent_or_none()
         if agent is None:
             raise HTTPException(status_code=500, detail="Agent not initialized")
-        
-        messages: List[BaseMessage] = [SystemMessage(content=german_system_prompt)]
-        
-        # Process chat history
-        for item in request.chat_history:
-            if item.type == "human":
-                messages.append(HumanMessage(content=item.content))
-            elif item.type == "ai":
-                try:
-                    json.loads(item.content)
-                    messages.append(AIMessage(content=item.content))
-                except (json.JSONDecodeError, TypeError):
-                    messages.append(AIMessage(content=item.content))
-        
-        # Add current user input
-        if request.tool_call_id:
-            messages.append(ToolMessage(content=request.user_input, tool_call_id=request.tool_call_id))
-        else:
-            messages.append(HumanMessage(content=request.user_input))
+
+        thread_id = request.thread_id or str(uuid.uuid4())
+        config = _run_config(thread_id)
 
         # Process with agent - use a more robust approach
         try:
-            # Use invoke instead of stream for simpler handling
-            result = agent.invoke({"messages": messages})
-            print(f"DEBUG: Agent result type: {type(result)}")
-            print(f"DEBUG: Agent result keys: {list(result.keys()) if isinstance(result, dict) else 'not dict'}")
+            graph_input = await _prepare_run(request, config)
+            # Await the graph so slow LLM calls and scrapes don't block the worker's event loop
+            result = await _until_disconnected(http_request, agent.ainvoke(graph_input, config))
+            if result is None:
+                logger.info("Client disconnected, run of thread %s cancelled", thread_id)
+                # nginx's "client closed request"; nobody reads it, but it shows up in the metrics
+                return Response(status_code=499)
+            logger.debug("Agent result type: %s", type(result))
+            logger.debug("Agent result keys: %s", list(result.keys()) if isinstance(result, dict) else 'not dict')
             
             # Extract messages from the result
             if isinstance(result, dict) and "messages" in result:
@@ -89,45 +272,134 @@ async def chat_with_agent(request: ChatRequest):
             if not messages_list:
                 raise HTTPException(status_code=500, detail="No messages in agent response")
             
-            last_message = messages_list[-1]
-            print(f"DEBUG: Last message type: {type(last_message)}")
-            print(f"DEBUG: Last message content: {getattr(last_message, 'content', 'NO CONTENT')}")
+            # After parallel tool calls the question's AI message is followed by ToolMessages
+            last_message = next((m for m in reversed(messages_list) if isinstance(m, AIMessage)), messages_list[-1])
+            logger.debug("Last message type: %s", type(last_message))
+            logger.debug("Last message content: %s", getattr(last_message, 'content', 'NO CONTENT'))
             
+        except RetryLater as e:
+            logger.warning("Agent run deferred: %s", e)
+            raise _retry_later(e, thread_id)
         except Exception as e:
-            print(f"Agent processing error: {e}")
+            logger.exception("Agent processing error")
             raise HTTPException(status_code=500, detail=f"Agent processing error: {str(e)}")
 
-        final_response_str = getattr(last_message, 'content', '')
-
-        # Handle tool calls
-        if not final_response_str and hasattr(last_message, "tool_calls") and last_message.tool_calls:
-            tool_call = last_message.tool_calls[0]
-            if tool_call['name'] == 'human_feedback_tool':
-                question = tool_call['args'].get('question', 'I have a question.')
-                return {"response": question, "tool_call_id": tool_call['id']}
-
-        # Handle JSON responses
-        if final_response_str:
-            json_match = re.search(r'\{.*\}', final_response_str, re.DOTALL)
-            if json_match:
-                json_string = json_match.group(0)
-                try:
-                    final_response_json = json.loads(json_string)
-                    return {"response": final_response_json}
-                except json.JSONDecodeError:
-                    return {"response": final_response_str}
-            else:
-                return {"response": final_response_str}
-        
-        # Fallback response
-        return {"response": "I'm processing your request. Please wait a moment."}
+        return {**_format_response(last_message), "thread_id": thread_id}
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        logger.exception("Unexpected error")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+# --- Streaming Chat Endpoint ---
+def _sse(event: str, data: dict) -> str:
+    """Formats one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def _recommendation_events(parsers: dict, run_id: str, content: str) -> List[str]:
+    parser = parsers.setdefault(run_id, RecommendationStream())
+    start = parser.count
+    return [
+        _sse("recommendation", {"index": start + i, **recommendation.model_dump()})
+        for i, recommendation in enumerate(parser.feed(content))
+    ]
+
+async def _stream_agent_events(graph_input: Optional[dict], config: dict, thread_id: str) -> AsyncIterator[str]:
+    """
+    Translates LangGraph events into SSE messages: `token` (LLM output as it is
+    generated), `recommendation` (each recommendation as soon as it is complete),
+    `tool_start`/`tool_end` (with timings), and a closing `human_feedback`,
+    `final` or `error` event. The `final` answer replaces the recommendations
+    sent before it (a repaired answer is streamed again from index 0). The closing
+    event is built from the graph state, like the /chat response.
+    """
+    yield _sse("start", {"thread_id": thread_id})
+    agent = get_agent()
+    tool_started_at = {}
+    held_tokens = {}  # Research-model output, sent once it is clear the final model won't replace it
+    parsers = {}  # Per model call
+    final_state = {}
+    try:
+        async for event in agent.astream_events(graph_input, config, version="v2"):
+            kind = event["event"]
+            node = event.get("metadata", {}).get("langgraph_node")
+
+            if kind == "on_chat_model_stream" and node == "llm":
+                content = event["data"]["chunk"].content
+                if content and RESEARCH in event.get("tags", []):
+                    held_tokens.setdefault(event["run_id"], []).append(content)
+                elif content:
+                    yield _sse("token", {"content": content})
+                    for sse in _recommendation_events(parsers, event["run_id"], content):
+                        yield sse
+            elif kind == "on_chat_model_end" and node == "llm":
+                output = event["data"]["output"]
+                held = held_tokens.pop(event["run_id"], [])
+                if RESEARCH in event.get("tags", []) and escalation(output):
+                    continue
+                if held:
+                    yield _sse("token", {"content": "".join(held)})
+                    for sse in _recommendation_events(parsers, event["run_id"], "".join(held)):
+                        yield sse
+                yield _sse("llm_end", {})
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # The graph's own output; without a checkpointer the only copy of the final state
+                final_state = event["data"].get("output") or {}
+            elif kind == "on_tool_start":
+                tool_started_at[event["run_id"]] = time.perf_counter()
+                yield _sse("tool_start", {"run_id": event["run_id"], "name": event["name"], "input": event["data"].get("input")})
+            elif kind == "on_tool_end":
+                started_at = tool_started_at.pop(event["run_id"], None)
+                output = event["data"].get("output")
+                yield _sse("tool_end", {
+                    "run_id": event["run_id"],
+                    "name": event["name"],
+                    "duration_ms": round((time.perf_counter() - started_at) * 1000) if started_at else None,
+                    "output_chars": len(str(getattr(output, "content", output) or "")),
+                })
+    except asyncio.CancelledError:
+        # Starlette cancels the response when the client disconnects, which stops the graph
+        logger.info("Client disconnected, run of thread %s cancelled", thread_id)
+        raise
+    except RetryLater as e:
+        logger.warning("Agent run deferred: %s", e)
+        yield _sse("error", {"detail": str(e), "retry_after": math.ceil(e.retry_after), "thread_id": thread_id})
+        return
+    except Exception as e:
+        logger.exception("Agent streaming error")
+        yield _sse("error", {"detail": f"Agent processing error: {str(e)}"})
+        return
+
+    # Not the raw model output: the llm node drops tool calls of forced answers and stores repaired,
+    # canonical JSON
+    if agent.checkpointer:
+        final_state = (await agent.aget_state(config)).values
+    messages = final_state.get("messages", []) if isinstance(final_state, dict) else []
+    last_message = next((m for m in reversed(messages) if isinstance(m, AIMessage)), None)
+    if last_message is None:
+        yield _sse("error", {"detail": "No messages in agent response"})
+        return
+
+    payload = {**_format_response(last_message), "thread_id": thread_id}
+    yield _sse("human_feedback" if "tool_call_id" in payload else "final", payload)
+
+@app.post("/chat/stream")
+async def chat_with_agent_stream(request: ChatRequest):
+    """Same contract as /chat, but streams the run as server-sent events."""
+    if _agent_or_none() is None:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    thread_id = request.thread_id or str(uuid.uuid4())
+    config = _run_config(thread_id)
+    graph_input = await _prepare_run(request, config)
+    return StreamingResponse(
+        _stream_agent_events(graph_input, config, thread_id),
+        media_type="text/event-stream",
+        # Stop proxies (nginx, Render) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/")
 def read_root():
     return {"message": "API is running."}
@@ -136,18 +408,38 @@ def read_root():
 def health_check():
     return {"status": "healthy", "message": "API is running"}
 
+@app.get("/stats")
+def stats():
+    """Per worker process: cache counters, knowledge index size, startup timings and the scheduler queue."""
+    return {
+        "page_cache": page_cache.stats(),
+        "search_cache": search_cache.stats(),
+        "knowledge_index": knowledge_index.stats(),
+        "answer_cache": answer_cache.stats() if ANSWER_CACHE_MODE in ("answer", "seed") else None,
+        "startup_ms": startup_timings(),
+        "scheduler": scheduler.stats(),
+    }
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: node/tool latencies, token usage, cache hits and request counts."""
+    data, content_type = render_metrics()
+    return Response(content=data, media_type=content_type)
+
 @app.get("/test-agent")
 async def test_agent():
     """Test endpoint to check if the agent is working properly."""
     try:
+        agent = _agent_or_none()
         if agent is None:
             return {"error": "Agent not initialized"}
         
         # Test with a simple message
-        messages = [SystemMessage(content=german_system_prompt)]
+        messages = [SystemMessage(content=get_system_prompt())]
         messages.append(HumanMessage(content="Test message"))
         
-        result = agent.invoke({"messages": messages})
+        config = _run_config(f"test-{uuid.uuid4()}")
+        result = await agent.ainvoke({"messages": messages}, config)
         
         return {
             "status": "success",
@@ -162,6 +454,10 @@ async def test_agent():
 async def options_chat():
     return {"message": "OK"}
 
+@app.options("/chat/stream")
+async def options_chat_stream():
+    return {"message": "OK"}
+
 @app.options("/")
 async def options_root():
     return {"message": "OK"}
@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from rich.console import Console
+from rich.table import Table
+
+from agent.answer import result_or_none
+from agent.checkpoint import SqliteSaver
+from agent.config import BATCH_CONCURRENCY, BATCH_MAX_QUESTIONS, validate_runtime_config
+from agent.graph import create_agent_graph, pending_human_call
+from agent.scheduler import BATCH, priority
+from agent.system_prompt import get_system_prompt
+
+console = Console()
+
+# --- Input and output files ---
+def read_profiles(path: str) -> list[dict]:
+    """
+    One profile per line: {"id": "...", "profile": "...", "answers": [...]}.
+    `answers` (optional) are given to the agent's questions in order; a line
+    without `id` is identified by its line number.
+    """
+    profiles = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            item.setdefault("id", f"line-{number}")
+            item["id"] = str(item["id"])
+            if not (item.get("profile") or item.get("user_input")):
+                raise ValueError(f"{path}:{number}: missing 'profile'")
+            profiles.append(item)
+    return profiles
+
+def read_answers(path: Optional[str]) -> dict[str, str]:
+    """Answers to questions a previous run left open: {"id": "...", "answer": "..."} per line."""
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {str(item["id"]): item["answer"] for item in map(json.loads, filter(str.strip, f))}
+
+def read_results(path: str) -> dict[str, dict]:
+    """Results of earlier runs; the output is append-only, so the last line per id counts."""
+    results = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut off when the previous run was killed
+                results[str(record["id"])] = record
+    return results
+
+def parse_answer(content: str):
+    """The agent's validated recommendations, or its text if it did not answer with them."""
+    result = result_or_none(content)
+    return result.model_dump() if result else content
+
+# --- One profile ---
+async def run_profile(
+    graph,
+    item: dict,
+    *,
+    default_answer: Optional[str],
+    max_questions: int,
+    resume: Optional[dict] = None,
+) -> dict:
+    """
+    Runs the agent for one profile until it answers. Its questions get the
+    profile's recorded answers, then `default_answer`; without one, or after
+    `max_questions`, the conversation is returned as pending with its thread_id.
+    `resume` ({"thread_id", "answer"}) continues such a pending conversation.
+    """
+    thread_id = resume["thread_id"] if resume else f"batch-{uuid.uuid4()}"
+    config = {"configurable": {"thread_id": thread_id}}
+    answers = [resume["answer"]] if resume else []
+    answers += list(item.get("answers", []))
+    graph_input = None
+    if not resume:
+        profile = item.get("profile") or item.get("user_input")
+        graph_input = {"messages": [SystemMessage(content=get_system_prompt()), HumanMessage(content=profile)]}
+
+    questions = 0
+    while True:
+        if graph_input is None:
+            snapshot = await graph.aget_state(config)
+            call = pending_human_call(snapshot.values.get("messages", []))
+            if call is None:
+                raise RuntimeError(f"No pending question in thread {thread_id} (expired?)")
+            await graph.aupdate_state(
+                config, {"messages": [ToolMessage(content=answers.pop(0), tool_call_id=call["id"])]}, as_node="human"
+            )
+        result = await graph.ainvoke(graph_input, config)
+        messages = result["messages"]
+        if call := pending_human_call(messages):
+            questions += 1
+            if not answers and default_answer is not None:
+                answers.append(default_answer)
+            if not answers or questions > max_questions:
+                return {"status": "pending", "question": call["args"].get("question", ""), "thread_id": thread_id}
+            graph_input = None
+            continue
+        last_message = next((m for m in reversed(messages) if isinstance(m, AIMessage)), messages[-1])
+        return {"status": "done", "response": parse_answer(str(last_message.content)), "thread_id": thread_id}
+
+# --- Batch ---
+async def run_batch(
+    profiles: list[dict],
+    output_path: str,
+    *,
+    concurrency: int = BATCH_CONCURRENCY,
+    default_answer: Optional[str] = None,
+    max_questions: int = BATCH_MAX_QUESTIONS,
+    answers: Optional[dict[str, str]] = None,
+    graph=None,
+) -> dict:
+    """
+    Processes the profiles with `concurrency` workers and appends one JSON line
+    per profile to `output_path` as soon as it finishes. Profiles already done
+    in the output are skipped; pending ones are continued once `answers` has one.
+    """
+    answers = answers or {}
+    # Leaves part of the shared OpenAI/Tavily limits to interactive /chat traffic
+    priority.set(BATCH)
+    previous = read_results(output_path)
+    todo = []
+    for item in profiles:
+        record = previous.get(item["id"])
+        if record is None or record["status"] == "error":
+            todo.append((item, None))
+        elif record["status"] == "pending" and item["id"] in answers:
+            todo.append((item, {"thread_id": record["thread_id"], "answer": answers[item["id"]]}))
+
+    # Pending conversations must survive the process to be continued later
+    graph = graph or create_agent_graph(checkpointer=SqliteSaver())
+    queue: asyncio.Queue = asyncio.Queue()
+    for entry in todo:
+        queue.put_nowait(entry)
+    counts = {"done": 0, "pending": 0, "error": 0}
+    durations: list[float] = []
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        async def worker():
+            while not queue.empty():
+                item, resume = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    record = await run_profile(
+                        graph, item, default_answer=default_answer, max_questions=max_questions, resume=resume
+                    )
+                except Exception as e:
+                    record = {"status": "error", "error": repr(e)}
+                elapsed = time.perf_counter() - start
+                durations.append(elapsed)
+                counts[record["status"]] += 1
+                output.write(json.dumps({"id": item["id"], **record, "seconds": round(elapsed, 2)}, ensure_ascii=False) + "\n")
+                output.flush()
+                console.print(f"[{sum(counts.values())}/{len(todo)}] {item['id']}: {record['status']} ({elapsed:.1f}s)")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        wall = time.perf_counter() - start
+
+    return {
+        **counts,
+        "skipped": len(profiles) - len(todo),
+        "wall_seconds": round(wall, 2),
+        "profiles_per_minute": round(len(todo) / wall * 60, 2) if wall else 0.0,
+        "mean_seconds": round(sum(durations) / len(durations), 2) if durations else 0.0,
+        "max_seconds": round(max(durations), 2) if durations else 0.0,
+    }
+
+def main():
+    """Runs the agent for every student profile of a JSONL file."""
+    parser = argparse.ArgumentParser(description="Futedu batch recommendations")
+    parser.add_argument("input", help="JSONL file with one profile per line")
+    parser.add_argument("output", help="JSONL file the results are appended to (also used to resume)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="profiles processed at the same time")
+    parser.add_argument("--default-answer", help="answer to the agent's questions; without it they are written out as pending")
+    parser.add_argument("--max-questions", type=int, default=BATCH_MAX_QUESTIONS, help="questions answered per profile")
+    parser.add_argument("--answers", help="JSONL file with answers to pending questions: {\"id\", \"answer\"}")
+    args = parser.parse_args()
+
+    try:
+        validate_runtime_config()
+    except Exception as e:
+        console.print(f"[bold red]Missing configuration:[/bold red] {e}")
+        return
+
+    profiles = read_profiles(args.input)
+    summary = asyncio.run(run_batch(
+        profiles, args.output,
+        concurrency=args.concurrency, default_answer=args.default_answer,
+        max_questions=args.max_questions, answers=read_answers(args.answers),
+    ))
+    table = Table("Done", "Pending", "Errors", "Skipped", "Wall time", "Profiles/min", "Mean per profile")
+    table.add_row(
+        str(summary["done"]), str(summary["pending"]), str(summary["error"]), str(summary["skipped"]),
+        f"{summary['wall_seconds']}s", str(summary["profiles_per_minute"]), f"{summary['mean_seconds']}s",
+    )
+    console.print(table)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+def _call(name: str, **args) -> dict:
+    return {"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}
+
+class FixtureChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for the OpenAI model. It derives the next step from the
+    conversation itself, so any number of conversations can run concurrently:
+    search, scrape the first hit, ask the student once if the profile names no
+    preferred city ("Wunschort"), then answer with the final JSON.
+    `latency_seconds` simulates the model's response time.
+    """
+
+    latency_seconds: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fixture"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FixtureChatModel":
+        return self
+
+    def _next_message(self, messages: List[BaseMessage]) -> AIMessage:
+        profile = next((str(m.content) for m in messages if isinstance(m, HumanMessage)), "")
+        tool_results = [m for m in messages if isinstance(m, ToolMessage)]
+        subject = profile.split()[-1].strip(".!") if profile.split() else "Informatik"
+
+        if not tool_results:
+            return AIMessage(content="", tool_calls=[_call("web_search", query=f"Studiengang {subject} Bachelor")])
+        last = tool_results[-1]
+        if last.name == "web_search":
+            try:
+                url = json.loads(str(last.content))["results"][0]["url"]
+            except (ValueError, KeyError, IndexError, TypeError):
+                url = None
+            if url:
+                return AIMessage(content="", tool_calls=[_call("scrape_website_tool", url=url, query="Zulassung Gehalt")])
+        asked = any(
+            call["name"] == "human_feedback_tool" for m in messages if isinstance(m, AIMessage) for call in m.tool_calls
+        )
+        if "Wunschort" not in profile and not asked:
+            return AIMessage(content="", tool_calls=[_call("human_feedback_tool", question="In welcher Stadt möchtest du studieren?")])
+        answer = {
+            "recommendations": [
+                {"title": f"{subject} (B.Sc.)", "income": "ca. 48.000 Euro Einstiegsgehalt", "reasoning": "Passt zu deinen Interessen."},
+                {"title": f"Angewandte {subject}", "income": "ca. 45.000 Euro", "reasoning": "Praxisnah."},
+                {"title": f"{subject} und Wirtschaft", "income": "ca. 50.000 Euro", "reasoning": "Breite Berufsaussichten."},
+            ],
+            "summary": f"Drei Studiengänge rund um {subject}.",
+        }
+        return AIMessage(content=json.dumps(answer, ensure_ascii=False))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
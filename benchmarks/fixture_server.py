@@ -0,0 +1,97 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+UNIVERSITIES = ["TU Beispielstadt", "Universität Musterhausen", "Hochschule Nordheim", "Universität Südfeld"]
+
+def _slug(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()[:10]
+
+def university_page(path: str) -> bytes:
+    """Deterministic programme page with the boilerplate real university sites have."""
+    seed = int(_slug(path), 16)
+    university = UNIVERSITIES[seed % len(UNIVERSITIES)]
+    semesters = 6 + seed % 2
+    filler = " ".join(f"Modul {i}: Grundlagen und Vertiefung mit Übungen und Projektarbeit." for i in range(30))
+    return f"""<!doctype html><html><head><meta charset="utf-8"><title>Studiengang | {university}</title>
+<script>window.analytics = {{}};</script></head><body>
+<div class="cookie-consent">Diese Website verwendet Cookies. <button>OK</button></div>
+<header><nav>{" ".join(f'<a href="/uni/nav/{i}">Menüpunkt {i}</a>' for i in range(40))}</nav></header>
+<main><h1>Studiengang (B.Sc.) an der {university}</h1>
+<p>Regelstudienzeit: {semesters} Semester. Studienbeginn: Wintersemester. Unterrichtssprache: Deutsch.</p>
+<h2>Zulassung</h2><p>Der Studiengang ist {"zulassungsfrei" if seed % 3 else "zulassungsbeschränkt (NC 2,{seed % 9})"}.</p>
+<h2>Kosten</h2><p>Es fallen keine Studiengebühren an, der Semesterbeitrag beträgt {200 + seed % 150} Euro.</p>
+<h2>Berufsaussichten</h2><p>Das Einstiegsgehalt liegt bei etwa {42 + seed % 15}.000 Euro im Jahr.</p>
+<h2>Inhalte</h2><p>{filler}</p></main>
+<footer>Impressum · Datenschutz · Barrierefreiheit</footer></body></html>""".encode()
+
+def search_response(query: str, base_url: str, max_results: int = 3) -> dict:
+    """Tavily-shaped answer whose results point at pages of the fixture server."""
+    results = []
+    for i in range(max_results):
+        path = f"/uni/{_slug(query)}/{i}"
+        results.append({
+            "title": f"{query} – {UNIVERSITIES[i % len(UNIVERSITIES)]}",
+            "url": f"{base_url}{path}",
+            "content": f"Alles zum Studiengang {query}: Zulassung, Regelstudienzeit und Berufsaussichten.",
+            "score": round(0.9 - i * 0.1, 2),
+            "raw_content": None,
+        })
+    return {"query": query, "follow_up_questions": None, "answer": None, "images": [], "results": results, "response_time": 0.0}
+
+class FixtureServer:
+    """
+    Local stand-in for the Tavily API (POST /search) and for university sites
+    (GET /uni/...), with an optional artificial latency per response.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0) -> None:
+        self.latency_seconds = latency_seconds
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: bytes, content_type: str) -> None:
+                server.requests += 1
+                if server.latency_seconds:
+                    time.sleep(server.latency_seconds)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                params = json.loads(self.rfile.read(length) or b"{}")
+                if urlsplit(self.path).path != "/search":
+                    return self._send(404, b"{}", "application/json")
+                body = search_response(params.get("query", ""), server.base_url, params.get("max_results") or 3)
+                self._send(200, json.dumps(body).encode(), "application/json")
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                if path.startswith("/uni/"):
+                    return self._send(200, university_page(path), "text/html; charset=utf-8")
+                self._send(404, b"not found", "text/plain")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
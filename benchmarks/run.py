@@ -0,0 +1,300 @@
+"""
+Offline benchmark of the agent: the real graph and FastAPI app, a scripted
+model and a local fixture server instead of OpenAI, Tavily and university sites.
+
+    python -m benchmarks.run --conversations 50 --concurrency 8 --output results.json
+    python -m benchmarks.run --compare results.json   # run again and show the change
+"""
+import os
+import tempfile
+
+# Fresh caches for every run, so results are comparable between commits
+os.environ.setdefault("FUTEDU_DATA_DIR", tempfile.mkdtemp(prefix="futedu-benchmark-"))
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import threading
+import time
+import uuid
+from typing import Optional
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+import agent.graph as graph_module
+from agent.http_client import http_client
+from agent.system_prompt import get_system_prompt
+from agent.tools import tools
+from benchmarks.fake_llm import FixtureChatModel
+from benchmarks.fixture_server import FixtureServer
+
+CONVERSATIONS_FILE = os.path.join(os.path.dirname(__file__), "conversations.jsonl")
+DEFAULT_ANSWER = "Das ist mir egal."
+MAX_QUESTIONS = 10
+NODES = ("llm", "tools", "human")
+
+# --- Statistics ---
+def percentile(values: list[float], q: float) -> float:
+    """Linear interpolation between the closest ranks, like numpy's default."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize(seconds: list[float]) -> dict:
+    """Latency summary in milliseconds."""
+    if not seconds:
+        return {"count": 0}
+    ms = [s * 1000 for s in seconds]
+    return {
+        "count": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+class LatencyRecorder(BaseCallbackHandler):
+    """Collects the duration of every graph node run and tool call."""
+
+    def __init__(self) -> None:
+        self.nodes: dict[str, list[float]] = {}
+        self.tools: dict[str, list[float]] = {}
+        self._roots: set = set()
+        self._tool_runs: set = set()
+        self._starts: dict = {}
+        self._lock = threading.Lock()
+
+    def _record(self, bucket: dict, run_id) -> None:
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+            if started is not None:
+                name, start = started
+                bucket.setdefault(name, []).append(time.perf_counter() - start)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            if parent_run_id is None:
+                self._roots.add(run_id)
+            # Node runs are the direct children of the graph run
+            elif parent_run_id in self._roots and kwargs.get("name") in NODES:
+                self._starts[run_id] = (kwargs["name"], time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._record(self.nodes, run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._record(self.nodes, run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._tool_runs.add(run_id)
+            # A wrapped tool (cache, index) reports the inner call as a nested tool run
+            if parent_run_id not in self._tool_runs:
+                self._starts[run_id] = ((serialized or {}).get("name") or kwargs.get("name", "tool"), time.perf_counter())
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._record(self.tools, run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._record(self.tools, run_id)
+
+# --- Setup ---
+def load_conversations(path: str, count: int) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        recorded = [json.loads(line) for line in f if line.strip()]
+    return [recorded[i % len(recorded)] for i in range(count)]
+
+def _search_tool(tool):
+    # web_search may be wrapped by the search cache and the knowledge index
+    while hasattr(tool, "inner"):
+        tool = tool.inner
+    return tool
+
+def install_fixtures(server: FixtureServer, llm_latency: float) -> None:
+    """Points the agent at the fake model and the fixture server."""
+    graph_module.llm = FixtureChatModel(latency_seconds=llm_latency)
+    _search_tool(next(t for t in tools if t.name == "web_search")).api_wrapper.api_base_url = server.base_url
+    # All fixture sites share one host; keep the politeness delay from dominating the numbers
+    http_client.host_min_interval = 0
+
+# --- Phase 1: graph ---
+async def replay(graph, conversation: dict, recorder: LatencyRecorder) -> float:
+    """Runs one conversation to its final answer, answering the agent's questions from the recording."""
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}, "callbacks": [recorder]}
+    answers = list(conversation.get("answers", []))
+    start = time.perf_counter()
+    result = await graph.ainvoke(
+        {"messages": [SystemMessage(content=get_system_prompt()), HumanMessage(content=conversation["user_input"])]}, config
+    )
+    for _ in range(MAX_QUESTIONS):
+        if not (call := graph_module.pending_human_call(result["messages"])):
+            break
+        answer = answers.pop(0) if answers else DEFAULT_ANSWER
+        await graph.aupdate_state(
+            config, {"messages": [ToolMessage(content=answer, tool_call_id=call["id"])]}, as_node="human"
+        )
+        result = await graph.ainvoke(None, config)
+    return time.perf_counter() - start
+
+async def bench_graph(conversations: list[dict], concurrency: int) -> dict:
+    graph = graph_module.create_agent_graph(checkpointer=InMemorySaver())
+    recorder = LatencyRecorder()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(conversation):
+        async with semaphore:
+            return await replay(graph, conversation, recorder)
+
+    start = time.perf_counter()
+    durations = await asyncio.gather(*(run(c) for c in conversations))
+    wall = time.perf_counter() - start
+    return {
+        "conversations": len(conversations),
+        "wall_seconds": round(wall, 3),
+        "conversations_per_second": round(len(conversations) / wall, 3),
+        "end_to_end": summarize(list(durations)),
+        "nodes": {name: summarize(values) for name, values in sorted(recorder.nodes.items())},
+        "tools": {name: summarize(values) for name, values in sorted(recorder.tools.items())},
+    }
+
+# --- Phase 2: /chat ---
+async def bench_api(conversations: list[dict], concurrency: int) -> dict:
+    from api import app
+
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        async def post(payload: dict) -> Optional[dict]:
+            nonlocal errors
+            start = time.perf_counter()
+            response = await client.post("/chat", json=payload)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+                return None
+            return response.json()
+
+        async def run(conversation):
+            async with semaphore:
+                answers = list(conversation.get("answers", []))
+                body = await post({"user_input": conversation["user_input"]})
+                for _ in range(MAX_QUESTIONS):
+                    if not (body and body.get("tool_call_id")):
+                        break
+                    answer = answers.pop(0) if answers else DEFAULT_ANSWER
+                    body = await post({"user_input": answer, "thread_id": body["thread_id"]})
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run(c) for c in conversations))
+        wall = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(len(latencies) / wall, 3),
+        "latency": summarize(latencies),
+    }
+
+# --- Report ---
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(
+    *,
+    conversations: int = 20,
+    concurrency: int = 4,
+    llm_latency_ms: float = 0.0,
+    web_latency_ms: float = 0.0,
+    conversations_file: str = CONVERSATIONS_FILE,
+    phases: tuple = ("graph", "api"),
+) -> dict:
+    replayed = load_conversations(conversations_file, conversations)
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "settings": {
+                "conversations": conversations, "concurrency": concurrency,
+                "llm_latency_ms": llm_latency_ms, "web_latency_ms": web_latency_ms,
+            },
+        }
+    }
+    with FixtureServer(latency_seconds=web_latency_ms / 1000) as server:
+        install_fixtures(server, llm_latency_ms / 1000)
+        if "graph" in phases:
+            results["graph"] = asyncio.run(bench_graph(replayed, concurrency))
+        if "api" in phases:
+            results["api"] = asyncio.run(bench_api(replayed, concurrency))
+        results["meta"]["fixture_requests"] = server.requests
+    return results
+
+def compare(previous: dict, current: dict) -> list[str]:
+    """One line per headline metric: previous → current and the relative change."""
+    metrics = [
+        ("graph end-to-end p50", ("graph", "end_to_end", "p50_ms")),
+        ("graph end-to-end p95", ("graph", "end_to_end", "p95_ms")),
+        ("graph end-to-end p99", ("graph", "end_to_end", "p99_ms")),
+        ("llm node p50", ("graph", "nodes", "llm", "p50_ms")),
+        ("tools node p50", ("graph", "nodes", "tools", "p50_ms")),
+        ("/chat p95", ("api", "latency", "p95_ms")),
+        ("/chat requests/s", ("api", "requests_per_second")),
+    ]
+    lines = []
+    for label, path in metrics:
+        before, after = previous, current
+        for key in path:
+            before = before.get(key, {}) if isinstance(before, dict) else {}
+            after = after.get(key, {}) if isinstance(after, dict) else {}
+        if isinstance(before, (int, float)) and isinstance(after, (int, float)) and before:
+            lines.append(f"{label}: {before} -> {after} ({(after - before) / before:+.1%})")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Futedu agent")
+    parser.add_argument("--conversations", type=int, default=20, help="conversations to replay per phase")
+    parser.add_argument("--concurrency", type=int, default=4, help="conversations running at the same time")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated model response time")
+    parser.add_argument("--web-latency-ms", type=float, default=0.0, help="simulated search/page response time")
+    parser.add_argument("--conversations-file", default=CONVERSATIONS_FILE, help="recorded conversations (JSONL)")
+    parser.add_argument("--phase", choices=["graph", "api"], action="append", help="run only this phase (repeatable)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        conversations=args.conversations,
+        concurrency=args.concurrency,
+        llm_latency_ms=args.llm_latency_ms,
+        web_latency_ms=args.web_latency_ms,
+        conversations_file=args.conversations_file,
+        phases=tuple(args.phase or ("graph", "api")),
+    )
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print("\n".join(compare(json.load(f), results)))
+
+if __name__ == "__main__":
+    main()
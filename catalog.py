@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+from agent.catalog import build_catalog, catalog_store
+from agent.config import (
+    CATALOG_CONCURRENCY,
+    CATALOG_MAX_DEPTH,
+    CATALOG_MAX_PAGES_PER_SITE,
+    CATALOG_SEEDS_FILE,
+)
+
+console = Console()
+
+def read_seeds(path: str) -> list[str]:
+    """One start URL per line; blank lines and lines starting with # are ignored."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+def build(args) -> None:
+    seeds = read_seeds(args.seeds)
+    console.print(f"Crawling {len(seeds)} sites (up to {args.max_pages} pages each, {args.concurrency} at a time per site)...")
+    start = time.perf_counter()
+    counts = asyncio.run(build_catalog(
+        seeds, catalog_store,
+        max_pages_per_site=args.max_pages, max_depth=args.max_depth, concurrency=args.concurrency,
+    ))
+    elapsed = time.perf_counter() - start
+    console.print(
+        f"[bold green]Done in {elapsed:.1f}s.[/bold green] "
+        f"{counts['fetched']} pages fetched: {counts['processed']} processed, "
+        f"{counts['not_modified']} not modified, {counts['unchanged']} unchanged, "
+        f"{counts['removed']} removed, {counts['failed']} failed. "
+        f"{counts['programmes']} programme pages updated."
+    )
+    console.print(catalog_store.stats())
+
+def search(args) -> None:
+    programmes = catalog_store.search(
+        args.query, university=args.university, degree=args.degree, language=args.language, limit=args.limit
+    )
+    table = Table("Programme", "University", "Degree", "Language", "Semesters", "URL")
+    for p in programmes:
+        table.add_row(p.title, p.university, p.degree or "", p.language or "", str(p.duration_semesters or ""), p.url)
+    console.print(table)
+
+def main():
+    """Builds and queries the study-programme catalog used by the catalog_search tool."""
+    parser = argparse.ArgumentParser(description="Futedu study-programme catalog")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="crawl the seed sites and refresh the catalog")
+    build_parser.add_argument("--seeds", default=CATALOG_SEEDS_FILE, help="file with one start URL per line")
+    build_parser.add_argument("--max-pages", type=int, default=CATALOG_MAX_PAGES_PER_SITE, help="pages per site")
+    build_parser.add_argument("--max-depth", type=int, default=CATALOG_MAX_DEPTH, help="link depth from the seed")
+    build_parser.add_argument("--concurrency", type=int, default=CATALOG_CONCURRENCY, help="pages fetched at once per site")
+    build_parser.set_defaults(handler=build)
+
+    search_parser = commands.add_parser("search", help="query the catalog")
+    search_parser.add_argument("query", nargs="?")
+    search_parser.add_argument("--university")
+    search_parser.add_argument("--degree")
+    search_parser.add_argument("--language")
+    search_parser.add_argument("--limit", type=int, default=20)
+    search_parser.set_defaults(handler=search)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# Picked up automatically by `gunicorn api:app` (see the dockerfile).
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+# Import the app and its heavy libraries once in the master; the forked workers
+# share them and boot without repeating the imports. The graph, model client and
+# connections are still created per worker (see agent.startup).
+preload_app = True
+
+# Runs when gunicorn reads this file, before the preloaded app imports
+# agent.metrics, which needs the directory to exist. Metric files of a previous
+# run would be added to the new totals.
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+def on_starting(server):
+    from agent.startup import preload, startup_timings
+
+    preload()
+    server.log.info("Preloaded libraries: %s", startup_timings())
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+# Building the agent creates the Tavily client, which needs a key; a dummy one lets
+# the offline tests build it. No test in this suite talks to the real APIs.
+os.environ.setdefault("TAVILY_API_KEY", "tvly-test")
+# Keep checkpoints and caches written during the tests out of the working tree
+os.environ.setdefault("FUTEDU_DATA_DIR", tempfile.mkdtemp(prefix="futedu-tests-"))
+# Estimate tokens instead of downloading a tiktoken encoding
+os.environ.setdefault("CONTEXT_TOKENIZER", "chars")
+
+class ScriptedChatModel(GenericFakeChatModel):
+    """Fake chat model that replays scripted AIMessages, tool calls included, also when streamed."""
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._generate(messages, stop=stop, run_manager=run_manager, **kwargs).generations[0].message
+        chunk = AIMessageChunk(
+            content=message.content,
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ],
+        )
+        if run_manager and message.content:
+            run_manager.on_llm_new_token(message.content, chunk=ChatGenerationChunk(message=chunk))
+        yield ChatGenerationChunk(message=chunk)
+
+@pytest.fixture
+def scripted_llm(monkeypatch):
+    """Installs a ScriptedChatModel as the agent's LLM and returns it."""
+    import agent.graph as graph_module
+
+    def install(*messages):
+        model = ScriptedChatModel(messages=iter(messages))
+        monkeypatch.setattr(graph_module, "llm", model)
+        return model
+
+    return install
+
+@pytest.fixture
+def scripted_research_llm(monkeypatch):
+    """Like `scripted_llm`, for the research steps; `scripted_llm` then scripts the final model."""
+    import agent.graph as graph_module
+
+    def install(*messages):
+        model = ScriptedChatModel(messages=iter(messages))
+        monkeypatch.setattr(graph_module, "research_llm", model)
+        return model
+
+    return install
@@ -0,0 +1,9 @@
+import json
+
+def parse_sse(body: str) -> list[tuple[str, dict]]:
+    """The (event, data) pairs of a server-sent-events response body."""
+    events = []
+    for raw in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in raw.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
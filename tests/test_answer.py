@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage
+
+import agent.graph as graph_module
+from agent.answer import RecommendationStream, parse_result
+from helpers import parse_sse
+
+ANSWER = {
+    "recommendations": [
+        {"title": "Informatik", "income": 'ca. 55.000 € "Einstieg"', "reasoning": "Mag {Logik} und [Mathe]"},
+        {"title": "Medizininformatik", "income": 52000, "reasoning": "Verbindet beides"},
+    ],
+    "summary": "Zwei gute Optionen",
+}
+TEXT = json.dumps(ANSWER, ensure_ascii=False)
+
+def test_parse_result_accepts_prose_and_fences_and_reports_schema_errors():
+    result = parse_result(f"Hier ist meine Antwort:\n```json\n{TEXT}\n```")
+    assert result.recommendations[1].income == "52000"
+
+    with pytest.raises(ValueError, match="summary"):
+        parse_result('{"recommendations": []}')
+    with pytest.raises(ValueError, match="no complete JSON object"):
+        parse_result('{"recommendations": [')
+
+def test_stream_parser_returns_each_recommendation_once_it_is_closed():
+    parser = RecommendationStream()
+    # Token by token: the first card is complete right at its closing brace
+    found = {i: [r.title for r in parser.feed(c)] for i, c in enumerate("Antwort: " + TEXT)}
+
+    assert {i: titles for i, titles in found.items() if titles} == {
+        len("Antwort: ") + TEXT.index('"}, {') + 1: ["Informatik"],
+        len("Antwort: ") + TEXT.index('"}]') + 1: ["Medizininformatik"],
+    }
+    assert parser.count == 2
+
+def test_invalid_answer_is_repaired_and_stored_as_json(scripted_llm):
+    scripted_llm(
+        AIMessage(content='Meine Empfehlung: {"recommendations": [{"title": "Informatik"}], "summary": "ok"}'),
+        AIMessage(content=TEXT),
+    )
+
+    result = graph_module.create_agent_graph().invoke({"messages": [HumanMessage(content="Profil")]})
+
+    assert json.loads(result["messages"][-1].content) == {
+        **ANSWER, "recommendations": [ANSWER["recommendations"][0], {**ANSWER["recommendations"][1], "income": "52000"}],
+    }
+
+def test_plain_text_is_not_repaired(scripted_llm):
+    scripted_llm(AIMessage(content="Ich brauche noch etwas Zeit."))
+
+    result = graph_module.create_agent_graph().invoke({"messages": [HumanMessage(content="Profil")]})
+
+    assert result["messages"][-1].content == "Ich brauche noch etwas Zeit."
+
+def test_stream_emits_recommendations_before_the_final_event(scripted_llm):
+    import api
+
+    scripted_llm(AIMessage(content=TEXT))
+
+    with TestClient(api.app).stream("POST", "/chat/stream", json={"user_input": "Profil"}) as response:
+        events = parse_sse(response.read().decode())
+
+    recommendations = [data for name, data in events if name == "recommendation"]
+    assert [(r["index"], r["title"]) for r in recommendations] == [(0, "Informatik"), (1, "Medizininformatik")]
+    assert events[-1][0] == "final" and events[-1][1]["response"]["summary"] == "Zwei gute Optionen"
@@ -0,0 +1,88 @@
+import json
+import time
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+import agent.graph as graph_module
+from agent.answer_cache import AnswerCache
+from helpers import parse_sse
+
+PROFILE = "Abi 1,8, mag Mathe und Informatik, will gut verdienen"
+SAME_PROFILE = "Abi 1.8 - mag Mathe und Informatik und will gut verdienen!"
+RESULT = {"recommendations": [{"title": "Informatik", "income": "hoch", "reasoning": "Mathe"}], "summary": "Passt"}
+ANSWER = AIMessage(content=json.dumps(RESULT, ensure_ascii=False))
+
+def test_lookup_finds_near_duplicates_only(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"))
+    cache.put(PROFILE, RESULT)
+
+    hit = cache.lookup(SAME_PROFILE)
+    assert hit.result == RESULT and hit.similarity > 0.9
+    # Another grade or other interests are different profiles
+    assert cache.lookup("Abi 3,2, mag Mathe und Informatik, will gut verdienen") is None
+    assert cache.lookup("Abi 1,8, mag Kunst und Geschichte, will reisen") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3, "entries": 1}
+
+def test_negated_profiles_do_not_share_answers(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"))
+    cache.put(PROFILE, RESULT)
+
+    assert cache.lookup("Abi 1,8, mag keine Mathe und Informatik, will gut verdienen") is None
+    assert cache.lookup("Abi 1,8, mag Mathe und Informatik, will nicht gut verdienen") is None
+
+    negated = "Abi 1,8, mag keine Mathe, aber Informatik, will gut verdienen"
+    cache.put(negated, RESULT)
+    assert cache.lookup("abi 1.8 - mag keine Mathe aber Informatik und will gut verdienen").similarity > 0.9
+
+def test_entries_expire_and_are_bounded(tmp_path, monkeypatch):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"), ttl_seconds=60, max_entries=2)
+    for profile in (PROFILE, "mag Biologie und Chemie", "mag Sprachen und Reisen"):
+        cache.put(profile, RESULT)
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup(PROFILE) is None  # The oldest entry was dropped
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.lookup("mag Sprachen und Reisen") is None
+
+def _use_cache(monkeypatch, tmp_path, mode):
+    monkeypatch.setattr(graph_module, "ANSWER_CACHE_MODE", mode)
+    monkeypatch.setattr(graph_module, "answer_cache", AnswerCache(str(tmp_path / "answers.sqlite")))
+
+def _run(profile):
+    return graph_module.create_agent_graph().invoke({"messages": [HumanMessage(content=profile)]})
+
+def test_answer_mode_skips_the_agent_for_a_near_duplicate(monkeypatch, tmp_path, scripted_llm):
+    _use_cache(monkeypatch, tmp_path, "answer")
+    scripted_llm(ANSWER)  # Only one model call is scripted
+
+    _run(PROFILE)
+    result = _run(SAME_PROFILE)
+
+    assert json.loads(result["messages"][-1].content) == RESULT
+    assert len(result["messages"]) == 2
+
+def test_seed_mode_lets_the_agent_verify_the_cached_answer(monkeypatch, tmp_path, scripted_llm):
+    _use_cache(monkeypatch, tmp_path, "seed")
+    scripted_llm(ANSWER, ANSWER)
+
+    _run(PROFILE)
+    result = _run(SAME_PROFILE)
+
+    seed = result["messages"][1]
+    assert isinstance(seed, SystemMessage) and '"Informatik"' in seed.content
+    assert json.loads(result["messages"][-1].content) == RESULT
+
+def test_stream_returns_a_cached_answer(monkeypatch, tmp_path, scripted_llm):
+    import api
+
+    _use_cache(monkeypatch, tmp_path, "answer")
+    graph_module.answer_cache.put(PROFILE, RESULT)
+    monkeypatch.setattr(api, "get_agent", graph_module.create_agent_graph)
+    scripted_llm()
+
+    with TestClient(api.app).stream("POST", "/chat/stream", json={"user_input": SAME_PROFILE}) as response:
+        events = parse_sse(response.read().decode())
+
+    assert events[-1][0] == "final" and events[-1][1]["response"] == RESULT
@@ -0,0 +1,41 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import agent.graph as graph_module
+import agent.tools as tools_module
+
+PAGE = b"<html><body><h1>Informatik</h1>\n<p>Regelstudienzeit 6 Semester</p></body></html>"
+
+def test_scrape_tool_uses_async_path(monkeypatch):
+    """ainvoke must go through the coroutine, never the blocking fetch."""
+    async def fake_afetch(url):
+        return PAGE, None
+
+    def blocking_fetch(url):
+        raise AssertionError("sync fetch used on the async path")
+
+    monkeypatch.setattr(tools_module, "_afetch", fake_afetch)
+    monkeypatch.setattr(tools_module, "_fetch", blocking_fetch)
+
+    result = asyncio.run(tools_module.scrape_website_tool.ainvoke({"url": "https://uni.example/info"}))
+    assert result == "Informatik\nRegelstudienzeit 6 Semester"
+
+def test_graph_ainvoke_runs_tools_and_llm_async(monkeypatch, scripted_llm):
+    async def fake_afetch(url):
+        return PAGE, None
+
+    scripted_llm(
+        AIMessage(content="", tool_calls=[
+            {"name": "scrape_website_tool", "args": {"url": "https://uni.example/info"}, "id": "call_1"}
+        ]),
+        AIMessage(content='{"recommendations": [], "summary": "ok"}'),
+    )
+    monkeypatch.setattr(tools_module, "_afetch", fake_afetch)
+
+    compiled = graph_module.create_agent_graph()
+    result = asyncio.run(compiled.ainvoke({"messages": [HumanMessage(content="Profil")]}))
+
+    tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+    assert tool_messages[0].content == "Informatik\nRegelstudienzeit 6 Semester"
+    assert result["messages"][-1].content == '{"recommendations": [], "summary": "ok"}'
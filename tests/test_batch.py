@@ -0,0 +1,57 @@
+import asyncio
+import json
+import uuid
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import agent.graph as graph_module
+import batch
+
+class AskOnceModel(BaseChatModel):
+    """Asks for the city, then recommends a programme there; independent of call order."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "ask-once"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        answers = [m for m in messages if isinstance(m, ToolMessage)]
+        if not answers:
+            call = {"name": "human_feedback_tool", "args": {"question": "Welche Stadt?"}, "id": f"call_{uuid.uuid4().hex[:8]}"}
+            message = AIMessage(content="", tool_calls=[call])
+        else:
+            message = AIMessage(content=json.dumps({"recommendations": [], "summary": f"Studium in {answers[-1].content}"}))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+PROFILES = [{"id": "a", "profile": "Mag Mathe"}, {"id": "b", "profile": "Mag Sprachen"}, {"id": "c", "profile": "Mag Kunst", "answers": ["Köln"]}]
+
+def test_batch_answers_questions_and_skips_finished_profiles(monkeypatch, tmp_path):
+    monkeypatch.setattr(graph_module, "llm", AskOnceModel())
+    output = tmp_path / "results.jsonl"
+
+    summary = asyncio.run(batch.run_batch(PROFILES, str(output), concurrency=2, default_answer="Berlin"))
+
+    assert summary["done"] == 3 and summary["skipped"] == 0
+    results = batch.read_results(str(output))
+    assert results["a"]["response"]["summary"] == "Studium in Berlin"
+    assert results["c"]["response"]["summary"] == "Studium in Köln"
+
+    again = asyncio.run(batch.run_batch(PROFILES, str(output), concurrency=2, default_answer="Berlin"))
+    assert again["skipped"] == 3 and len(output.read_text().splitlines()) == 3
+
+def test_pending_questions_are_written_out_and_resumed(monkeypatch, tmp_path):
+    monkeypatch.setattr(graph_module, "llm", AskOnceModel())
+    output = tmp_path / "results.jsonl"
+
+    first = asyncio.run(batch.run_batch(PROFILES[:2], str(output)))
+    assert first["pending"] == 2
+    assert batch.read_results(str(output))["a"]["question"] == "Welche Stadt?"
+
+    second = asyncio.run(batch.run_batch(PROFILES[:2], str(output), answers={"a": "Hamburg"}))
+    assert second["done"] == 1 and second["skipped"] == 1
+    results = batch.read_results(str(output))
+    assert results["a"]["status"] == "done" and results["a"]["response"]["summary"] == "Studium in Hamburg"
+    assert results["b"]["status"] == "pending"
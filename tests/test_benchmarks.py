@@ -0,0 +1,27 @@
+import agent.graph as graph_module
+from agent.http_client import http_client
+from agent.tools import tools
+from benchmarks import run as benchmark
+
+def test_benchmark_replays_conversations_offline(monkeypatch):
+    # The harness installs its fake model and fixture server globally; restore them afterwards
+    search = benchmark._search_tool(next(t for t in tools if t.name == "web_search"))
+    monkeypatch.setattr(graph_module, "llm", graph_module.llm)
+    monkeypatch.setattr(http_client, "host_min_interval", http_client.host_min_interval)
+    monkeypatch.setattr(search.api_wrapper, "api_base_url", search.api_wrapper.api_base_url)
+
+    results = benchmark.run_benchmark(conversations=3, concurrency=2)
+
+    graph = results["graph"]
+    assert graph["end_to_end"]["count"] == 3
+    assert set(graph["nodes"]) == {"llm", "tools"}
+    assert graph["tools"]["web_search"]["count"] == 3
+    assert graph["tools"]["scrape_website_tool"]["count"] == 3
+    assert results["api"]["errors"] == 0 and results["api"]["requests"] >= 3
+    assert results["meta"]["fixture_requests"] > 0
+
+def test_percentiles_interpolate_between_ranks():
+    values = [float(v) for v in range(1, 101)]
+    assert benchmark.percentile(values, 50) == 50.5
+    assert round(benchmark.percentile(values, 99), 2) == 99.01
+    assert benchmark.summarize([]) == {"count": 0}
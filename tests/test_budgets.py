@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+import agent.graph as graph_module
+import api
+
+ANSWER = '{"recommendations": [], "summary": "ok"}'
+
+class ResearchForeverModel(BaseChatModel):
+    """Keeps calling a tool until it is told to answer without tools."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "research-forever"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if kwargs.get("tool_choice") == "none":
+            message = AIMessage(content=ANSWER)
+        else:
+            message = AIMessage(content="", tool_calls=[{"name": "lookup", "args": {}, "id": f"call_{len(messages)}"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+def test_step_budget_ends_with_an_answer(monkeypatch):
+    monkeypatch.setattr(graph_module, "llm", ResearchForeverModel())
+    compiled = graph_module.create_agent_graph()
+
+    result = compiled.invoke({"messages": [HumanMessage(content="Profil")]}, {"recursion_limit": 7})
+
+    assert result["messages"][-1].content == ANSWER
+    assert len(result["messages"]) <= 7
+
+def test_deadline_ends_with_an_answer(monkeypatch):
+    monkeypatch.setattr(graph_module, "llm", ResearchForeverModel())
+    compiled = graph_module.create_agent_graph()
+    # Less time left than the reserve for the final answer: no research at all
+    config = {"configurable": {"deadline": time.time() + 1}}
+
+    result = asyncio.run(compiled.ainvoke({"messages": [HumanMessage(content="Profil")]}, config))
+
+    assert [m.content for m in result["messages"][1:]] == [ANSWER]
+
+class GoneRequest:
+    async def is_disconnected(self):
+        return True
+
+def test_disconnect_cancels_the_run():
+    cancelled = asyncio.Event()
+
+    async def run():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def main():
+        result = await api._until_disconnected(GoneRequest(), run())
+        return result, cancelled.is_set()
+
+    assert asyncio.run(main()) == (None, True)
+
+class SlowModel(BaseChatModel):
+    """Answers after `delay` seconds; records the async calls that were cancelled before."""
+
+    delay: float = 60
+    cancelled: list = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow"
+
+    def _answer(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=ANSWER))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        return self._answer()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(True)
+            raise
+        return self._answer()
+
+def test_chat_run_is_cancelled_when_the_client_disconnects(monkeypatch):
+    """Through the whole app (middleware included) with a real ASGI disconnect."""
+    model = SlowModel()
+    monkeypatch.setattr(graph_module, "llm", model)
+    monkeypatch.setattr(api, "get_agent", graph_module.create_agent_graph)
+    body = json.dumps({"user_input": "Profil"}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/chat", "raw_path": b"/chat", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    sent = []
+
+    async def main():
+        gone = asyncio.Event()
+        requests = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await gone.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.get_running_loop().call_later(0.3, gone.set)
+        start = time.perf_counter()
+        await asyncio.wait_for(api.app(scope, receive, send), timeout=10)
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(main())
+
+    assert sent[0]["type"] == "http.response.start" and sent[0]["status"] == 499
+    assert model.cancelled and elapsed < 5
@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+
+from agent.catalog import CatalogStore, build_catalog, extract_programme
+from agent.extraction import extract_page
+from agent.http_client import HttpClient
+
+PROGRAMME_PAGE = """<html><head><title>Informatik (B.Sc.) | Universität Beispielstadt</title></head><body>
+<nav><a href="/">Start</a></nav>
+<main>
+<h1>Informatik (B.Sc.)</h1>
+<p>Regelstudienzeit: 6 Semester. Studienbeginn: Wintersemester.</p>
+<p>Unterrichtssprache: Deutsch und Englisch</p>
+<p>Der Studiengang ist zulassungsfrei. Eine Bewerbung ist nicht nötig.</p>
+<p>Absolventen verdienen im Schnitt 50.000 Euro Einstiegsgehalt.</p>
+</main></body></html>""".encode()
+
+SITE = {
+    "/robots.txt": b"User-agent: *\nDisallow: /studium/intern",
+    "/": b'<a href="/studium/">Studium</a> <a href="/impressum">Impressum</a>',
+    "/studium/": b'<main><h1>Studienangebot</h1><a href="/studium/informatik-bsc">Informatik</a> <a href="/studium/intern/entwurf">Entwurf</a></main>',
+    "/studium/informatik-bsc": PROGRAMME_PAGE,
+}
+
+def test_programme_records_are_extracted_from_a_page():
+    programme = extract_programme("https://uni.example/informatik", extract_page(PROGRAMME_PAGE))
+
+    assert programme.title == "Informatik (B.Sc.)"
+    assert programme.university == "Universität Beispielstadt"
+    assert (programme.degree, programme.language, programme.duration_semesters) == ("Bachelor", "Deutsch und Englisch", 6)
+    assert "zulassungsfrei" in programme.admission
+    assert "50.000 Euro" in programme.income
+    # Overview pages without programme facts are not records
+    assert extract_programme("https://uni.example/studium", extract_page(SITE["/studium/"])) is None
+
+def test_build_crawls_the_site_and_skips_unchanged_pages_on_refresh(tmp_path):
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.path)
+        body = SITE.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        etag = f'"{hash(body)}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, content=body, headers={"ETag": etag})
+
+    client = HttpClient(host_min_interval=0, async_transport=httpx.MockTransport(handler))
+    store = CatalogStore(str(tmp_path / "catalog.sqlite"))
+
+    counts = asyncio.run(build_catalog(["https://uni.example/"], store, max_pages_per_site=10, max_depth=3, concurrency=2, client=client))
+
+    assert counts["processed"] == 3 and counts["programmes"] == 1
+    # robots.txt and the link filter are respected
+    assert "/studium/intern/entwurf" not in requested and "/impressum" not in requested
+    assert [p.title for p in store.search("informatik", degree="Bachelor", language="Englisch")] == ["Informatik (B.Sc.)"]
+
+    counts = asyncio.run(build_catalog(["https://uni.example/"], store, max_pages_per_site=10, max_depth=3, concurrency=2, client=client))
+
+    assert counts["not_modified"] == 3 and counts["processed"] == 0
+    assert store.stats() == {"pages": 3, "programmes": 1}
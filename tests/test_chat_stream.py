@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+import agent.tools as tools_module
+from agent.graph import create_agent_graph
+from helpers import parse_sse
+
+PAGE = b"<html><body><p>Semesterbeitrag 300 Euro</p></body></html>"
+
+def test_stream_emits_tokens_tool_timings_and_final_json(monkeypatch, scripted_llm):
+    import api
+
+    async def fake_afetch(url):
+        return PAGE, None
+
+    monkeypatch.setattr(tools_module, "_afetch", fake_afetch)
+    scripted_llm(
+        AIMessage(content="", tool_calls=[
+            {"name": "scrape_website_tool", "args": {"url": "https://uni.example"}, "id": "call_1"}
+        ]),
+        AIMessage(content='{"recommendations": [], "summary": "Gute Wahl"}'),
+    )
+
+    with TestClient(api.app).stream("POST", "/chat/stream", json={"user_input": "Profil"}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.read().decode())
+
+    names = [name for name, _ in events]
+    assert names[0] == "start"
+    assert names.index("tool_start") < names.index("tool_end") < names.index("token")
+    tool_end = dict(events)["tool_end"]
+    assert tool_end["name"] == "scrape_website_tool" and tool_end["duration_ms"] is not None
+    streamed = "".join(data["content"] for name, data in events if name == "token")
+    assert streamed == '{"recommendations": [], "summary": "Gute Wahl"}'
+    assert events[-1] == ("final", {
+        "response": {"recommendations": [], "summary": "Gute Wahl"},
+        "thread_id": events[0][1]["thread_id"],
+    })
+
+@pytest.mark.parametrize("checkpointer", [None, MemorySaver()])
+def test_stream_closes_with_the_answer_the_graph_stored(monkeypatch, scripted_llm, checkpointer):
+    import api
+
+    graph = create_agent_graph(checkpointer=checkpointer)
+    monkeypatch.setattr(api, "get_agent", lambda: graph)
+    # No room for research: the llm node drops the tool call the model makes anyway
+    monkeypatch.setattr(api, "RUN_MAX_STEPS", 2)
+    scripted_llm(AIMessage(
+        content='Hier: {"recommendations": [], "summary": "Gute Wahl"}',
+        tool_calls=[{"name": "human_feedback_tool", "args": {"question": "Wo?"}, "id": "call_1"}],
+    ))
+
+    with TestClient(api.app).stream("POST", "/chat/stream", json={"user_input": "Profil"}) as response:
+        events = parse_sse(response.read().decode())
+
+    assert events[-1][0] == "final"
+    assert events[-1][1]["response"] == {"recommendations": [], "summary": "Gute Wahl"}
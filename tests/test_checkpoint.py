@@ -0,0 +1,73 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+import agent.graph as graph_module
+from agent.checkpoint import LRUMemorySaver, SqliteSaver
+
+QUESTION = AIMessage(content="", tool_calls=[
+    {"name": "human_feedback_tool", "args": {"question": "Welche Stadt?"}, "id": "call_q"}
+])
+FINAL = AIMessage(content='{"recommendations": [], "summary": "ok"}')
+
+def _run_until_question(saver, config):
+    compiled = graph_module.create_agent_graph(checkpointer=saver)
+    asyncio.run(compiled.ainvoke({"messages": [SystemMessage(content="sys"), HumanMessage(content="Profil")]}, config))
+    return compiled
+
+def test_sqlite_saver_resumes_in_another_process(tmp_path, scripted_llm):
+    scripted_llm(QUESTION, FINAL)
+    config = {"configurable": {"thread_id": "t1"}}
+    db_path = str(tmp_path / "checkpoints.sqlite")
+    _run_until_question(SqliteSaver(db_path), config)
+
+    # A fresh saver on the same file stands in for a different gunicorn worker
+    compiled = graph_module.create_agent_graph(checkpointer=SqliteSaver(db_path))
+    snapshot = compiled.get_state(config)
+    assert snapshot.next == ("human",)
+
+    compiled.update_state(config, {"messages": [ToolMessage(content="Berlin", tool_call_id="call_q")]}, as_node="human")
+    result = asyncio.run(compiled.ainvoke(None, config))
+    assert [type(m).__name__ for m in result["messages"]] == [
+        "SystemMessage", "HumanMessage", "AIMessage", "ToolMessage", "AIMessage"
+    ]
+    assert result["messages"][-1].content == FINAL.content
+
+def test_sqlite_saver_expires_idle_threads(tmp_path, scripted_llm):
+    scripted_llm(QUESTION)
+    config = {"configurable": {"thread_id": "t1"}}
+    saver = SqliteSaver(str(tmp_path / "checkpoints.sqlite"), ttl_seconds=60)
+    _run_until_question(saver, config)
+    assert saver.get_tuple(config) is not None
+
+    saver.ttl_seconds = 0.000001
+    assert saver.get_tuple(config) is None
+
+def test_lru_memory_saver_evicts_least_recently_used_thread(scripted_llm):
+    scripted_llm(*[QUESTION] * 3)
+    saver = LRUMemorySaver(max_threads=2)
+    configs = [{"configurable": {"thread_id": f"t{i}"}} for i in range(3)]
+    _run_until_question(saver, configs[0])
+    _run_until_question(saver, configs[1])
+    saver.get_tuple(configs[0])  # t0 is now more recent than t1
+    _run_until_question(saver, configs[2])
+
+    assert saver.get_tuple(configs[0]) is not None
+    assert saver.get_tuple(configs[1]) is None
+    assert saver.get_tuple(configs[2]) is not None
+
+def test_chat_endpoint_resumes_thread_with_only_new_input(scripted_llm):
+    from fastapi.testclient import TestClient
+    import api
+
+    scripted_llm(QUESTION, FINAL)
+    client = TestClient(api.app)
+
+    first = client.post("/chat", json={"user_input": "Abi 1,8, mag Mathe"}).json()
+    assert first["response"] == "Welche Stadt?"
+
+    second = client.post("/chat", json={"user_input": "Berlin", "thread_id": first["thread_id"]}).json()
+    assert second == {"response": {"recommendations": [], "summary": "ok"}, "thread_id": first["thread_id"]}
+
+    messages = api.get_agent().get_state({"configurable": {"thread_id": first["thread_id"]}}).values["messages"]
+    assert isinstance(messages[3], ToolMessage) and messages[3].content == "Berlin"
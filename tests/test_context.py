@@ -0,0 +1,93 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from agent.context import TokenCounter, compact_messages
+
+def _research_turn(n: int, size: int = 4000):
+    call_id = f"call_{n}"
+    return [
+        AIMessage(content="", id=f"ai_{n}", tool_calls=[{"name": "scrape_website_tool", "args": {"url": f"https://uni{n}.de"}, "id": call_id}]),
+        ToolMessage(content=f"Seite {n} " + "x" * size, id=f"tool_{n}", name="scrape_website_tool", tool_call_id=call_id),
+    ]
+
+def _conversation(turns: int):
+    messages = [SystemMessage(content="System", id="sys"), HumanMessage(content="Ich mag Informatik.", id="human")]
+    for n in range(turns):
+        messages += _research_turn(n)
+    return messages
+
+def _assert_paired(messages):
+    call_ids = {call["id"] for m in messages if isinstance(m, AIMessage) for call in m.tool_calls}
+    result_ids = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+    assert call_ids == result_ids
+
+def test_compaction_keeps_recent_turns_and_shortens_old_tool_results():
+    counter = TokenCounter("chars")
+    messages = _conversation(6)
+
+    compacted = compact_messages(messages, budget=2500, keep_turns=2, extract_chars=200, counter=counter)
+
+    assert counter.total(compacted) <= 2500
+    assert compacted[:2] == messages[:2]
+    assert compacted[-4:] == messages[-4:]
+    assert len(compacted[3].content) < 300 and compacted[3].content.startswith("Seite 0")
+    _assert_paired(compacted)
+    # The graph state is left untouched
+    assert len(messages[3].content) > 4000
+
+def test_compaction_drops_oldest_turns_when_extracts_are_not_enough():
+    counter = TokenCounter("chars")
+    messages = _conversation(40)
+
+    compacted = compact_messages(messages, budget=2500, keep_turns=2, extract_chars=200, counter=counter)
+
+    assert counter.total(compacted) <= 2500
+    assert compacted[:2] == messages[:2]
+    assert compacted[-4:] == messages[-4:]
+    assert "ai_0" not in {m.id for m in compacted}
+    _assert_paired(compacted)
+
+def test_search_results_are_reduced_to_titles_and_urls():
+    results = {"query": "informatik münchen", "results": [{"title": f"Uni {i}", "url": f"https://u{i}.de", "content": "y" * 2000} for i in range(3)]}
+    messages = _conversation(0) + [
+        AIMessage(content="", id="ai_s", tool_calls=[{"name": "tavily_search", "args": {"query": "informatik münchen"}, "id": "s"}]),
+        ToolMessage(content=json.dumps(results), id="tool_s", name="tavily_search", tool_call_id="s"),
+    ] + _research_turn(1) + _research_turn(2)
+
+    compacted = compact_messages(messages, budget=2500, keep_turns=2, extract_chars=600, counter=TokenCounter("chars"))
+
+    assert compacted[3].content.startswith("Suchergebnisse für 'informatik münchen'")
+    assert "https://u2.de" in compacted[3].content and "yyy" not in compacted[3].content
+
+def test_short_conversations_are_sent_unchanged():
+    messages = _conversation(1)
+    assert compact_messages(messages, budget=100_000, counter=TokenCounter("chars")) is messages
+
+def _answered_conversation(turns: int, answer: str):
+    # Shaped like the API's: the answer to human_feedback_tool has no tool name
+    messages = _conversation(0) + [
+        AIMessage(content="", id="ai_q", tool_calls=[{"name": "human_feedback_tool", "args": {"question": "Wo?"}, "id": "q"}]),
+        ToolMessage(content=answer, id="answer", tool_call_id="q"),
+    ]
+    for n in range(turns):
+        messages += _research_turn(n)
+    return messages
+
+def test_student_answers_are_never_shortened():
+    answer = "Ich möchte in Bayern bleiben, " + "weil meine Familie dort lebt. " * 100
+
+    # Extracts are enough
+    compacted = compact_messages(_answered_conversation(4, answer), budget=3500, keep_turns=2, extract_chars=200, counter=TokenCounter("chars"))
+
+    assert next(m for m in compacted if m.id == "answer").content == answer
+    assert len(next(m for m in compacted if m.id == "tool_0").content) < 300
+
+    # Old turns have to be dropped as well
+    messages = _answered_conversation(40, "Ich will nach München.")
+    compacted = compact_messages(messages, budget=3500, keep_turns=2, extract_chars=200, counter=TokenCounter("chars"))
+
+    assert len(compacted) < len(messages)
+    assert [m.id for m in compacted[2:4]] == ["ai_q", "answer"]
+    assert compacted[3].content == "Ich will nach München."
+    _assert_paired(compacted)
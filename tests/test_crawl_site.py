@@ -0,0 +1,51 @@
+import asyncio
+
+import httpx
+
+import agent.tools as tools_module
+from agent.http_client import HttpClient
+
+SITE = {
+    "/robots.txt": b"User-agent: *\nDisallow: /privat",
+    "/": b'<main><h1>Fakultaet</h1><p>Willkommen.</p><a href="/bachelor">Bachelor</a> <a href="/privat">Privat</a> <a href="https://other.example/">Extern</a></main>',
+    "/bachelor": b'<main><h1>Bachelor Informatik</h1><p>Allgemeines zum Studium.</p><a href="/bachelor/bewerbung">Bewerbung</a></main>',
+    "/bachelor/bewerbung": b"<title>Bewerbung</title><main><h1>Bewerbung</h1><p>Die Bewerbungsfrist endet am 15. Juli. Es gibt keinen NC.</p></main>",
+    "/privat": b"<main><p>Bewerbungsfrist intern</p></main>",
+}
+
+def _install_site(monkeypatch, host="crawl.example"):
+    requested = []
+
+    def handler(request):
+        requested.append(str(request.url))
+        body = SITE.get(request.url.path) if request.url.host == host else b"<p>Bewerbungsfrist anderswo</p>"
+        return httpx.Response(200, content=body) if body is not None else httpx.Response(404)
+
+    client = HttpClient(host_min_interval=0, transport=httpx.MockTransport(handler), async_transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tools_module, "http_client", client)
+    monkeypatch.setattr(tools_module, "PAGE_CACHE_ENABLED", False)
+    return requested
+
+def test_crawl_returns_the_most_relevant_page_in_one_result(monkeypatch):
+    requested = _install_site(monkeypatch)
+
+    result = asyncio.run(tools_module.crawl_site_tool.ainvoke(
+        {"url": "https://crawl.example/", "query": "Bewerbungsfrist NC", "max_pages": 10, "max_depth": 2}
+    ))
+
+    assert result.startswith("Read 3 pages starting from https://crawl.example/.")
+    assert "## Bewerbung\nURL: https://crawl.example/bachelor/bewerbung" in result
+    assert "15. Juli" in result and "Willkommen" not in result
+    # robots.txt and the same-site scope are respected
+    assert "https://crawl.example/privat" not in requested
+    assert not any("other.example" in url for url in requested)
+
+def test_crawl_budgets_and_sync_path(monkeypatch):
+    requested = _install_site(monkeypatch)
+
+    result = tools_module.crawl_site_tool.invoke(
+        {"url": "https://crawl.example/", "query": "Bewerbungsfrist", "max_pages": 10, "max_depth": 1}
+    )
+
+    assert "none of them mentions 'Bewerbungsfrist'" in result
+    assert "https://crawl.example/bachelor/bewerbung" not in requested
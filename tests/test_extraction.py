@@ -0,0 +1,81 @@
+import httpx
+
+import agent.tools as tools_module
+from agent.extraction import chunk_blocks, extract_text, parse_blocks, select_passages
+from agent.http_client import HttpClient
+from agent.page_cache import PageCache
+
+PAGE = """
+<html><head><meta charset="iso-8859-1"><script>var x = "tracking";</script><style>p {}</style></head>
+<body>
+  <div class="cookie-banner">Wir verwenden Cookies. <button>Akzeptieren</button></div>
+  <header><nav><a href="/">Startseite</a> <a href="/studium">Studium</a></nav></header>
+  <main>
+    <h1>Informatik (B.Sc.)</h1>
+    <p>Der Studiengang vermittelt Grundlagen der Programmierung und Mathematik.</p>
+    <h2>Kosten</h2>
+    <p>Es fallen keine Studiengebühren an, nur ein Semesterbeitrag von 150 Euro.</p>
+    <h2>Zulassung</h2>
+    <p>Der Studiengang ist zulassungsfrei, es gibt keinen NC.</p>
+    <ul class="related"><li><a href="/a">Mathematik</a></li><li><a href="/b">Physik</a></li></ul>
+  </main>
+  <footer>Impressum &amp; Datenschutz</footer>
+</body></html>
+""".encode("iso-8859-1")
+
+def test_boilerplate_is_removed_and_main_content_kept():
+    text = extract_text(PAGE)
+
+    assert text.startswith("Informatik (B.Sc.)")
+    assert "Studiengebühren" in text  # Decoded with the declared charset
+    for boilerplate in ("Cookies", "Startseite", "Impressum", "tracking", "Physik"):
+        assert boilerplate not in text
+
+def test_query_selects_the_most_relevant_passages():
+    blocks = parse_blocks(PAGE)
+    passages = chunk_blocks(blocks, chunk_chars=200)
+
+    selected = select_passages(passages, "Gebühren Semesterbeitrag", max_chars=120)
+
+    assert selected == ["Kosten\nEs fallen keine Studiengebühren an, nur ein Semesterbeitrag von 150 Euro."]
+
+def test_pages_without_main_element_and_unmatched_queries_fall_back_to_page_order():
+    html = b"<body><nav>Menu</nav><div><p>Erster Absatz.</p><p>Zweiter Absatz.</p></div></body>"
+
+    assert extract_text(html, query="Gehalt") == "Erster Absatz.\nZweiter Absatz."
+
+def test_layout_wrappers_named_like_boilerplate_keep_their_content():
+    html = (
+        b'<body class="menu-open"><div id="skip-target" class="layout--with-sidebar">'
+        b'<div class="sidebar"><p>Weitere Angebote</p></div>'
+        b'<main><h1>Maschinenbau</h1><p>Regelstudienzeit 7 Semester.</p><div class="social-share"><p>Teilen</p></div></main>'
+        b'</div></body>'
+    )
+    assert extract_text(html) == "Maschinenbau\nRegelstudienzeit 7 Semester."
+    # No <main> at all: the wrapper's text is still better than nothing
+    assert extract_text(b'<div class="page-menu-open"><p>Regelstudienzeit 6 Semester.</p></div>') == "Regelstudienzeit 6 Semester."
+
+def test_parse_stops_at_the_byte_cap():
+    html = b"<body><p>Anfang</p>" + b"<p>" + b"x" * 200_000 + b"</p><p>Ende</p></body>"
+
+    text = "\n".join(block.text for block in parse_blocks(html, max_bytes=100_000))
+
+    assert text.startswith("Anfang") and "Ende" not in text
+
+def test_header_charset_wins_over_the_page(monkeypatch, tmp_path):
+    # Declared only in the header; the <meta> of a template claims UTF-8
+    html = '<meta charset="utf-8"><main><p>Keine Studiengebühren für Erstsemester.</p></main>'.encode("iso-8859-1")
+    assert "Studiengebühren" in extract_text(html, charset="ISO-8859-1")
+
+    def handler(request):
+        return httpx.Response(200, content=html, headers={"Content-Type": "text/html; charset=ISO-8859-1"})
+
+    client = HttpClient(host_min_interval=0, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tools_module, "http_client", client)
+    monkeypatch.setattr(tools_module, "page_cache", PageCache(str(tmp_path / "pages.sqlite")))
+    monkeypatch.setattr(tools_module, "PAGE_CACHE_ENABLED", True)
+    monkeypatch.setattr(tools_module, "KNOWLEDGE_INDEX_ENABLED", False)
+
+    # From the network, then from the page cache
+    for _ in range(2):
+        assert "Studiengebühren für" in tools_module.scrape_website("https://uni.example/kosten")
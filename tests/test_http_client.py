@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from agent.http_client import HttpClient
+
+def test_body_is_capped_at_max_bytes():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b"x" * 100))
+    client = HttpClient(max_bytes=10, host_min_interval=0, transport=transport)
+
+    result = client.get("https://uni.example/big")
+    assert result.content == b"x" * 10 and result.truncated
+
+def test_async_requests_are_limited_per_host():
+    in_flight = {"uni-a.example": 0, "uni-b.example": 0}
+    peak = dict(in_flight)
+
+    async def handler(request):
+        host = request.url.host
+        in_flight[host] += 1
+        peak[host] = max(peak[host], in_flight[host])
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        return httpx.Response(200, content=b"ok")
+
+    client = HttpClient(max_per_host=2, host_min_interval=0, async_transport=httpx.MockTransport(handler))
+
+    async def run():
+        urls = [f"https://uni-a.example/{i}" for i in range(6)] + [f"https://uni-b.example/{i}" for i in range(6)]
+        return await asyncio.gather(*(client.aget(url) for url in urls))
+
+    results = asyncio.run(run())
+    assert all(result.status_code == 200 for result in results)
+    assert peak == {"uni-a.example": 2, "uni-b.example": 2}
+
+def test_connections_are_kept_alive_against_a_local_server():
+    client_ports = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            client_ports.append(self.client_address[1])
+            body = b"<p>Studium</p>"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = HttpClient(host_min_interval=0)
+        for path in ("a", "b", "c"):
+            assert client.get(f"http://127.0.0.1:{server.server_port}/{path}").content == b"<p>Studium</p>"
+    finally:
+        server.shutdown()
+
+    assert len(client_ports) == 3 and len(set(client_ports)) == 1
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import agent.tools as tools_module
+from agent.knowledge import KnowledgeIndex
+
+PAGE = b"""<html><head><title>Maschinenbau an der RWTH Aachen</title></head><body><main>
+<h1>Maschinenbau (B.Sc.)</h1><p>Der Bachelor Maschinenbau in Aachen dauert 7 Semester und ist zulassungsfrei.</p>
+</main></body></html>"""
+
+def test_search_ranks_matches_and_updates_documents_incrementally(tmp_path):
+    index = KnowledgeIndex(str(tmp_path / "knowledge.sqlite"))
+    index.add("https://rwth.example/maschinenbau", "Maschinenbau in Aachen, 7 Semester, zulassungsfrei.", title="Maschinenbau RWTH")
+    index.add("https://tum.example/informatik", "Informatik in München, 6 Semester.", title="Informatik TUM")
+
+    hits = index.search("maschinenbau aachen")
+    assert [hit.url for hit in hits] == ["https://rwth.example/maschinenbau"]
+    assert "zulassungsfrei" in hits[0].snippet
+
+    # Re-indexing replaces the old text instead of duplicating the document
+    index.add("https://rwth.example/maschinenbau#top", "Maschinenbau in Aachen hat jetzt einen NC.", title="Maschinenbau RWTH")
+    assert [hit.snippet for hit in index.search("maschinenbau")] == ["Maschinenbau in Aachen hat jetzt einen NC."]
+    assert index.stats()["documents"] == 2
+
+def test_search_summaries_do_not_replace_scraped_pages(tmp_path):
+    index = KnowledgeIndex(str(tmp_path / "knowledge.sqlite"))
+    index.add("https://rwth.example/mb", "Volltext der Seite über Maschinenbau.")
+    index.add_search_results({"results": [
+        {"url": "https://rwth.example/mb", "title": "MB", "content": "Kurzfassung Maschinenbau"},
+        {"url": "https://fh.example/mb", "title": "FH", "content": "Maschinenbau an der FH"},
+    ]})
+
+    hits = {hit.url: hit for hit in index.search("maschinenbau")}
+    assert hits["https://rwth.example/mb"].source == "scrape"
+    assert hits["https://fh.example/mb"].source == "search"
+
+def test_stale_documents_are_not_returned_and_pruned(tmp_path):
+    index = KnowledgeIndex(str(tmp_path / "knowledge.sqlite"), max_age_seconds=60, max_documents=1)
+    index.add("https://a.example", "Psychologie in Köln")
+    with index._conn() as conn:
+        conn.execute("UPDATE documents SET fetched_at = ?", (time.time() - 120,))
+    assert index.search("psychologie") == []
+
+    index.add("https://b.example", "Psychologie in Bonn")
+    index.add("https://c.example", "Psychologie in Trier")
+    index.prune()
+    assert index.stats()["documents"] == 1
+    assert [hit.url for hit in index.search("psychologie")] == ["https://c.example/"]
+
+def test_scraped_pages_are_found_by_local_knowledge_search(monkeypatch, tmp_path):
+    monkeypatch.setattr(tools_module, "knowledge_index", KnowledgeIndex(str(tmp_path / "knowledge.sqlite")))
+
+    async def fake_afetch(url):
+        return PAGE, None
+
+    monkeypatch.setattr(tools_module, "_afetch", fake_afetch)
+    asyncio.run(tools_module.scrape_website_tool.ainvoke({"url": "https://rwth.example/mb"}))
+
+    result = asyncio.run(tools_module.local_knowledge_search_tool.ainvoke({"query": "Maschinenbau Aachen"}))
+    assert "[1] Maschinenbau an der RWTH Aachen" in result
+    assert "URL: https://rwth.example/mb" in result
+    assert "zulassungsfrei" in result
@@ -0,0 +1,74 @@
+import json
+import logging
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from prometheus_client import REGISTRY
+
+import agent.tools as tools_module
+
+PAGE = b"<html><body><p>Semesterbeitrag 300 Euro</p></body></html>"
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_chat_records_node_and_tool_metrics(monkeypatch, scripted_llm):
+    import api
+
+    async def fake_afetch(url):
+        return PAGE, None
+
+    monkeypatch.setattr(tools_module, "_afetch", fake_afetch)
+    scripted_llm(
+        AIMessage(content="", tool_calls=[
+            {"name": "scrape_website_tool", "args": {"url": "https://uni.example"}, "id": "call_1"}
+        ]),
+        AIMessage(content='{"recommendations": [], "summary": "ok"}'),
+    )
+    llm_runs = _sample("futedu_node_duration_seconds_count", node="llm")
+    tool_runs = _sample("futedu_tool_duration_seconds_count", tool="scrape_website_tool")
+    requests = _sample("futedu_http_requests_total", endpoint="/chat", status="200")
+
+    client = TestClient(api.app)
+    assert client.post("/chat", json={"user_input": "Profil"}).status_code == 200
+
+    assert _sample("futedu_node_duration_seconds_count", node="llm") == llm_runs + 2
+    assert _sample("futedu_tool_duration_seconds_count", tool="scrape_website_tool") == tool_runs + 1
+    assert _sample("futedu_http_requests_total", endpoint="/chat", status="200") == requests + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "futedu_tool_output_bytes_bucket" in response.text
+
+def test_trace_logs_one_line_per_run(caplog, scripted_llm):
+    from agent.graph import create_agent_graph
+    from agent.metrics import MetricsCallbackHandler
+
+    scripted_llm(AIMessage(content="Fertig"))
+    graph = create_agent_graph()
+
+    with caplog.at_level(logging.INFO, logger="agent.trace"):
+        graph.invoke({"messages": [("user", "Hallo")]}, {"callbacks": [MetricsCallbackHandler(trace=True, trace_id="t-1")]})
+
+    [record] = [r for r in caplog.records if r.name == "agent.trace"]
+    trace = json.loads(record.getMessage())
+    assert trace["trace_id"] == "t-1" and trace["steps"] == 1
+    # The model call ends inside its node; the fake model has no model name
+    assert [(span["kind"], span["name"]) for span in trace["spans"]] == [("llm", "unknown"), ("node", "llm")]
+
+def test_tool_error_texts_count_as_errors(scripted_llm):
+    from agent.graph import create_agent_graph
+    from agent.metrics import MetricsCallbackHandler
+
+    scripted_llm(
+        AIMessage(content="", tool_calls=[
+            {"name": "scrape_website_tool", "args": {"url": "not a url"}, "id": "call_1"}
+        ]),
+        AIMessage(content='{"recommendations": [], "summary": "ok"}'),
+    )
+    errors = _sample("futedu_tool_errors_total", tool="scrape_website_tool")
+
+    result = create_agent_graph().invoke({"messages": [("user", "Profil")]}, {"callbacks": [MetricsCallbackHandler()]})
+
+    assert result["messages"][2].content.startswith("An error occurred")
+    assert _sample("futedu_tool_errors_total", tool="scrape_website_tool") == errors + 1
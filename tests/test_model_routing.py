@@ -0,0 +1,54 @@
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage
+
+import agent.graph as graph_module
+from helpers import parse_sse
+
+CALL = AIMessage(content="", tool_calls=[{"name": "lookup", "args": {}, "id": "call_1"}])
+DRAFT = AIMessage(content='{"recommendations": [], "summary": "Entwurf"}')
+ANSWER = AIMessage(content='{"recommendations": [], "summary": "Gute Wahl"}')
+
+def _run():
+    return graph_module.create_agent_graph().invoke({"messages": [HumanMessage(content="Profil")]})
+
+def test_research_steps_use_the_small_model_and_the_answer_the_large_one(monkeypatch, scripted_llm, scripted_research_llm):
+    monkeypatch.setattr(graph_module, "ESCALATE_ON_ANSWER", True)
+    scripted_research_llm(CALL, DRAFT)
+    scripted_llm(ANSWER)
+
+    result = _run()
+
+    assert [m.content for m in result["messages"] if isinstance(m, AIMessage)] == ["", ANSWER.content]
+
+def test_valid_research_answer_is_kept(scripted_llm, scripted_research_llm):
+    scripted_research_llm(CALL, DRAFT)
+    scripted_llm()
+
+    assert _run()["messages"][-1].content == DRAFT.content
+
+def test_invalid_json_is_escalated(scripted_llm, scripted_research_llm):
+    scripted_research_llm(AIMessage(content="Hier sind meine Empfehlungen: Informatik"))
+    scripted_llm(ANSWER)
+
+    assert _run()["messages"][-1].content == ANSWER.content
+
+def test_long_conversations_move_to_the_large_model(monkeypatch, scripted_llm, scripted_research_llm):
+    monkeypatch.setattr(graph_module, "ESCALATE_AFTER_STEPS", 1)
+    scripted_research_llm(CALL)
+    # After one model call the research model is not asked again
+    scripted_llm(ANSWER)
+
+    assert _run()["messages"][-1].content == ANSWER.content
+
+def test_stream_holds_back_replaced_research_answers(monkeypatch, scripted_llm, scripted_research_llm):
+    import api
+
+    monkeypatch.setattr(graph_module, "ESCALATE_ON_ANSWER", True)
+    scripted_research_llm(DRAFT)
+    scripted_llm(ANSWER)
+
+    with TestClient(api.app).stream("POST", "/chat/stream", json={"user_input": "Profil"}) as response:
+        events = parse_sse(response.read().decode())
+
+    assert "".join(data["content"] for name, data in events if name == "token") == ANSWER.content
+    assert events[-1][1]["response"]["summary"] == "Gute Wahl"
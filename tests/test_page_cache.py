@@ -0,0 +1,41 @@
+from agent.page_cache import PageCache, normalize_url
+
+def test_normalize_url_ignores_case_fragments_ports_and_tracking():
+    assert normalize_url("HTTPS://Uni.Example:443/studium?b=2&utm_source=x&a=1#top") == "https://uni.example/studium?a=1&b=2"
+    assert normalize_url("http://uni.example") == "http://uni.example/"
+
+def test_fresh_hit_then_conditional_revalidation(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite"), ttl_seconds=60)
+    assert cache.lookup("https://uni.example/a") == (None, {})
+
+    cache.store_response("https://uni.example/a", 200, b"<p>NC 1,5</p>", {"ETag": '"v1"', "Last-Modified": "Mon, 01 Sep 2025 10:00:00 GMT", "Content-Type": "text/html"})
+    page, headers = cache.lookup("https://uni.example/a#section")
+    assert (page.body, page.content_type, headers) == (b"<p>NC 1,5</p>", "text/html", {})
+
+    cache.ttl_seconds = 0
+    page, headers = cache.lookup("https://uni.example/a")
+    assert page is None
+    assert headers == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Sep 2025 10:00:00 GMT"}
+
+    # A 304 keeps the stored body
+    assert cache.store_response("https://uni.example/a", 304, b"", {}) == (b"<p>NC 1,5</p>", "text/html")
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2 and cache.stats()["revalidated"] == 1
+
+def test_evicts_least_recently_used_pages_over_size_cap(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite"), ttl_seconds=60, max_bytes=10)
+    cache.put("https://uni.example/a", b"aaaa")
+    cache.put("https://uni.example/b", b"bbbb")
+    cache.get("https://uni.example/a")
+    cache.put("https://uni.example/c", b"cccc")
+
+    assert cache.get("https://uni.example/b") is None
+    assert cache.get("https://uni.example/a").body == b"aaaa"
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+
+def test_truncated_bodies_are_not_stored(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite"), ttl_seconds=60)
+
+    body, _ = cache.store_response("https://uni.example/a", 200, b"<p>NC", {"ETag": '"v1"'}, truncated=True)
+
+    assert body == b"<p>NC"
+    assert cache.lookup("https://uni.example/a") == (None, {})
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+import agent.graph as graph_module
+import agent.tools as tools_module
+
+def _scrape_call(i):
+    return {"name": "scrape_website_tool", "args": {"url": f"https://uni.example/{i}"}, "id": f"call_{i}"}
+
+def _slow_fetch(delay):
+    async def fake_afetch(url):
+        await asyncio.sleep(delay)
+        return f"<p>{url}</p>".encode(), None
+    return fake_afetch
+
+def test_tool_calls_of_one_turn_run_concurrently(monkeypatch, scripted_llm):
+    monkeypatch.setattr(tools_module, "_afetch", _slow_fetch(0.2))
+    scripted_llm(
+        AIMessage(content="", tool_calls=[_scrape_call(i) for i in range(3)]),
+        AIMessage(content='{"recommendations": [], "summary": "ok"}'),
+    )
+
+    started = time.perf_counter()
+    result = asyncio.run(graph_module.create_agent_graph().ainvoke({"messages": [HumanMessage(content="Profil")]}))
+    elapsed = time.perf_counter() - started
+
+    tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+    assert [m.content for m in tool_messages] == [f"https://uni.example/{i}" for i in range(3)]
+    assert elapsed < 0.5
+
+def test_question_in_a_batched_turn_is_asked_after_the_research(monkeypatch, scripted_llm):
+    monkeypatch.setattr(tools_module, "_afetch", _slow_fetch(0))
+    question = {"name": "human_feedback_tool", "args": {"question": "Welche Stadt?"}, "id": "call_q"}
+    scripted_llm(AIMessage(content="", tool_calls=[_scrape_call(0), question]))
+
+    compiled = graph_module.create_agent_graph(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "t1"}}
+    asyncio.run(compiled.ainvoke({"messages": [HumanMessage(content="Profil")]}, config))
+
+    snapshot = compiled.get_state(config)
+    assert snapshot.next == ("human",)
+    assert isinstance(snapshot.values["messages"][-1], ToolMessage)
+    assert graph_module.pending_human_call(snapshot.values["messages"])["id"] == "call_q"
+
+def test_slow_tool_call_times_out_without_failing_the_turn(monkeypatch, scripted_llm):
+    monkeypatch.setattr(tools_module, "_afetch", _slow_fetch(1))
+    monkeypatch.setattr(graph_module, "TOOL_CALL_TIMEOUT_SECONDS", 0.05)
+    scripted_llm(
+        AIMessage(content="", tool_calls=[_scrape_call(0)]),
+        AIMessage(content='{"recommendations": [], "summary": "ok"}'),
+    )
+
+    result = asyncio.run(graph_module.create_agent_graph().ainvoke({"messages": [HumanMessage(content="Profil")]}))
+    tool_message = next(m for m in result["messages"] if isinstance(m, ToolMessage))
+    assert tool_message.status == "error" and "timed out" in tool_message.content
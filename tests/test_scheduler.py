@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage
+
+import agent.graph as graph_module
+from agent.scheduler import BATCH, RetryLater, Scheduler, TokenBuckets, priority
+
+class RateLimitError(Exception):
+    status_code = 429
+
+def _raise(error):
+    raise error
+
+def test_buckets_are_shared_through_the_database(tmp_path):
+    path = str(tmp_path / "scheduler.sqlite")
+    worker_1, worker_2 = TokenBuckets(path), TokenBuckets(path)
+
+    assert worker_1.take({"openai_requests": (60, 60)}) == 0
+    wait = worker_2.take({"openai_requests": (1, 60)})
+    assert 0 < wait <= 1.01
+
+def test_batch_calls_leave_the_reserve_to_interactive_ones(tmp_path):
+    buckets = TokenBuckets(str(tmp_path / "scheduler.sqlite"))
+    assert buckets.take({"tavily_requests": (8, 10)}, reserve=0.2) == 0
+    assert buckets.take({"tavily_requests": (1, 10)}, reserve=0.2) > 0
+    assert buckets.take({"tavily_requests": (1, 10)}) == 0
+
+def test_transient_errors_are_retried_and_others_raised(tmp_path):
+    scheduler = Scheduler(TokenBuckets(str(tmp_path / "s.sqlite")), {}, max_retries=2, backoff_seconds=0)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimitError("Error 429: slow down")
+        return "ok"
+
+    assert scheduler.run("openai", flaky) == "ok" and len(attempts) == 3
+    with pytest.raises(RetryLater):
+        scheduler.run("openai", lambda: _raise(RateLimitError()))
+    with pytest.raises(ValueError):
+        scheduler.run("openai", lambda: _raise(ValueError("bad request")))
+
+def test_batch_priority_waits_longer_before_giving_up(tmp_path):
+    scheduler = Scheduler(
+        TokenBuckets(str(tmp_path / "s.sqlite")), {"tavily": {"tavily_requests": 60}},
+        max_wait={"interactive": 0.0, "batch": 5.0}, interactive_reserve=0,
+    )
+
+    async def drain_then_call():
+        for _ in range(60):
+            await scheduler.aacquire("tavily")
+        priority.set(BATCH)
+        await scheduler.aacquire("tavily")  # Waits about a second for a token
+
+    asyncio.run(drain_then_call())
+    with pytest.raises(RetryLater):
+        scheduler.acquire("tavily")
+
+class FlakyModel:
+    """Raises a rate-limit error on the first call, then answers."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        if self.calls == 1:
+            raise RateLimitError("Error 429")
+        return AIMessage(content='{"recommendations": [], "summary": "ok"}')
+
+def test_chat_answers_503_and_the_retry_continues_the_run(monkeypatch, tmp_path):
+    import api
+
+    monkeypatch.setattr(graph_module, "llm", FlakyModel())
+    monkeypatch.setattr(graph_module, "scheduler", Scheduler(TokenBuckets(str(tmp_path / "s.sqlite")), {}, max_retries=0))
+    client = TestClient(api.app)
+
+    first = client.post("/chat", json={"user_input": "Profil"})
+    assert first.status_code == 503 and "Retry-After" in first.headers
+    thread_id = first.json()["detail"]["thread_id"]
+
+    second = client.post("/chat", json={"user_input": "Profil", "thread_id": thread_id})
+    assert second.json()["response"] == {"recommendations": [], "summary": "ok"}
+    messages = api.get_agent().get_state({"configurable": {"thread_id": thread_id}}).values["messages"]
+    assert sum(isinstance(m, HumanMessage) for m in messages) == 1
@@ -0,0 +1,62 @@
+import asyncio
+
+from langchain_core.tools import StructuredTool
+
+from agent.search_cache import CachedSearchTool, SearchCache, SqliteSearchStore, normalize_query
+
+def _counting_search_tool(calls):
+    def search(query: str) -> dict:
+        calls.append(query)
+        return {"query": query, "results": [{"url": "https://uni.example"}]}
+
+    async def asearch(query: str) -> dict:
+        calls.append(query)
+        await asyncio.sleep(0.01)
+        if query == "boom":
+            return {"error": "upstream failed"}
+        return {"query": query, "results": [{"url": "https://uni.example"}]}
+
+    return StructuredTool.from_function(func=search, coroutine=asearch, name="web_search", description="search")
+
+def test_normalize_query_ignores_case_whitespace_and_word_order():
+    assert normalize_query("Informatik  Studium Gehalt?") == normalize_query("gehalt informatik studium")
+
+def test_equivalent_queries_hit_the_cache():
+    calls = []
+    tool = CachedSearchTool(_counting_search_tool(calls), SearchCache())
+
+    first = tool.invoke({"query": "Informatik Studium Gehalt"})
+    second = tool.invoke({"query": "studium  informatik GEHALT"})
+    assert first == second and calls == ["Informatik Studium Gehalt"]
+
+def test_concurrent_identical_queries_share_one_upstream_call():
+    calls = []
+    cache = SearchCache()
+    tool = CachedSearchTool(_counting_search_tool(calls), cache)
+
+    async def run():
+        return await asyncio.gather(*(tool.ainvoke({"query": "Maschinenbau Aachen"}) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1 and all(result == results[0] for result in results)
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 4
+
+def test_errors_are_not_cached_and_entries_are_bounded():
+    calls = []
+    cache = SearchCache(max_entries=2)
+    tool = CachedSearchTool(_counting_search_tool(calls), cache)
+
+    asyncio.run(tool.ainvoke({"query": "boom"}))
+    asyncio.run(tool.ainvoke({"query": "boom"}))
+    assert calls == ["boom", "boom"]
+
+    for query in ("a", "b", "c"):
+        tool.invoke({"query": query})
+    assert cache.stats()["entries"] == 2
+
+def test_persistent_store_survives_a_new_cache(tmp_path):
+    calls = []
+    path = str(tmp_path / "search.sqlite")
+    CachedSearchTool(_counting_search_tool(calls), SearchCache(store=SqliteSearchStore(path))).invoke({"query": "BWL Mannheim"})
+    CachedSearchTool(_counting_search_tool(calls), SearchCache(store=SqliteSearchStore(path))).invoke({"query": "Mannheim BWL"})
+    assert calls == ["BWL Mannheim"]
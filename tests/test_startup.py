@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from agent.startup import import_report, once
+
+def test_once_builds_a_single_object_across_threads():
+    calls = []
+
+    @once
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(build())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and len({id(result) for result in results}) == 1
+
+def test_once_retries_after_a_failure():
+    attempts = []
+
+    @once
+    def build():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("not yet")
+        return "ready"
+
+    try:
+        build()
+    except RuntimeError:
+        pass
+    assert build() == "ready" and build() == "ready" and len(attempts) == 2
+
+def test_importing_the_api_defers_model_and_search_clients():
+    code = "import sys, api; print(sorted(m for m in ('langchain_openai', 'langchain_tavily', 'bs4') if m in sys.modules))"
+    completed = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(__file__)),
+    )
+    assert completed.stdout.strip() == "[]"
+
+def test_gunicorn_config_prepares_the_metrics_directory_before_the_app(tmp_path):
+    # The order of `gunicorn --preload`: the config file is read, then the app imported
+    directory = tmp_path / "metrics"
+    code = "import runpy; runpy.run_path('gunicorn.conf.py'); import api; api.metrics()"
+    subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(__file__)),
+        env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(directory)},
+    )
+    assert directory.is_dir()
+
+def test_import_report_groups_by_top_level_package():
+    total, packages = import_report(["json"])
+    assert total > 0 and "json" in dict(packages)
@@ -0,0 +1,38 @@
+import agent.graph as graph_module
+import agent.system_prompt as prompt_module
+import agent.tools as tools_module
+from agent.catalog import CatalogStore, Programme
+from agent.system_prompt import get_system_prompt
+
+WEB_TOOLS = ["web_search", "scrape_website_tool", "crawl_site_tool", "find_links_tool", "human_feedback_tool"]
+
+def test_local_search_is_only_recommended_with_the_tool():
+    assert "`local_knowledge_search`, ob" in get_system_prompt(["local_knowledge_search", *WEB_TOOLS])
+    assert "Erst lokal suchen" not in get_system_prompt(WEB_TOOLS)
+
+def test_default_prompt_names_only_the_bound_tools(monkeypatch):
+    monkeypatch.setattr(graph_module, "bound_tool_names", lambda: WEB_TOOLS)
+    prompt = get_system_prompt()
+
+    assert "`web_search`, `scrape_website_tool`" in prompt
+    assert "catalog_search" not in prompt and "local_knowledge_search" not in prompt
+
+def test_catalog_search_needs_a_built_catalog(monkeypatch, tmp_path):
+    store = CatalogStore(str(tmp_path / "catalog.sqlite"))
+    monkeypatch.setattr(tools_module, "catalog_store", store)
+    assert not tools_module._catalog_built()
+
+    store.save_page("https://uni.example/info", None, None, "hash", [], Programme(
+        "https://uni.example/info", "Informatik", "Uni Example", "Bachelor", "Deutsch", 6, None, None,
+    ))
+    assert tools_module._catalog_built()
+
+def test_parallel_mode_asks_for_batched_research(monkeypatch):
+    monkeypatch.setattr(prompt_module, "PARALLEL_TOOL_CALLS", True)
+    prompt = get_system_prompt(WEB_TOOLS)
+
+    assert "**Recherche bündeln:** Rufe unabhängige Recherche-Werkzeuge (`web_search`, `scrape_website_tool`" in prompt
+    assert "EINE EINZIGE" not in prompt and "EINEN Werkzeugaufruf" not in prompt
+
+    monkeypatch.setattr(prompt_module, "PARALLEL_TOOL_CALLS", False)
+    assert "EINEN Werkzeugaufruf pro Runde" in get_system_prompt(WEB_TOOLS)